@@ -1,31 +1,87 @@
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Union, AsyncGenerator, Any, Dict, Optional
-import json
+from typing import Union, AsyncGenerator, Any, Dict, List, Literal, Optional, Set
 import asyncio
+import time
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 import uvicorn
 
 # 导入 agent 相关模块
-from src.agents.research import research_agent
-from src.monitoring import get_langsmith_callbacks
-from langchain_core.messages import BaseMessage, AIMessage
+from src.agents.research import create_workflow
+from src.persistence import get_checkpointer, get_interrupt_store, flush_checkpointer
+from src.agents.agent_cache import agent_cache
+from src.agents.tool_selector import tool_selector
+from src.llms.response_cache import response_cache
+from src.llms.router import model_health
+from src.prompts.template import prompt_registry
+from src.tools.search import search_cache
+from src.utils.admission import AdmissionRejected, admission
+from src.utils.http_client import http_client
+from src.utils.extract_pool import extraction_pool
+from src.utils.page_cache import page_cache
+from src.utils.sse import DONE_FRAME, SSE_COALESCE_MS, sse_frame
+from src.utils.stream_buffer import StreamBuffer, stream_buffers
+from src.monitoring import UsageTracker, get_langsmith_callbacks, get_logger, metrics, usage_store
+from langchain_core.messages import BaseMessage, AIMessage, AIMessageChunk
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command
 from langchain_core.runnables import RunnableConfig
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时构建工作流并打开 checkpointer，第一个请求不需要等待
+    get_research_agent()
+    yield
+    # 关闭工具共享的 HTTP 连接池和正文提取进程池
+    await http_client.aclose()
+    extraction_pool.close()
+
+
 app = FastAPI(
     title="Agent Research API",
     description="与 LangGraph Agent 进行流式通信的 API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
-# 内存存储：用于保存中断状态
+# api 使用带 checkpointer 的 research 工作流，中断后可以通过 Command 恢复执行
+# 后端由 CHECKPOINT_BACKEND 决定（默认 memory），sqlite 后端可以在多个 uvicorn worker 之间共享
+# 在 lifespan 启动时（或第一次使用时）构建，导入本模块不编译图、不打开 checkpointer
+research_agent: Optional[CompiledStateGraph] = None
+
+
+def get_research_agent() -> CompiledStateGraph:
+    global research_agent
+    if research_agent is None:
+        research_agent = create_workflow(checkpointer=get_checkpointer())
+    return research_agent
+
+# 中断状态存储（带 TTL）
 # key: thread_id, value: {interrupt_data, action_requests, created_at}
-interrupt_storage: Dict[str, Dict[str, Any]] = {}
+interrupt_store = get_interrupt_store()
+
+logger = get_logger(__name__)
+
+# 各组件的 stats() 在 /metrics 中以 gauge 输出
+metrics.register_collector("http_client", http_client.stats)
+metrics.register_collector("extraction_pool", extraction_pool.stats)
+metrics.register_collector("search_cache", search_cache.stats)
+metrics.register_collector("agent_cache", agent_cache.stats)
+metrics.register_collector("llm_cache", response_cache.stats)
+metrics.register_collector("model_router", model_health.stats)
+metrics.register_collector("tool_selector", tool_selector.stats)
+metrics.register_collector("prompt", prompt_registry.stats)
+metrics.register_collector("usage", usage_store.stats)
+metrics.register_collector("admission", admission.stats)
+metrics.register_collector("stream_buffer", stream_buffers.stats)
+if page_cache is not None:
+    metrics.register_collector("page_cache", page_cache.stats)
 
 
 @app.get("/")
@@ -35,6 +91,9 @@ def read_root():
         "message": "Agent Research API",
         "endpoints": {
             "stream": "/stream/chat - 流式聊天接口",
+            "reattach": "/stream/chat/{thread_id} - 断线后带 Last-Event-ID 重新连接",
+            "metrics": "/metrics - 工具/节点耗时与错误指标",
+            "usage": "/usage/{thread_id} - 按 thread 累计的 token 用量与节点耗时",
             "docs": "/docs - API 文档"
         }
     }
@@ -46,29 +105,174 @@ def health_check():
     return {"status": "healthy", "service": "agent-research-api"}
 
 
+@app.get("/metrics")
+def metrics_endpoint(format: Literal["prometheus", "json"] = "prometheus"):
+    """指标端点：工具/节点耗时直方图、错误次数以及各组件统计，默认 Prometheus 文本格式"""
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/usage")
+def usage_summary(limit: int = 10):
+    """进程内累计的 token 用量，以及最近请求中耗时最长的几个"""
+    return {"totals": usage_store.stats(), "slowest": usage_store.slowest(limit)}
+
+
+@app.get("/usage/{thread_id}")
+def thread_usage(thread_id: str):
+    """按 thread 累计的 token 用量与节点耗时，以及最近一次请求的明细"""
+    usage = usage_store.get(thread_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"thread {thread_id} 没有用量记录")
+    return usage
+
+
+# 流式输出模式
+# - values: 每个 chunk 推送完整状态中的全部消息（兼容旧前端）
+# - delta: 只推送新产生的消息，按消息 id 去重
+# - tokens: 基于 LangGraph 的 messages 模式，推送 LLM 生成的 token 增量
+StreamMode = Literal["values", "delta", "tokens"]
+
+
 class ChatRequest(BaseModel):
     message: str
     thread_id: Optional[str] = None
+    mode: StreamMode = "values"
+    # 恢复中断时的审批决定（与 action_requests 一一对应），不传时全部批准
+    decisions: Optional[List[Dict[str, Any]]] = None
+    # 从上次因客户端断开被取消的运行继续执行（message 为空时同样继续）
+    resume: bool = False
+
+
+def message_content(msg: BaseMessage) -> str:
+    """将消息内容统一转换为字符串"""
+    if not msg.content:
+        return ""
+    if isinstance(msg.content, str):
+        return msg.content
+    return str(msg.content)
+
+
+def iter_new_messages(chunk: Dict[str, Any], seen_ids: Set[str]):
+    """
+    从 updates 模式的 chunk 中提取尚未推送过的消息
+
+    Args:
+        chunk: 格式为 {node_name: node_output}
+        seen_ids: 已推送的消息 id 集合，会被原地更新
+
+    Yields:
+        (node_name, message)
+    """
+    for node_name, node_output in chunk.items():
+        if node_name == "__interrupt__" or not isinstance(node_output, dict):
+            continue
+        for msg in node_output.get("messages") or []:
+            if not isinstance(msg, BaseMessage):
+                continue
+            if msg.id:
+                if msg.id in seen_ids:
+                    continue
+                seen_ids.add(msg.id)
+            yield node_name, msg
+
+
+def token_event(msg: BaseMessage, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    将 messages 模式的 (message_chunk, metadata) 转换为 SSE 事件
+
+    AIMessageChunk 作为 token 增量推送，其余完整消息（如 ToolMessage）按普通消息推送。
+    """
+    content = message_content(msg)
+    if not content:
+        return None
+    node = metadata.get("langgraph_node")
+    if isinstance(msg, AIMessageChunk):
+        return {"type": "token", "content": content, "id": msg.id, "node": node}
+    return {"type": "message", "content": content, "id": msg.id, "node": node}
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """等待客户端断开
+
+    请求体已经由 FastAPI 读完，之后 receive 只会在连接断开（或响应结束）时返回 http.disconnect。
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def relay(buffer: StreamBuffer, after: int, request: Request) -> AsyncGenerator[bytes, None]:
+    """
+    把缓冲中 after 之后的事件转发给一个客户端（带 SSE id），客户端断开时停止
+
+    已经缓冲的事件合并为一次写出，窗口见 SSE_COALESCE_MS。
+    没有客户端的运行会在 grace 秒后被取消，见 StreamBuffer.detach。
+    """
+    disconnected = asyncio.ensure_future(wait_for_disconnect(request))
+    batches = buffer.iter_batches(after, SSE_COALESCE_MS / 1000)
+    buffer.attach()
+    try:
+        while True:
+            next_batch = asyncio.ensure_future(batches.__anext__())
+            await asyncio.wait({next_batch, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_batch.done():
+                next_batch.cancel()
+                return
+            try:
+                batch = next_batch.result()
+            except StopAsyncIteration:
+                return
+            yield b"".join([b"id: %d\n%s" % (event_id, data) for event_id, data in batch])
+    finally:
+        disconnected.cancel()
+        buffer.detach()
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # 禁用 Nginx 缓冲
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "*",
+}
 
 
 @app.post("/stream/chat")
-async def stream_chat(body: ChatRequest) -> StreamingResponse:
+async def stream_chat(body: ChatRequest, request: Request) -> StreamingResponse:
     """
     流式聊天接口 - 使用 SSE (Server-Sent Events) 格式，支持中断检测
 
     Args:
         message: 用户输入的消息（如果是恢复执行，可以为空）
         thread_id: 可选的 thread_id，用于恢复对话或创建新对话
+        mode: 流式输出模式，values（默认）/ delta / tokens
+        decisions: 恢复中断时的审批决定，不传时批准全部待审批的工具调用
+        resume: 从上次被取消的运行继续执行，message 为空时同样继续
 
     Returns:
         StreamingResponse: SSE 格式的流式响应
 
     事件类型:
         - "message": 正常消息内容
-        - "interrupt": 中断事件，需要前端调用 /resume 端点恢复
+        - "token": LLM token 增量（仅 tokens 模式）
+        - "interrupt": 中断事件，前端使用同一个 thread_id 再次调用本接口恢复
         - "error": 错误信息
+        - "usage": 本次请求的 token 用量（按模型、节点汇总）与各节点耗时，在 done 之前发送
         - "done": 流结束
 
+    并发请求过多时返回 429（带 Retry-After），同一 thread_id 的请求依次执行：客户端断开后
+    运行在 grace 内仍会继续，此时同一 thread 的新请求排队等待该运行结束。
+    每个事件带有单调递增的 SSE id（同一 thread 内连续编号）。连接中断后可以通过
+    GET /stream/chat/{thread_id} 带上 Last-Event-ID 重新连接，补发缺失的事件并继续跟随。
+    所有客户端断开超过 STREAM_RESUME_GRACE 秒仍未重新连接时取消图运行（包括进行中的
+    LLM 请求和网页下载），已完成的步骤保留在 checkpoint 中，之后使用同一个 thread_id
+    发送 resume=true（或空 message）的请求会从断点继续执行；带新消息的请求放弃断点，
+    直接处理新消息。
+
     前端使用示例:
         const response = await fetch('/stream/chat', {
             method: 'POST',
@@ -79,29 +283,60 @@ async def stream_chat(body: ChatRequest) -> StreamingResponse:
         // 处理流式数据...
     """
 
-    async def generate_stream() -> AsyncGenerator[str, None]:
+    # 生成或使用提供的 thread_id
+    thread_id = body.thread_id or f"thread-{uuid.uuid4().hex[:8]}"
+
+    # 准入控制：排队已满或等待超时时直接返回 429，不启动图运行
+    try:
+        ticket = await admission.acquire(thread_id)
+    except AdmissionRejected as e:
+        metrics.count_error("api", "stream_chat_rejected")
+        return JSONResponse(  # type: ignore[return-value]
+            status_code=429,
+            content={"detail": str(e), "reason": e.reason},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    async def run_stream() -> AsyncGenerator[bytes, None]:
         """
         生成 SSE 格式的流式响应，支持中断检测和恢复
         """
+        started = time.perf_counter()
+        # 统计本次请求所有 LLM 调用（包括子 agent）的用量和各节点耗时
+        usage_tracker = UsageTracker()
+        cancelled = False
         try:
-            # 生成或使用提供的 thread_id
-            thread_id = body.thread_id or f"thread-{uuid.uuid4().hex[:8]}"
-
             # 获取 LangSmith 回调（如果已配置）
             callbacks = get_langsmith_callbacks()
 
             # 创建配置，包含 thread_id 用于 checkpointer
             config: RunnableConfig = {
                 "configurable": {"thread_id": thread_id},
+                "callbacks": [*callbacks, usage_tracker],
             }
-            if callbacks:
-                config["callbacks"] = callbacks
 
-            # 判断是恢复执行还是新对话
-            if body.thread_id and body.thread_id in interrupt_storage:
+            # 判断是恢复执行还是新对话（取出即删除，避免多个 worker 重复恢复）
+            interrupt_info = interrupt_store.pop(
+                body.thread_id) if body.thread_id else None
+            if (interrupt_info is not None and interrupt_info.get("cancelled")
+                    and not body.resume and body.message.strip()):
+                # 上次运行被取消，但本次带了新消息：放弃断点（取消标记已取出），处理新消息
+                interrupt_info = None
+            if interrupt_info is not None and interrupt_info.get("cancelled"):
+                # 上次运行因客户端断开被取消：输入为 None，从最近的 checkpoint 继续执行
+                resume_data = {
+                    "type": "resume",
+                    "thread_id": thread_id,
+                    "message": "继续执行上次被取消的运行...",
+                }
+                yield sse_frame(resume_data)
+                current_input: Union[dict, Command, None] = None
+            elif interrupt_info is not None:
                 # 恢复执行：使用 Command
-                interrupt_info = interrupt_storage[body.thread_id]
-                decisions = interrupt_info.get("decisions", [])
+                decisions = body.decisions
+                if decisions is None:
+                    decisions = [{"type": "approve"}
+                                 for _ in interrupt_info.get("action_requests", [])]
 
                 # 发送恢复通知
                 resume_data = {
@@ -109,15 +344,11 @@ async def stream_chat(body: ChatRequest) -> StreamingResponse:
                     "thread_id": thread_id,
                     "message": "正在恢复执行...",
                 }
-                json_data = json.dumps(resume_data, ensure_ascii=False)
-                yield f"data: {json_data}\n\n"
+                yield sse_frame(resume_data)
 
                 # 使用 Command 恢复执行
-                current_input: Union[dict, Command] = Command(
+                current_input = Command(
                     resume={"decisions": decisions})
-
-                # 清理中断存储
-                del interrupt_storage[body.thread_id]
             else:
                 # 新对话：使用消息
                 current_input = {
@@ -126,14 +357,36 @@ async def stream_chat(body: ChatRequest) -> StreamingResponse:
                     ]
                 }
 
-            # 使用 values 模式以便检测中断
-            astream = research_agent.astream(
+            # values 模式推送完整状态；delta 使用 updates 模式只拿到节点增量；
+            # tokens 同时订阅 messages（token 增量）和 updates（检测中断）
+            if body.mode == "tokens":
+                stream_mode: Any = ["updates", "messages"]
+            elif body.mode == "delta":
+                stream_mode = "updates"
+            else:
+                stream_mode = "values"
+
+            astream = get_research_agent().astream(
                 current_input,  # type: ignore
                 config=config,
-                stream_mode="values",  # 使用 values 模式以便检测中断
+                stream_mode=stream_mode,
             )
 
-            async for chunk in astream:
+            # delta 模式下已推送的消息 id
+            seen_ids: Set[str] = set()
+
+            async for item in astream:
+                if body.mode == "tokens":
+                    mode, chunk = item
+                    if mode == "messages":
+                        msg, metadata = chunk
+                        event = token_event(msg, metadata)
+                        if event:
+                            yield sse_frame(event)
+                        continue
+                else:
+                    chunk = item
+
                 # 检查是否有中断
                 if "__interrupt__" in chunk:
                     interrupt_data = chunk["__interrupt__"]
@@ -144,20 +397,21 @@ async def stream_chat(body: ChatRequest) -> StreamingResponse:
                         for interrupt in interrupt_data:
                             if hasattr(interrupt, "value") and "action_requests" in interrupt.value:
                                 requests = interrupt.value["action_requests"]
+                                # HumanInTheLoopMiddleware 的 action_request 是 {name, args, description}
                                 for request in requests:
                                     action_requests.append({
-                                        "request_id": getattr(request, "request_id", None),
-                                        "tool_name": getattr(request, "tool_name", None),
-                                        "args": getattr(request, "args", {}),
-                                        "description": getattr(request, "description", ""),
+                                        "request_id": request.get("request_id"),
+                                        "tool_name": request.get("name"),
+                                        "args": request.get("args", {}),
+                                        "description": request.get("description", ""),
                                     })
 
                     # 保存中断状态
-                    interrupt_storage[thread_id] = {
+                    interrupt_store.put(thread_id, {
                         "interrupt_data": str(interrupt_data),  # 序列化保存
                         "action_requests": action_requests,
                         "created_at": datetime.now().isoformat(),
-                    }
+                    })
 
                     # 发送中断事件给前端
                     interrupt_event = {
@@ -166,12 +420,28 @@ async def stream_chat(body: ChatRequest) -> StreamingResponse:
                         "action_requests": action_requests,
                         "message": "检测到中断，需要人工审批",
                     }
-                    json_data = json.dumps(interrupt_event, ensure_ascii=False)
-                    yield f"data: {json_data}\n\n"
+                    yield sse_frame(interrupt_event)
 
                     # 中断后停止流
                     break
 
+                if body.mode == "tokens":
+                    # 内容已通过 messages 模式推送，updates 只用于检测中断
+                    continue
+
+                if body.mode == "delta":
+                    for node_name, msg in iter_new_messages(chunk, seen_ids):
+                        content = message_content(msg)
+                        if content:
+                            chunk_data = {
+                                "type": "message",
+                                "content": content,
+                                "id": msg.id,
+                                "node": node_name,
+                            }
+                            yield sse_frame(chunk_data)
+                    continue
+
                 # 处理正常输出
                 for node_name, node_output in chunk.items():
                     if node_name == "__interrupt__":
@@ -196,38 +466,135 @@ async def stream_chat(body: ChatRequest) -> StreamingResponse:
                                         "content": content,
                                         "node": node_name,
                                     }
-                                    json_data = json.dumps(
-                                        chunk_data, ensure_ascii=False)
-                                    yield f"data: {json_data}\n\n"
+                                    yield sse_frame(chunk_data)
 
+        except asyncio.CancelledError:
+            # 客户端已断开：取消沿 astream 传递到正在执行的节点、LLM 请求和网页下载，
+            # 清理完成后继续向上抛出，运行的 task 以取消状态结束
+            cancelled = True
+            raise
         except Exception as e:
+            metrics.count_error("api", "stream_chat")
+            logger.exception("stream_chat 执行失败: thread_id=%s", body.thread_id)
             # 错误处理：发送错误信息给前端
             error_data = {
                 "type": "error",
                 "message": str(e),
             }
-            json_data = json.dumps(error_data, ensure_ascii=False)
-            yield f"data: {json_data}\n\n"
+            yield sse_frame(error_data)
         finally:
-            # 发送结束标记
-            done_data = {
-                "type": "done",
-                "message": "流结束",
-            }
-            json_data = json.dumps(done_data, ensure_ascii=False)
-            yield f"data: {json_data}\n\n"
+            # 提交缓冲的 checkpoint，保证其他 worker 可以恢复这个 thread
+            await flush_checkpointer(getattr(research_agent, "checkpointer", None))
+            if cancelled and interrupt_store.get(thread_id) is None:
+                # 记录断点，同一 thread_id 的下一个请求可以从 checkpoint 继续执行
+                interrupt_store.put(thread_id, {
+                    "cancelled": True,
+                    "created_at": datetime.now().isoformat(),
+                })
+            metrics.observe("api", "stream_chat", time.perf_counter() - started)
+
+            usage = usage_tracker.summary()
+            if cancelled:
+                usage["tokens_saved_estimate"] = usage_store.estimate_saved(usage)
+            usage_store.record(thread_id, usage, cancelled=cancelled)
+            if cancelled:
+                metrics.inc("stream_cancelled")
+                metrics.inc("stream_tokens_saved", usage["tokens_saved_estimate"])
+                logger.info("客户端断开，已取消运行: thread_id=%s，已用 %d tokens，预计节省 %d tokens",
+                            thread_id, usage["total_tokens"], usage["tokens_saved_estimate"])
+
+        # 只有没有被取消时才会执行到这里（客户端已经断开时不再发送 usage / done）
+        usage_data = {"type": "usage", "thread_id": thread_id, **usage}
+        yield sse_frame(usage_data)
+
+        # 发送结束标记
+        yield DONE_FRAME
+
+    buffer = stream_buffers.open(thread_id)
+    if not buffer.finished:
+        # 持有 thread 锁时不应有运行中的缓冲，防御性检查，避免两次运行写入同一个缓冲
+        ticket.release()
+        raise HTTPException(
+            status_code=409,
+            detail=f"thread {thread_id} 仍在运行，请通过 GET /stream/chat/{thread_id} 重新连接",
+        )
+    after = buffer.last_id
+    producer: Optional["asyncio.Task[None]"] = None
+
+    async def generate_stream() -> AsyncGenerator[bytes, None]:
+        """
+        在独立的 task 中驱动 run_stream，事件写入 thread 的缓冲，本生成器只负责转发
+
+        图运行不依赖这个连接：断开后可以重新连接，超过 grace 仍没有客户端时取消该 task，
+        取消会传递到图运行中；清理（提交 checkpoint、释放名额、记录用量）在该 task 内完成，
+        不受 Starlette 取消范围的影响。
+        """
+
+        nonlocal producer
+
+        async def produce() -> None:
+            try:
+                async for chunk in run_stream():
+                    buffer.append(chunk)
+            finally:
+                buffer.finish()
+                # 运行真正结束（checkpoint 已提交）后才释放名额和 thread 锁：客户端断开后运行
+                # 仍可能在 grace 内继续，同一 thread 的下一个请求需要排队等待，而不是并发启动第二次运行
+                ticket.release()
+
+        producer = asyncio.create_task(produce())
+        buffer.start(producer)
+        async for chunk in relay(buffer, after, request):
+            yield chunk
+
+    def release_unstarted() -> None:
+        # 客户端在流开始前断开时生成器不会执行，运行没有启动，由后台任务释放名额
+        if producer is None:
+            ticket.release()
 
     # 返回流式响应 - 使用 text/event-stream 作为 SSE 格式
     return StreamingResponse(
         generate_stream(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",  # 禁用 Nginx 缓冲
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-        }
+        background=BackgroundTask(release_unstarted),
+        headers=SSE_HEADERS,
+    )
+
+
+@app.get("/stream/chat/{thread_id}")
+async def reattach_stream(
+    thread_id: str,
+    request: Request,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    """
+    重新连接 thread 正在进行或最近结束的运行
+
+    从缓冲中补发 Last-Event-ID（请求头，或 last_event_id 查询参数）之后的事件，
+    运行仍在进行时继续跟随直到结束，不会重新执行图。不带 Last-Event-ID 时从最近一次
+    运行的开头开始。缓冲中没有该 thread 时返回 404，所需事件已被丢弃时返回 410。
+    """
+    buffer = stream_buffers.get(thread_id)
+    if buffer is None:
+        raise HTTPException(status_code=404, detail=f"thread {thread_id} 没有可重新连接的运行")
+    if last_event_id is None and last_event_id_header:
+        try:
+            last_event_id = int(last_event_id_header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID 必须是整数")
+    after = buffer.run_start() if last_event_id is None else last_event_id
+    if buffer.missing(after):
+        stream_buffers.gaps += 1
+        raise HTTPException(
+            status_code=410, detail=f"thread {thread_id} 在 {after} 之后的事件已被丢弃")
+
+    stream_buffers.reattached += 1
+    stream_buffers.replayed += sum(event_id > after for event_id, _, _ in buffer.events)
+    return StreamingResponse(
+        relay(buffer, after, request),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
 
 # 添加 CORS 支持
@@ -0,0 +1,96 @@
+"""
+上下文压缩基准
+
+用脚本化的假模型驱动真实的 create_agent ReAct 循环：模型每轮发起一次工具调用，
+工具返回一段很长的网页正文，直到达到指定轮数后给出最终回答。
+分别在不加压缩中间件、加 MessageCompactionMiddleware 的情况下运行，
+输出每一轮发送给模型的 prompt tokens（本地分词器计数）。
+
+用法:
+    uv run python -m benchmarks.bench_compaction --iterations 12 --page-chars 12000 --max-tokens 16000
+"""
+import argparse
+from typing import Any, List, Optional
+
+from langchain.agents import create_agent
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from src.middlewares.compaction import MessageCompactionMiddleware
+from src.utils.tokens import count_messages_tokens, tokenizer_name
+
+PARAGRAPH = "Gold prices extended their rally as investors sought safe-haven assets. 金价继续上涨。"
+
+
+class ToolLoopChatModel(BaseChatModel):
+    """前 iterations 轮发起工具调用、之后给出回答的假模型，记录每轮收到的 prompt tokens"""
+
+    iterations: int = 10
+    prompt_tokens: List[int] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "tool-loop-fake"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ToolLoopChatModel":
+        return self
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self.prompt_tokens.append(count_messages_tokens(messages))
+        step = len(self.prompt_tokens)
+        if step > self.iterations:
+            message = AIMessage(content="最终回答")
+        else:
+            message = AIMessage(content=f"读取第 {step} 个来源", tool_calls=[{
+                "name": "fetch_page", "args": {"url": f"https://example.com/{step}"},
+                "id": f"call_{step}"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def run(iterations: int, page_chars: int, middleware: list) -> List[int]:
+    page = (PARAGRAPH * (page_chars // len(PARAGRAPH) + 1))[:page_chars]
+
+    @tool
+    def fetch_page(url: str) -> str:
+        """读取网页"""
+        return page
+
+    model = ToolLoopChatModel(iterations=iterations, prompt_tokens=[])
+    agent = create_agent(model=model, tools=[fetch_page], middleware=middleware)
+    agent.invoke(
+        {"messages": [{"role": "user", "content": "调研最近一周的黄金价格走势"}]},
+        {"recursion_limit": iterations * 2 + 5},
+    )
+    return model.prompt_tokens
+
+
+def main(iterations: int, page_chars: int, max_tokens: int, keep_recent: int) -> None:
+    before = run(iterations, page_chars, [])
+    after = run(iterations, page_chars, [
+        MessageCompactionMiddleware(max_tokens=max_tokens, keep_recent=keep_recent)])
+
+    print(f"分词器={tokenizer_name()}, page_chars={page_chars}, "
+          f"max_tokens={max_tokens}, keep_recent={keep_recent}")
+    print(f"{'iter':>5} {'before':>10} {'after':>10} {'saved':>8}")
+    for i, (b, a) in enumerate(zip(before, after), 1):
+        print(f"{i:>5} {b:>10} {a:>10} {1 - a / b:>8.0%}")
+    print(f"{'total':>5} {sum(before):>10} {sum(after):>10} {1 - sum(after) / sum(before):>8.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="上下文压缩基准")
+    parser.add_argument("--iterations", type=int, default=12, help="工具调用轮数")
+    parser.add_argument("--page-chars", type=int, default=12000, help="每次工具输出的字符数")
+    parser.add_argument("--max-tokens", type=int, default=16000, help="压缩预算")
+    parser.add_argument("--keep-recent", type=int, default=6, help="原样保留的最近消息数")
+    args = parser.parse_args()
+    main(args.iterations, args.page_chars, args.max_tokens, args.keep_recent)
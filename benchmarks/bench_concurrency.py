@@ -0,0 +1,63 @@
+"""
+research_agent 并发吞吐基准
+
+使用固定延迟的假模型替换 K2，在同一个事件循环里同时发起 N 个 research 运行，
+观察吞吐量随在途请求数的变化。节点为 async 实现时，总耗时应接近单次运行耗时，
+吞吐量随并发数近似线性增长。
+
+用法:
+    uv run python -m benchmarks.bench_concurrency --latency 0.2 --concurrency 1 4 16 64
+"""
+import argparse
+import asyncio
+import os
+import time
+from unittest.mock import patch
+
+# 避免导入 src.llms.fz 时因缺少密钥而失败
+os.environ.setdefault("ARK_API_KEY", "bench")
+os.environ.setdefault("OPEN_AI_API_KEY", "bench")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from benchmarks.fake_llm import SleepyChatModel  # noqa: E402
+
+
+async def run_batch(agent, concurrency: int) -> float:
+    """同时发起 concurrency 个运行，返回总耗时（秒）"""
+    async def one(i: int):
+        await agent.ainvoke(
+            {"messages": [HumanMessage(content=f"最新黄金价格 #{i}")]},
+            config={"configurable": {"thread_id": f"bench-{i}"}},
+        )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main(latency: float, levels: list[int]) -> None:
+    fake = SleepyChatModel(latency=latency)
+    with patch.multiple("src.agents.research", research_llm=fake, coordinator_llm=fake):
+        from src.agents.research import research_agent
+
+        # 预热：首次运行包含导入与编译开销
+        await run_batch(research_agent, 1)
+
+        print(f"{'concurrency':>12} {'elapsed(s)':>12} {'runs/s':>10} {'speedup':>9}")
+        base_rps = None
+        for level in levels:
+            elapsed = await run_batch(research_agent, level)
+            rps = level / elapsed
+            base_rps = base_rps or rps
+            print(f"{level:>12} {elapsed:>12.3f} {rps:>10.2f} {rps / base_rps:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="research_agent 并发吞吐基准")
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="假模型每次调用的延迟（秒）")
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 4, 16, 64], help="在途请求数")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.concurrency))
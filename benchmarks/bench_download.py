@@ -0,0 +1,102 @@
+"""
+流式下载基准
+
+本地服务输出数 MB 的网页（可限速模拟慢速站点），对比完整读取响应体（http_client.get +
+response.text）与按 max_chars 计算字节上限的流式下载（download_text），输出耗时和
+Python 堆内存峰值（tracemalloc）。
+
+用法:
+    uv run python -m benchmarks.bench_download --size-mb 2 8 --rate-mbps 50 --max-chars 4000
+"""
+import argparse
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils.download import byte_cap, download_text
+from src.utils.http_client import http_client
+
+PARAGRAPH = "<p>今日黄金价格继续上涨，市场避险情绪升温，多家机构上调全年金价预测。</p>"
+
+
+def make_handler(pages: dict, rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = pages[self.path]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            chunk = 64 * 1024
+            try:
+                for offset in range(0, len(body), chunk):
+                    self.wfile.write(body[offset:offset + chunk])
+                    if rate > 0:
+                        time.sleep(chunk / rate)
+            except OSError:
+                # 客户端提前断开
+                return
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def make_page(size: int) -> bytes:
+    paragraph = PARAGRAPH.encode("utf-8")
+    repeat = size // len(paragraph) + 1
+    return b"<html><body><article>" + paragraph * repeat + b"</article></body></html>"
+
+
+def measure(fn) -> "tuple[float, float, int]":
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, size
+
+
+def main(sizes_mb: list[float], rate_mbps: float, max_chars: int) -> None:
+    pages = {f"/{size}": make_page(int(size * 1024 * 1024)) for size in sizes_mb}
+    httpd = ThreadingHTTPServer(
+        ("127.0.0.1", 0), make_handler(pages, rate_mbps * 1024 * 1024))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    cap = byte_cap(max_chars)
+
+    print(f"max_chars={max_chars}, 字节上限={cap / 1024:.0f}KB, 限速={rate_mbps}MB/s")
+    print(f"{'page':>8} {'mode':<10} {'elapsed(s)':>12} {'peak(MB)':>10} {'chars':>10}")
+    try:
+        for size in sizes_mb:
+            url = f"{base}/{size}"
+
+            def full():
+                return len(http_client.get(url).text)
+
+            def streamed():
+                return len(download_text(url, cap).text)
+
+            for mode, fn in (("full", full), ("streamed", streamed)):
+                elapsed, peak, chars = measure(fn)
+                print(f"{f'{size}MB':>8} {mode:<10} {elapsed:>12.3f} {peak:>10.1f} {chars:>10}")
+    finally:
+        http_client.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式下载基准")
+    parser.add_argument("--size-mb", type=float, nargs="+", default=[2, 8], help="页面大小（MB）")
+    parser.add_argument("--rate-mbps", type=float, default=50,
+                        help="服务端输出速度（MB/s），0 表示不限速")
+    parser.add_argument("--max-chars", type=int, default=4000, help="工具的 max_chars 参数")
+    args = parser.parse_args()
+    main(args.size_mb, args.rate_mbps, args.max_chars)
@@ -0,0 +1,263 @@
+"""
+端到端基准
+
+在子进程中启动 benchmarks.fake_services（OpenAI 兼容的假模型 + 搜索 / 网页替身），
+把 K2 的 base_url 指向它，然后完整运行 research_agent 和 dynamic_agent：
+模型调用走真实的 ChatOpenAI 客户端，工具走真实的 httpx 下载和正文提取。
+
+输出每个场景的：
+    - 端到端耗时（mean / p50 / p95）
+    - 各节点、各工具的平均耗时（src.monitoring.metrics 中的直方图）
+    - 图调度开销：总耗时减去各 superstep 的执行时间（由 debug 流的 task / task_result 时间戳计算）
+    - 每次运行的 prompt / completion tokens（假模型统计）
+    - 进程 RSS 峰值
+
+--save-baseline 把结果写入 benchmarks/baselines/e2e_<scenario>.json；
+--compare 与已保存的基线比较，超出阈值的指标标记为回退，并以非零状态码退出。
+
+用法:
+    uv run python -m benchmarks.bench_e2e --runs 5
+    uv run python -m benchmarks.bench_e2e --scenario research --compare --threshold 0.2
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+SCENARIOS = ("research", "dynamic")
+
+# 与基线比较的指标（越小越好），tokens 是确定值，任何增长都会体现出来
+COMPARED_METRICS = ("wall_p50_s", "overhead_mean_s", "prompt_tokens_per_run",
+                    "completion_tokens_per_run", "rss_peak_mb")
+# 绝对变化小于该值时不判定为回退（毫秒级的调度开销相对波动很大）
+MIN_ABSOLUTE_CHANGE = {"wall_p50_s": 0.02, "overhead_mean_s": 0.005, "rss_peak_mb": 5.0}
+
+
+def start_services(args) -> "tuple[multiprocessing.Process, str]":
+    from benchmarks.fake_services import serve
+
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Queue()
+    process = ctx.Process(
+        target=serve, args=(0, args.latency, args.tps, args.web_latency, args.page_kb, ready),
+        daemon=True)
+    process.start()
+    port = ready.get(timeout=30)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def configure_env(base: str) -> None:
+    """在导入 src 之前设置环境变量：模型指向假服务，关闭跨运行的缓存以便结果可重复"""
+    data_dir = tempfile.mkdtemp(prefix="bench_e2e_")
+    os.environ.update({
+        "ARK_BASE_URL": f"{base}/v1",
+        "ARK_API_KEY": "bench",
+        "OPEN_AI_API_KEY": "bench",
+        "K2_MODEL_ID": "fake-k2",
+        "PAGE_CACHE_ENABLED": "0",
+        "SEARCH_CACHE_TTL": "0",
+        "LLM_CACHE_NODES": "",
+        "TOOL_SELECTOR_ENABLED": "0",
+        "TOOL_SELECTOR_PATH": os.path.join(data_dir, "tool_selector.sqlite"),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+
+
+class LocalSearchProvider:
+    """把 search_web 的上游换成假服务的 /search"""
+
+    def __init__(self, base: str):
+        self.base = base
+
+    def text(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        from src.utils.http_client import http_client
+
+        response = http_client.get(
+            f"{self.base}/search", params={"q": query, "max_results": max_results})
+        response.raise_for_status()
+        return response.json()
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def run_once(graph, graph_input: Dict[str, Any], config: Dict[str, Any]) -> "tuple[float, float]":
+    """运行一次，返回 (总耗时, 各 superstep 执行时间之和)"""
+    steps: Dict[int, List[float]] = {}
+    start = time.perf_counter()
+    async for event in graph.astream(graph_input, config, stream_mode="debug"):
+        if event.get("type") in ("task", "task_result"):
+            ts = datetime.fromisoformat(event["timestamp"]).timestamp()
+            span = steps.setdefault(event["step"], [ts, ts])
+            span[0], span[1] = min(span[0], ts), max(span[1], ts)
+    wall = time.perf_counter() - start
+    return wall, sum(end - begin for begin, end in steps.values())
+
+
+def scenario_input(name: str, i: int):
+    from langchain_core.messages import HumanMessage
+
+    if name == "research":
+        from src.agents.research import research_agent
+
+        return research_agent, {"messages": [HumanMessage(content="最新黄金价格")]}, {
+            "configurable": {"thread_id": f"bench-e2e-{i}"}}
+    import importlib
+
+    from src.state import init_agent_state
+
+    graph = importlib.import_module("src.agents.dynamic_agent").dynamic_agent
+    state = init_agent_state()
+    state["messages"] = [HumanMessage(content="对比最新的黄金和白银价格")]
+    return graph, state, {"configurable": {"thread_id": f"bench-e2e-{i}"}}
+
+
+async def run_scenario(name: str, runs: int, base: str) -> Dict[str, Any]:
+    from src.monitoring.metrics import metrics
+
+    # 预热一次（导入、编译 agent、启动提取进程池），不计入结果
+    graph, graph_input, config = scenario_input(name, -1)
+    await run_once(graph, graph_input, config)
+    metrics.reset()
+    httpx.post(f"{base}/reset")
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    walls, overheads = [], []
+    for i in range(runs):
+        graph, graph_input, config = scenario_input(name, i)
+        wall, busy = await run_once(graph, graph_input, config)
+        walls.append(wall)
+        overheads.append(max(0.0, wall - busy))
+
+    snapshot = metrics.snapshot()["latency"]
+    tokens = httpx.get(f"{base}/stats").json()
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "scenario": name,
+        "runs": runs,
+        "wall_mean_s": statistics.mean(walls),
+        "wall_p50_s": percentile(walls, 0.5),
+        "wall_p95_s": percentile(walls, 0.95),
+        "overhead_mean_s": statistics.mean(overheads),
+        "nodes": {k: {"count": v["count"], "avg_s": v["avg"]}
+                  for k, v in sorted(snapshot.get("node", {}).items())},
+        "tools": {k: {"count": v["count"], "avg_s": v["avg"]}
+                  for k, v in sorted(snapshot.get("tool", {}).items())},
+        "llm": tokens,
+        "prompt_tokens_per_run": sum(v["prompt_tokens"] for v in tokens.values()) / runs,
+        "completion_tokens_per_run": sum(v["completion_tokens"] for v in tokens.values()) / runs,
+        "rss_peak_mb": rss_peak,
+        "rss_growth_mb": rss_peak - rss_before,
+    }
+
+
+async def run_scenarios(names, runs: int, base: str) -> List[Dict[str, Any]]:
+    return [await run_scenario(name, runs, base) for name in names]
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n== {result['scenario']} ({result['runs']} runs) ==")
+    print(f"wall        mean {result['wall_mean_s']:.3f}s  p50 {result['wall_p50_s']:.3f}s  "
+          f"p95 {result['wall_p95_s']:.3f}s")
+    print(f"overhead    mean {result['overhead_mean_s'] * 1000:.1f}ms "
+          f"({result['overhead_mean_s'] / result['wall_mean_s']:.1%} of wall)")
+    for kind in ("nodes", "tools"):
+        for name, item in result[kind].items():
+            print(f"{kind[:-1]:<6} {name:<24} n={item['count']:<4} avg {item['avg_s'] * 1000:8.1f}ms")
+    for name, item in sorted(result["llm"].items()):
+        print(f"llm    {name:<24} n={item['requests']:<4} prompt {item['prompt_tokens']:>7} "
+              f"completion {item['completion_tokens']:>6}")
+    print(f"tokens/run  prompt {result['prompt_tokens_per_run']:.0f}  "
+          f"completion {result['completion_tokens_per_run']:.0f}")
+    print(f"rss         peak {result['rss_peak_mb']:.1f}MB  growth {result['rss_growth_mb']:.1f}MB")
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            keys=COMPARED_METRICS, floors=MIN_ABSOLUTE_CHANGE) -> List[str]:
+    """返回超出阈值的指标"""
+    regressions = []
+    print(f"{'metric':<28} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key in keys:
+        old, new = baseline.get(key), result.get(key)
+        if not old or new is None:
+            continue
+        change = new / old - 1
+        regressed = change > threshold and new - old > floors.get(key, 0)
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:<28} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def baseline_path(name: str) -> Path:
+    return BASELINE_DIR / f"e2e_{name}.json"
+
+
+def main(args) -> int:
+    process, base = start_services(args)
+    configure_env(base)
+    try:
+        from src.tools import search
+
+        search.search_provider = LocalSearchProvider(base)
+        config = {"latency": args.latency, "tps": args.tps,
+                  "web_latency": args.web_latency, "page_kb": args.page_kb}
+        names = SCENARIOS if args.scenario == "all" else (args.scenario,)
+        # 模型的异步客户端绑定在创建它的事件循环上，所有场景在同一个循环中运行
+        results = asyncio.run(run_scenarios(names, args.runs, base))
+        regressions = []
+        for name, result in zip(names, results):
+            result["config"] = config
+            print_report(result)
+
+            path = baseline_path(name)
+            if args.compare:
+                if path.exists():
+                    baseline = json.loads(path.read_text())
+                    if baseline.get("config") != config:
+                        print(f"warning: baseline config differs: {baseline.get('config')}")
+                    regressions += [f"{name}.{key}" for key in compare(result, baseline, args.threshold)]
+                else:
+                    print(f"no baseline at {path}")
+            if args.save_baseline:
+                BASELINE_DIR.mkdir(exist_ok=True)
+                path.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+                print(f"baseline saved to {path}")
+        if regressions:
+            print(f"\nregressions: {', '.join(regressions)}")
+            return 1
+        return 0
+    finally:
+        from src.utils.extract_pool import extraction_pool
+
+        extraction_pool.close()
+        process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="端到端基准")
+    parser.add_argument("--scenario", choices=(*SCENARIOS, "all"), default="all")
+    parser.add_argument("--runs", type=int, default=5, help="每个场景的运行次数（不含预热）")
+    parser.add_argument("--latency", type=float, default=0.05, help="假模型首 token 延迟（秒）")
+    parser.add_argument("--tps", type=float, default=200, help="假模型每秒输出的 token 数")
+    parser.add_argument("--web-latency", type=float, default=0.02, help="搜索和网页的响应延迟（秒）")
+    parser.add_argument("--page-kb", type=int, default=64, help="网页大小（KB）")
+    parser.add_argument("--save-baseline", action="store_true", help="把结果保存为基线")
+    parser.add_argument("--compare", action="store_true", help="与已保存的基线比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对增幅")
+    sys.exit(main(parser.parse_args()))
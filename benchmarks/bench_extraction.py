@@ -0,0 +1,67 @@
+"""
+正文提取吞吐基准
+
+对比在线程池中直接调用 trafilatura（受 GIL 限制）与不同进程数的提取进程池，
+同时提交 N 个合成网页，输出每秒提取的文档数。
+
+用法:
+    uv run python -m benchmarks.bench_extraction --docs 64 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from src.utils.extract_pool import ExtractionPool, extract_markdown
+
+PARAGRAPH = (
+    "<p>今日黄金价格继续上涨，市场避险情绪升温。多家机构上调全年金价预测，"
+    "认为美联储降息预期和央行购金将继续支撑金价。<a href='/news/{i}'>详情</a></p>"
+)
+
+
+def make_document(paragraphs: int = 400) -> str:
+    """生成约 100KB 的合成网页"""
+    body = "".join(PARAGRAPH.format(i=i) for i in range(paragraphs))
+    nav = "".join(f"<li><a href='/c/{i}'>栏目 {i}</a></li>" for i in range(50))
+    return f"<html><head><title>金价</title></head><body><nav><ul>{nav}</ul></nav><article>{body}</article></body></html>"
+
+
+async def bench_threads(doc: str, docs: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(asyncio.to_thread(extract_markdown, doc) for _ in range(docs)))
+    return time.perf_counter() - start
+
+
+async def bench_pool(doc: str, docs: int, workers: int) -> float:
+    pool = ExtractionPool(max_workers=workers, max_queue=docs, timeout=120)
+    try:
+        # 预热：启动子进程并导入 trafilatura
+        await asyncio.gather(*(pool.aextract(doc) for _ in range(workers)))
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.aextract(doc) for _ in range(docs)))
+        return time.perf_counter() - start
+    finally:
+        pool.close()
+
+
+async def main(docs: int, worker_levels: list[int]) -> None:
+    doc = make_document()
+    print(f"文档大小: {len(doc.encode('utf-8')) / 1024:.0f}KB, 文档数: {docs}, CPU 核数: {os.cpu_count()}")
+    extract_markdown(doc)  # 预热导入
+
+    print(f"{'mode':<16} {'elapsed(s)':>12} {'docs/s':>10}")
+    elapsed = await bench_threads(doc, docs)
+    print(f"{'threads(GIL)':<16} {elapsed:>12.3f} {docs / elapsed:>10.1f}")
+    for workers in worker_levels:
+        elapsed = await bench_pool(doc, docs, workers)
+        print(f"{f'processes={workers}':<16} {elapsed:>12.3f} {docs / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="正文提取吞吐基准")
+    parser.add_argument("--docs", type=int, default=64, help="提交的文档数")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, os.cpu_count() or 1], help="进程池大小")
+    args = parser.parse_args()
+    asyncio.run(main(args.docs, sorted(set(args.workers))))
@@ -0,0 +1,313 @@
+"""
+SSE 接口压测
+
+在子进程中启动 benchmarks.fake_services 和 uvicorn（api.main:app，模型、搜索和网页都指向假服务），
+然后用 httpx 同时打开多个 /stream/chat 流式连接，客户端视角记录：
+    - TTFB：从发出请求到收到第一个 SSE 事件
+    - 首个内容事件：第一个 token / message 事件（不含 resume 通知）
+    - 事件间隔：相邻两个事件之间的时间
+    - 总耗时：到收到 done 事件为止
+    - 错误率：非 200 响应、连接异常或流中出现 error 事件
+    - 每个请求的 token 用量（服务端 usage 事件）
+各项给出 p50 / p95 / p99。
+
+场景:
+    chat       普通对话，一次请求完成
+    interrupt  服务端设置 RESEARCH_INTERRUPT_TOOLS，收到 interrupt 事件后
+               使用同一个 thread_id 再次请求恢复执行，chat 与 resume 分开统计
+
+--save-baseline 把结果写入 benchmarks/baselines/sse_<scenario>.json；
+--compare 与已保存的基线比较，延迟超出阈值或错误率上升时以非零状态码退出。
+
+用法:
+    uv run python -m benchmarks.bench_sse --concurrency 16 --requests 64
+    uv run python -m benchmarks.bench_sse --scenario interrupt --mode delta --compare
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.bench_e2e import BASELINE_DIR, compare, percentile, start_services
+
+SCENARIOS = ("chat", "interrupt")
+# interrupt 场景在调用这些工具前中断（与 fake_services 中 research 脚本的工具调用对应）
+INTERRUPT_TOOLS = "read_urls"
+
+COMPARED_METRICS = ("chat.ttfb_p95_s", "chat.first_content_p95_s", "chat.duration_p50_s",
+                    "chat.duration_p99_s", "chat.gap_p99_s", "resume.ttfb_p95_s",
+                    "resume.duration_p50_s", "resume.duration_p99_s")
+MIN_ABSOLUTE_CHANGE = {key: 0.02 for key in COMPARED_METRICS}
+
+
+@dataclass
+class StreamRecord:
+    """单个 SSE 请求的客户端观测结果"""
+    kind: str
+    status: int = 0
+    ttfb: Optional[float] = None
+    first_content: Optional[float] = None
+    duration: float = 0.0
+    gaps: List[float] = field(default_factory=list)
+    events: int = 0
+    error: Optional[str] = None
+    interrupted: bool = False
+    total_tokens: int = 0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_api(base: str, port: int, interrupt_tools: str) -> None:
+    """子进程入口：环境变量指向假服务后再导入 api.main"""
+    from benchmarks.bench_e2e import LocalSearchProvider, configure_env
+
+    configure_env(base)
+    os.environ["RESEARCH_INTERRUPT_TOOLS"] = interrupt_tools
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+
+    import uvicorn
+
+    from src.tools import search
+
+    search.search_provider = LocalSearchProvider(base)
+    uvicorn.run("api.main:app", host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_api(base: str, interrupt_tools: str) -> "tuple[multiprocessing.Process, str]":
+    port = free_port()
+    # 不能是 daemon 进程：api 需要启动正文提取进程池
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve_api, args=(base, port, interrupt_tools))
+    process.start()
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.TransportError:
+            pass
+        if not process.is_alive():
+            break
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("api 服务启动失败")
+
+
+async def stream_once(client: httpx.AsyncClient, url: str, payload: Dict[str, Any],
+                      kind: str) -> StreamRecord:
+    """发起一次 /stream/chat 请求并读完整个流"""
+    record = StreamRecord(kind=kind)
+    start = last = time.perf_counter()
+    try:
+        async with client.stream("POST", f"{url}/stream/chat", json=payload) as response:
+            record.status = response.status_code
+            if response.status_code != 200:
+                record.error = f"http {response.status_code}"
+                return record
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                now = time.perf_counter()
+                if record.ttfb is None:
+                    record.ttfb = now - start
+                else:
+                    record.gaps.append(now - last)
+                last = now
+                record.events += 1
+                event = json.loads(line[len("data: "):])
+                kind_ = event.get("type")
+                if kind_ in ("token", "message") and record.first_content is None:
+                    record.first_content = now - start
+                elif kind_ == "interrupt":
+                    record.interrupted = True
+                elif kind_ == "error":
+                    record.error = event.get("message") or "error event"
+                elif kind_ == "usage":
+                    record.total_tokens = event.get("total_tokens", 0)
+                elif kind_ == "done":
+                    break
+    except httpx.HTTPError as e:
+        record.error = f"{type(e).__name__}: {e}"
+    finally:
+        record.duration = time.perf_counter() - start
+    return record
+
+
+async def session(client: httpx.AsyncClient, url: str, i: int, mode: str) -> List[StreamRecord]:
+    """一个用户会话：发起对话，收到中断后用同一个 thread_id 恢复"""
+    thread_id = f"bench-sse-{i}-{os.getpid()}"
+    records = [await stream_once(client, url, {
+        "message": "最新黄金价格", "thread_id": thread_id, "mode": mode}, "chat")]
+    if records[0].interrupted and records[0].error is None:
+        records.append(await stream_once(client, url, {
+            "message": "", "thread_id": thread_id, "mode": mode}, "resume"))
+    return records
+
+
+async def run_load(url: str, mode: str, concurrency: int, requests: int) -> "tuple[List[StreamRecord], float]":
+    """最多 concurrency 个会话同时在途，共 requests 个会话，返回记录和总耗时"""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(120, connect=10), limits=limits) as client:
+        async def limited(i: int) -> List[StreamRecord]:
+            async with semaphore:
+                return await session(client, url, i, mode)
+
+        # 预热（导入、编译 agent、启动提取进程池），不计入结果
+        await session(client, url, -1, mode)
+        start = time.perf_counter()
+        sessions = await asyncio.gather(*(limited(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    return [record for records in sessions for record in records], elapsed
+
+
+def summarize(records: List[StreamRecord]) -> Dict[str, Any]:
+    """按 p50 / p95 / p99 汇总一类请求"""
+    summary: Dict[str, Any] = {
+        "requests": len(records),
+        "errors": sum(1 for r in records if r.error),
+        "error_rate": sum(1 for r in records if r.error) / len(records) if records else 0.0,
+        "interrupted": sum(1 for r in records if r.interrupted),
+        "events_per_request": sum(r.events for r in records) / len(records) if records else 0.0,
+        "tokens_per_request": sum(r.total_tokens for r in records) / len(records) if records else 0.0,
+    }
+    ok = [r for r in records if not r.error]
+    series = {
+        "ttfb": [r.ttfb for r in ok if r.ttfb is not None],
+        "first_content": [r.first_content for r in ok if r.first_content is not None],
+        "gap": [gap for r in ok for gap in r.gaps],
+        "duration": [r.duration for r in ok],
+    }
+    for name, values in series.items():
+        for q in (50, 95, 99):
+            summary[f"{name}_p{q}_s"] = percentile(values, q / 100) if values else None
+    samples = [r.error for r in records if r.error]
+    if samples:
+        summary["error_samples"] = sorted(set(samples))[:5]
+    return summary
+
+
+def flatten(result: Dict[str, Any]) -> Dict[str, Any]:
+    """把 {kind: {metric: value}} 展开为 kind.metric，供 compare 使用"""
+    return {f"{kind}.{key}": value for kind in ("chat", "resume")
+            for key, value in (result.get(kind) or {}).items()}
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n== {result['scenario']} (mode={result['config']['mode']}, "
+          f"concurrency={result['config']['concurrency']}, sessions={result['config']['requests']}) ==")
+    print(f"elapsed {result['elapsed_s']:.2f}s  throughput {result['sessions_per_s']:.2f} sessions/s")
+    for kind in ("chat", "resume"):
+        item = result.get(kind)
+        if not item:
+            continue
+        print(f"{kind:<7} n={item['requests']:<5} errors {item['errors']} ({item['error_rate']:.1%})  "
+              f"interrupted {item['interrupted']}  events/req {item['events_per_request']:.1f}  "
+              f"tokens/req {item.get('tokens_per_request', 0):.0f}")
+        for name in ("ttfb", "first_content", "gap", "duration"):
+            values = [item[f"{name}_p{q}_s"] for q in (50, 95, 99)]
+            if values[0] is None:
+                continue
+            print(f"        {name:<14} p50 {values[0] * 1000:8.1f}ms  p95 {values[1] * 1000:8.1f}ms  "
+                  f"p99 {values[2] * 1000:8.1f}ms")
+        for sample in item.get("error_samples", []):
+            print(f"        error: {sample}")
+
+
+def check_errors(result: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """错误率只要高于基线就判定为回退"""
+    regressions = []
+    for kind in ("chat", "resume"):
+        old = (baseline.get(kind) or {}).get("error_rate", 0.0)
+        new = (result.get(kind) or {}).get("error_rate", 0.0)
+        if new > old:
+            print(f"{kind + '.error_rate':<28} {old:>12.3f} {new:>12.3f}  REGRESSION")
+            regressions.append(f"{kind}.error_rate")
+    return regressions
+
+
+def run_scenario(name: str, base: str, args) -> Dict[str, Any]:
+    process, url = start_api(base, INTERRUPT_TOOLS if name == "interrupt" else "")
+    try:
+        records, elapsed = asyncio.run(run_load(url, args.mode, args.concurrency, args.requests))
+    finally:
+        process.terminate()
+        process.join(10)
+    result: Dict[str, Any] = {
+        "scenario": name,
+        "elapsed_s": elapsed,
+        "sessions_per_s": args.requests / elapsed,
+        "chat": summarize([r for r in records if r.kind == "chat"]),
+    }
+    resumes = [r for r in records if r.kind == "resume"]
+    if resumes:
+        result["resume"] = summarize(resumes)
+    return result
+
+
+def main(args) -> int:
+    process, base = start_services(args)
+    try:
+        config = {"mode": args.mode, "concurrency": args.concurrency, "requests": args.requests,
+                  "latency": args.latency, "tps": args.tps,
+                  "web_latency": args.web_latency, "page_kb": args.page_kb}
+        names = SCENARIOS if args.scenario == "all" else (args.scenario,)
+        regressions = []
+        for name in names:
+            result = run_scenario(name, base, args)
+            result["config"] = config
+            print_report(result)
+
+            path = BASELINE_DIR / f"sse_{name}.json"
+            if args.compare:
+                if path.exists():
+                    baseline = json.loads(path.read_text())
+                    if baseline.get("config") != config:
+                        print(f"warning: baseline config differs: {baseline.get('config')}")
+                    found = compare(flatten(result), flatten(baseline), args.threshold,
+                                    COMPARED_METRICS, MIN_ABSOLUTE_CHANGE)
+                    found += check_errors(result, baseline)
+                    regressions += [f"{name}.{key}" for key in found]
+                else:
+                    print(f"no baseline at {path}")
+            if args.save_baseline:
+                BASELINE_DIR.mkdir(exist_ok=True)
+                path.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+                print(f"baseline saved to {path}")
+        if regressions:
+            print(f"\nregressions: {', '.join(regressions)}")
+            return 1
+        return 0
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SSE 接口压测")
+    parser.add_argument("--scenario", choices=(*SCENARIOS, "all"), default="all")
+    parser.add_argument("--mode", choices=("values", "delta", "tokens"), default="tokens",
+                        help="/stream/chat 的流式输出模式")
+    parser.add_argument("--concurrency", type=int, default=16, help="同时在途的会话数")
+    parser.add_argument("--requests", type=int, default=64, help="会话总数（不含预热）")
+    parser.add_argument("--latency", type=float, default=0.05, help="假模型首 token 延迟（秒）")
+    parser.add_argument("--tps", type=float, default=200, help="假模型每秒输出的 token 数")
+    parser.add_argument("--web-latency", type=float, default=0.02, help="搜索和网页的响应延迟（秒）")
+    parser.add_argument("--page-kb", type=int, default=64, help="网页大小（KB）")
+    parser.add_argument("--save-baseline", action="store_true", help="把结果保存为基线")
+    parser.add_argument("--compare", action="store_true", help="与已保存的基线比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对增幅")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,147 @@
+"""
+SSE 事件编码与合并写出的微基准
+
+1. 编码：把 tokens 模式的 token 事件编码为 SSE 帧，对比原来的
+   json.dumps(ensure_ascii=False) + f-string + encode、标准库 json 直接编码 bytes 和 orjson
+2. 转发：生产者逐个写入 StreamBuffer，由 api.main.relay 转发，每次写出调用一次 os.write
+   （写到 /dev/null），对比不同的 SSE_COALESCE_MS 窗口下的写出次数。生产者分别以
+   不限速（每个事件之间只让出一次事件循环）和按 --interval-ms 间隔产生事件（模拟模型
+   逐个返回 token）两种方式运行，窗口只在转发方追上生产者、需要等待时起作用
+
+输出每种方式的 events/s 和每个事件的 CPU 时间（process_time）。
+
+用法:
+    uv run python -m benchmarks.bench_sse_encoding --events 20000 --windows 0 2 5 --interval-ms 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from unittest.mock import patch
+
+from src.utils import sse
+from src.utils.stream_buffer import StreamBuffer
+
+CONTENT = "金价"
+
+
+def token_events(count: int) -> List[Dict[str, Any]]:
+    return [{"type": "token", "content": CONTENT, "id": "run-8f3c2d1e-0b7a-4c4e-9f55-2d3c1a0e6b7f",
+             "node": "research"} for _ in range(count)]
+
+
+def legacy_frame(event: Dict[str, Any]) -> bytes:
+    json_data = json.dumps(event, ensure_ascii=False)
+    return f"data: {json_data}\n\n".encode("utf-8")
+
+
+def measure(fn: Callable[[], int]) -> Tuple[float, float, int]:
+    """返回 (耗时, CPU 时间, fn 的返回值)"""
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = fn()
+    return time.perf_counter() - wall, time.process_time() - cpu, result
+
+
+def bench_encoding(events: List[Dict[str, Any]]) -> List[Tuple[str, float, float]]:
+    encoders: List[Tuple[str, Callable[[Dict[str, Any]], bytes]]] = [("legacy", legacy_frame)]
+    for name in ("json", "orjson"):
+        try:
+            sse.set_serializer(name)
+        except ImportError:
+            continue
+        dumps = sse.dumps
+        encoders.append((name, lambda event, dumps=dumps: b"data: " + dumps(event) + b"\n\n"))
+    sse.set_serializer(sse.SSE_SERIALIZER)
+
+    results = []
+    for name, encode in encoders:
+        encode(events[0])
+        wall, cpu, _ = measure(lambda: sum(len(encode(event)) for event in events))
+        results.append((name, len(events) / wall, cpu / len(events)))
+    return results
+
+
+class IdleRequest:
+    """不会断开的请求"""
+
+    async def receive(self) -> Dict[str, Any]:
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+
+async def relay_run(events: List[Dict[str, Any]], window_ms: float, legacy: bool,
+                    interval: float) -> int:
+    """返回写出次数"""
+    from api.main import relay
+
+    buffer = StreamBuffer("bench", max_events=len(events) + 1)
+    sink = os.open(os.devnull, os.O_WRONLY)
+
+    async def produce() -> None:
+        try:
+            for event in events:
+                buffer.append(legacy_frame(event) if legacy else sse.sse_frame(event))
+                await asyncio.sleep(interval)
+        finally:
+            buffer.finish()
+
+    buffer.start(asyncio.create_task(produce()))
+    writes = 0
+    try:
+        with patch("api.main.SSE_COALESCE_MS", window_ms):
+            if legacy:
+                # 原来的转发方式：每个事件单独写出
+                async for event_id, data in _one_by_one(buffer):
+                    os.write(sink, b"id: %d\n%s" % (event_id, data))
+                    writes += 1
+            else:
+                async for chunk in relay(buffer, 0, IdleRequest()):  # type: ignore[arg-type]
+                    os.write(sink, chunk)
+                    writes += 1
+    finally:
+        os.close(sink)
+    return writes
+
+
+async def _one_by_one(buffer: StreamBuffer):
+    async for batch in buffer.iter_batches(0):
+        for event in batch:
+            yield event
+
+
+def bench_relay(events: List[Dict[str, Any]], windows: List[float],
+                interval: float) -> List[Tuple[str, float, float, int]]:
+    cases = [("legacy", 0.0, True)] + [(f"coalesce {window:g}ms", window, False) for window in windows]
+    results = []
+    for name, window, legacy in cases:
+        wall, cpu, writes = measure(lambda: asyncio.run(relay_run(events, window, legacy, interval)))
+        results.append((name, len(events) / wall, cpu / len(events), writes))
+    return results
+
+
+def main(count: int, windows: List[float], interval_ms: float) -> None:
+    events = token_events(count)
+    print(f"events={count}, serializer={sse.serializer_name()}")
+
+    print(f"\n编码\n{'method':<16} {'events/s':>12} {'cpu/event':>12}")
+    for name, rate, cpu in bench_encoding(events):
+        print(f"{name:<16} {rate:>12,.0f} {cpu * 1e6:>10.2f}us")
+
+    for interval in (0.0, interval_ms / 1000):
+        title = "不限速" if interval == 0 else f"每 {interval_ms:g}ms 一个事件"
+        print(f"\n转发（{title}）\n"
+              f"{'method':<16} {'events/s':>12} {'cpu/event':>12} {'writes':>8} {'events/write':>13}")
+        for name, rate, cpu, writes in bench_relay(events, windows, interval):
+            print(f"{name:<16} {rate:>12,.0f} {cpu * 1e6:>10.2f}us {writes:>8} {count / writes:>13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SSE 事件编码与合并写出的微基准")
+    parser.add_argument("--events", type=int, default=20000, help="事件数")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5],
+                        help="对比的 SSE_COALESCE_MS 窗口（毫秒）")
+    parser.add_argument("--interval-ms", type=float, default=0.5, help="限速时生产者产生事件的间隔（毫秒）")
+    args = parser.parse_args()
+    main(args.events, args.windows, args.interval_ms)
@@ -0,0 +1,130 @@
+"""
+冷启动基准
+
+在全新的子进程中以 python -X importtime 导入目标模块（默认 api.main），输出：
+    - 导入总耗时（多次运行取中位数，这些运行不开启 importtime，避免计时被放大）
+    - 首次使用的延迟初始化耗时（创建 K2 模型，包含 langchain_openai 的导入）
+    - 按顶层包汇总的导入耗时，以及项目内各模块的自身 / 累计耗时（模块级初始化代码计入自身耗时）
+
+超出 --budget 或启动时导入了 DEFERRED_MODULES 中的模块时以非零状态码退出，
+后者与机器快慢无关，可以防止有人把重依赖重新放回导入路径上。
+
+用法:
+    uv run python -m benchmarks.bench_startup
+    uv run python -m benchmarks.bench_startup --module src.agents.dynamic_agent --top 30
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List
+
+# api.main 冷启动的目标耗时（秒）
+COLD_START_BUDGET_S = 2.5
+# 只应在首次使用时导入的模块
+DEFERRED_MODULES = ("langchain_openai", "openai", "trafilatura", "pandas", "matplotlib",
+                    "seaborn", "src.agents.dynamic_agent")
+PROJECT_PACKAGES = ("src", "api")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+modules = len(sys.modules)
+from src.llms.fz import get_k2_chat_model
+get_k2_chat_model()
+first_use = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "first_use_s": first_use - imported,
+    "modules": modules,
+}}))
+"""
+
+
+def run_probe(module: str, profile: bool = False) -> Dict[str, Any]:
+    """在子进程中导入一次，返回耗时和加载的模块数，profile 时附带 importtime 记录"""
+    env = dict(os.environ)
+    env.setdefault("ARK_API_KEY", "bench")
+    env.setdefault("OPEN_AI_API_KEY", "bench")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    code = PROBE.format(module=module)
+    command = [sys.executable, *(("-X", "importtime") if profile else ()), "-c", code]
+    completed = subprocess.run(command, capture_output=True, text=True, env=env, check=True)
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if not profile:
+        return result
+    # importtime 在模块导入完成时输出记录，目标模块本身是导入阶段的最后一条，
+    # 之后的记录属于首次使用
+    records = []
+    for line in completed.stderr.splitlines():
+        parts = [part.strip() for part in line.removeprefix("import time:").split("|")]
+        if len(parts) != 3 or not parts[0].isdigit():
+            continue
+        records.append({"name": parts[2], "self_s": int(parts[0]) / 1e6,
+                        "cumulative_s": int(parts[1]) / 1e6})
+        if parts[2] == module:
+            break
+    result["records"] = records
+    return result
+
+
+def summarize(records: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    by_package: Dict[str, float] = defaultdict(float)
+    for record in records:
+        by_package[record["name"].split(".")[0]] += record["self_s"]
+    project = [r for r in records if r["name"].split(".")[0] in PROJECT_PACKAGES]
+    return {
+        "packages": dict(sorted(by_package.items(), key=lambda item: -item[1])[:top]),
+        "project_modules": sorted(project, key=lambda r: -r["cumulative_s"])[:top],
+    }
+
+
+def print_report(module: str, runs: List[Dict[str, Any]], summary: Dict[str, Any]) -> None:
+    imports = [r["import_s"] for r in runs]
+    first_use = [r["first_use_s"] for r in runs]
+    print(f"== import {module} ({len(runs)} runs) ==")
+    print(f"import      median {statistics.median(imports):.3f}s  min {min(imports):.3f}s  "
+          f"max {max(imports):.3f}s  modules {runs[-1]['modules']}")
+    print(f"first use   median {statistics.median(first_use):.3f}s  (get_k2_chat_model)")
+    print("\nself time by top-level package:")
+    for name, seconds in summary["packages"].items():
+        print(f"  {name:<32} {seconds * 1000:8.1f}ms")
+    print("\nproject modules (cumulative / self):")
+    for record in summary["project_modules"]:
+        print(f"  {record['name']:<40} {record['cumulative_s'] * 1000:8.1f}ms "
+              f"{record['self_s'] * 1000:8.1f}ms")
+
+
+def main(args) -> int:
+    runs = [run_probe(args.module) for _ in range(args.runs)]
+    records = run_probe(args.module, profile=True)["records"]
+    print_report(args.module, runs, summarize(records, args.top))
+
+    failures = []
+    median = statistics.median(r["import_s"] for r in runs)
+    if args.budget and median > args.budget:
+        failures.append(f"import took {median:.3f}s, budget {args.budget:.3f}s")
+    loaded = {r["name"] for r in records}
+    eager = [m for m in DEFERRED_MODULES if m in loaded and m != args.module]
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    if failures:
+        print("\n" + "\n".join(f"FAIL {failure}" for failure in failures))
+        return 1
+    print(f"\nok: within {args.budget:.3f}s budget, deferred modules not loaded")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="冷启动基准")
+    parser.add_argument("--module", default="api.main", help="要导入的模块")
+    parser.add_argument("--runs", type=int, default=5, help="运行次数")
+    parser.add_argument("--top", type=int, default=15, help="输出的包 / 模块数量")
+    parser.add_argument("--budget", type=float, default=COLD_START_BUDGET_S,
+                        help="导入耗时上限（秒），0 表示不检查")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,61 @@
+"""
+基准测试用的本地假模型
+
+模拟固定延迟的 LLM 调用，不访问任何外部服务。
+"""
+import asyncio
+import time
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# coordinator 节点需要 JSON 输出，research 节点直接把它当作最终回答
+DEFAULT_RESPONSE = '{"user_input_optimized": "最新黄金价格走势"}'
+
+
+class SleepyChatModel(BaseChatModel):
+    """按固定延迟返回固定内容的假模型。
+
+    同步调用使用 time.sleep（阻塞线程），异步调用使用 asyncio.sleep（让出事件循环），
+    用于对比阻塞与非阻塞节点在并发下的表现。
+    """
+
+    latency: float = 0.2
+    response: str = DEFAULT_RESPONSE
+
+    @property
+    def _llm_type(self) -> str:
+        return "sleepy-fake"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "SleepyChatModel":
+        # 假模型不会发起工具调用，直接返回自身即可
+        return self
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
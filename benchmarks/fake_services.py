@@ -0,0 +1,325 @@
+"""
+端到端基准用的本地假服务
+
+一个本地 HTTP 服务同时提供：
+    POST /v1/chat/completions  OpenAI 兼容的假模型（支持 stream），按系统提示词匹配脚本，
+                               返回预设的回答或工具调用；可配置首 token 延迟和每秒 token 数
+    GET  /search?q=...         代替搜索服务，返回指向本服务 /pages 的结果
+    GET  /pages/<id>           代替网页，返回一篇固定大小的文章
+    GET  /stats                按脚本统计的请求数、prompt / completion tokens
+    POST /reset                清空统计
+
+脚本中字符串里的 {web} 会替换为本服务的地址，例如工具调用参数 {"url": "{web}/pages/1"}。
+fail_status 不为空时模型接口返回该状态码（用于测试模型路由的故障切换）。
+
+单独启动:
+    uv run python -m benchmarks.fake_services --port 8900 --latency 0.05 --tps 200
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from src.utils.tokens import count_tokens
+
+ANSWER = (
+    "根据检索到的资料，近一周国际金价整体震荡上行，现货黄金一度突破历史高位。"
+    "主要驱动因素包括美联储降息预期升温、地缘政治风险上升以及多国央行持续增持黄金储备。"
+    "短期来看，美元指数走弱对金价形成支撑，但获利了结压力可能带来波动。"
+    "建议关注本周公布的通胀数据和央行议息会议结果。"
+)
+
+PARAGRAPH = "<p>今日黄金价格上涨，市场避险情绪升温，多家机构上调了全年金价预测。</p>"
+
+# 每个脚本：marker 出现在系统提示词中时使用；step_by 决定第几步：
+#   tool_results（默认）：最后一条用户消息之后的工具结果数，即 ReAct 循环的轮次
+#   user_messages：用户消息数 - 1（planner 首轮只有目标，之后附带进度和子任务结果）
+DEFAULT_SCRIPTS: Dict[str, Dict[str, Any]] = {
+    "coordinator": {
+        "marker": "你是一个友好的AI助手",
+        "steps": [{"content": '{"user_input_optimized": "最新黄金价格走势"}'}],
+    },
+    "research": {
+        "marker": "helpful research assistant",
+        "steps": [
+            {"tool_calls": [{"name": "search_web", "args": {"query": "最新黄金价格"}}]},
+            {"tool_calls": [{"name": "read_urls", "args": {"urls": ["{web}/pages/1", "{web}/pages/2"]}}]},
+            {"content": ANSWER},
+        ],
+    },
+    "planner": {
+        "marker": "Dynamic Planner",
+        "step_by": "user_messages",
+        "steps": [
+            {"content": json.dumps({
+                "progress_list": "- [ ] 查询金价\n- [ ] 查询银价",
+                "next_action": "continue",
+                "subtasks": ["搜索最新黄金价格并阅读来源", "搜索最新白银价格并阅读来源"],
+            }, ensure_ascii=False)},
+            {"content": json.dumps({
+                "progress_list": "- [x] 查询金价\n- [x] 查询银价",
+                "next_action": "finish",
+            }, ensure_ascii=False)},
+        ],
+    },
+    "actor_factory": {
+        "marker": "Actor Factory",
+        "steps": [{"content": '{"actor_persona": "贵金属市场分析师", "actor_tools": ["search_web", "read_url"]}'}],
+    },
+    "dynamic_actor": {
+        "marker": "Dynamic Actor",
+        "steps": [
+            {"tool_calls": [{"name": "search_web", "args": {"query": "最新贵金属价格"}}]},
+            {"tool_calls": [{"name": "read_url_by_markdown", "args": {"url": "{web}/pages/3"}}]},
+            {"content": ANSWER},
+        ],
+    },
+}
+
+
+def _substitute(value: Any, web: str) -> Any:
+    if isinstance(value, str):
+        return value.replace("{web}", web)
+    if isinstance(value, list):
+        return [_substitute(v, web) for v in value]
+    if isinstance(value, dict):
+        return {k: _substitute(v, web) for k, v in value.items()}
+    return value
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    tokens = 0
+    for message in messages:
+        tokens += 4 + count_tokens(_content_text(message.get("content")))
+        for call in message.get("tool_calls") or []:
+            tokens += count_tokens(call.get("function", {}).get("arguments", ""))
+    return tokens
+
+
+class FakeServices:
+    """假服务的配置、脚本和统计（请求处理线程共享）"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        tps: float = 200.0,
+        web_latency: float = 0.02,
+        page_kb: int = 64,
+        scripts: Optional[Dict[str, Dict[str, Any]]] = None,
+        fail_status: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.fail_status = fail_status
+        self.failures = 0
+        self.tps = tps
+        self.web_latency = web_latency
+        self.page = (
+            "<html><head><title>黄金价格</title></head><body><article>"
+            + PARAGRAPH * (page_kb * 1024 // len(PARAGRAPH.encode("utf-8")) + 1)
+            + "</article></body></html>"
+        ).encode("utf-8")
+        self.scripts = scripts or DEFAULT_SCRIPTS
+        self.web = ""
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def match(self, messages: List[Dict[str, Any]]) -> "tuple[str, Dict[str, Any]]":
+        system = "".join(_content_text(m.get("content")) for m in messages if m.get("role") == "system")
+        for name, script in self.scripts.items():
+            if script["marker"] in system:
+                return name, script
+        return "default", {"steps": [{"content": ANSWER}]}
+
+    @staticmethod
+    def step(script: Dict[str, Any], messages: List[Dict[str, Any]]) -> int:
+        roles = [m.get("role") for m in messages]
+        if script.get("step_by") == "user_messages":
+            index = roles.count("user") - 1
+        else:
+            last_user = max((i for i, r in enumerate(roles) if r == "user"), default=-1)
+            index = roles[last_user + 1:].count("tool")
+        return min(max(index, 0), len(script["steps"]) - 1)
+
+    def reply(self, body: Dict[str, Any]) -> "tuple[str, Dict[str, Any], int, int]":
+        """返回 (脚本名, 回复消息, prompt tokens, completion tokens)"""
+        messages = body.get("messages") or []
+        name, script = self.match(messages)
+        step = _substitute(script["steps"][self.step(script, messages)], self.web)
+        message: Dict[str, Any] = {"role": "assistant", "content": step.get("content", "")}
+        completion = count_tokens(message["content"])
+        if step.get("tool_calls"):
+            message["tool_calls"] = []
+            for call in step["tool_calls"]:
+                arguments = json.dumps(call["args"], ensure_ascii=False)
+                completion += count_tokens(arguments)
+                message["tool_calls"].append({
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": arguments},
+                })
+        prompt = _prompt_tokens(messages)
+        with self._lock:
+            entry = self.stats.setdefault(
+                name, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            entry["requests"] += 1
+            entry["prompt_tokens"] += prompt
+            entry["completion_tokens"] += completion
+        return name, message, prompt, max(completion, 1)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+
+def make_handler(services: FakeServices):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _json(self, payload: Any, status: int = 200) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == "/stats":
+                return self._json(services.snapshot())
+            if parts.path == "/search":
+                time.sleep(services.web_latency)
+                query = parse_qs(parts.query).get("q", [""])[0]
+                max_results = int(parse_qs(parts.query).get("max_results", ["5"])[0])
+                return self._json([
+                    {"title": f"{query} #{i}", "body": f"关于 {query} 的第 {i} 条结果摘要",
+                     "href": f"{services.web}/pages/{i}"}
+                    for i in range(1, max_results + 1)
+                ])
+            if parts.path.startswith("/pages/"):
+                time.sleep(services.web_latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(services.page)))
+                self.end_headers()
+                self.wfile.write(services.page)
+                return
+            self._json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/reset":
+                services.reset()
+                return self._json({"ok": True})
+            if not self.path.endswith("/chat/completions"):
+                return self._json({"error": "not found"}, 404)
+            if services.fail_status:
+                time.sleep(services.latency)
+                with services._lock:
+                    services.failures += 1
+                return self._json({"error": {"message": "fake failure", "type": "server_error"}},
+                                  services.fail_status)
+
+            _, message, prompt, completion = services.reply(body)
+            usage = {"prompt_tokens": prompt, "completion_tokens": completion,
+                     "total_tokens": prompt + completion}
+            base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()),
+                    "model": body.get("model") or "fake"}
+            time.sleep(services.latency)
+            if body.get("stream"):
+                return self._stream(base, message, completion, usage,
+                                    (body.get("stream_options") or {}).get("include_usage"))
+            if services.tps > 0:
+                time.sleep(completion / services.tps)
+            finish = "tool_calls" if message.get("tool_calls") else "stop"
+            self._json({**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": message, "finish_reason": finish}]})
+
+        def _stream(self, base, message, completion, usage, include_usage) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send(delta=None, finish=None, extra=None):
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": delta or {}, "finish_reason": finish}] if delta is not None else []}
+                chunk.update(extra or {})
+                data = f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            send({"role": "assistant", "content": ""})
+            content = message.get("content") or ""
+            # 约 4 个字符一个 token 分块输出
+            pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+            for piece in pieces:
+                if services.tps > 0:
+                    time.sleep(1 / services.tps)
+                send({"content": piece})
+            for index, call in enumerate(message.get("tool_calls") or []):
+                send({"tool_calls": [{"index": index, **call}]})
+            send({}, "tool_calls" if message.get("tool_calls") else "stop")
+            if include_usage:
+                send(None, extra={"usage": usage})
+            done = b"data: [DONE]\n\n"
+            self.wfile.write(f"{len(done):x}\r\n".encode() + done + b"\r\n0\r\n\r\n")
+            self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def make_server(services: FakeServices, port: int = 0) -> ThreadingHTTPServer:
+    httpd = ThreadingHTTPServer(("127.0.0.1", port), make_handler(services))
+    httpd.daemon_threads = True
+    services.web = f"http://127.0.0.1:{httpd.server_address[1]}"
+    return httpd
+
+
+def start_in_thread(services: FakeServices) -> ThreadingHTTPServer:
+    """在后台线程中启动假服务（随机端口，地址为 services.web），用完调用 shutdown()"""
+    httpd = make_server(services)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def serve(port: int, latency: float, tps: float, web_latency: float, page_kb: int,
+          ready: Any = None, fail_status: Optional[int] = None) -> None:
+    """启动假服务并一直运行（可在子进程中调用，ready 为启动后写入端口的队列）"""
+    services = FakeServices(latency, tps, web_latency, page_kb, fail_status=fail_status)
+    httpd = make_server(services, port)
+    if ready is not None:
+        ready.put(httpd.server_address[1])
+    httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="端到端基准用的本地假服务")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.05, help="模型首 token 延迟（秒）")
+    parser.add_argument("--tps", type=float, default=200, help="模型每秒输出的 token 数，0 表示不限")
+    parser.add_argument("--web-latency", type=float, default=0.02, help="搜索和网页的响应延迟（秒）")
+    parser.add_argument("--page-kb", type=int, default=64, help="网页大小（KB）")
+    parser.add_argument("--fail-status", type=int, default=None, help="模型接口固定返回的错误状态码")
+    args = parser.parse_args()
+    print(f"fake services listening on http://127.0.0.1:{args.port}")
+    serve(args.port, args.latency, args.tps, args.web_latency, args.page_kb,
+          fail_status=args.fail_status)
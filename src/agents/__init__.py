@@ -1,15 +1,42 @@
 """
 Agent 模块
+
+导出项在首次访问时才导入对应子模块：api 只用到 research 工作流，
+不需要为此加载 dynamic_agent 的整张图和各节点的依赖。
 """
-from src.agents.planner import planner_node
-from src.agents.actor_factory import actor_factory_node
-from src.agents.dynamic_actor import dynamic_actor_node
-from src.agents.dynamic_agent import dynamic_agent
-from src.agents.research import research_agent
-__all__ = [
-    'planner_node',
-    'actor_factory_node',
-    'dynamic_actor_node',
-    'dynamic_agent',
-    'research_agent',
-]
+import importlib
+import sys
+import types
+
+_EXPORTS = {
+    'planner_node': 'src.agents.planner',
+    'actor_factory_node': 'src.agents.actor_factory',
+    'dynamic_actor_node': 'src.agents.dynamic_actor',
+    'dynamic_agent': 'src.agents.dynamic_agent',
+    'research_agent': 'src.agents.research',
+    'agent_cache': 'src.agents.agent_cache',
+    'AgentCache': 'src.agents.agent_cache',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    # 缓存到包的命名空间，之后不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+class _AgentsPackage(types.ModuleType):
+    def __setattr__(self, name, value):
+        # 导入子模块 src.agents.dynamic_agent 时导入系统会把同名属性设为子模块，
+        # 这里替换为其中的图对象，与之前在包初始化时导入的行为一致
+        if name in _EXPORTS and isinstance(value, types.ModuleType):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _AgentsPackage
@@ -1,22 +1,48 @@
+import time
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import JsonOutputParser
 from src.state import State
 from src.prompts.template import apply_prompt_template
-from src.llms.fz import fz_k2_chat_model
+from src.llms.router import routed_model
+from src.llms.response_cache import cached_model
+from src.agents.tool_selector import tool_selector
+from src.monitoring.logger import get_logger
+from src.monitoring.metrics import metrics, timed
 
-# Initialize LLM
-llm = fz_k2_chat_model
+logger = get_logger(__name__)
 
+# Initialize LLM (LLM_CACHE_NODES 包含 actor_factory 时复用缓存的响应)
+llm = None
 
-def actor_factory_node(state: State):
+
+def get_llm():
+    """返回本节点使用的模型，首次调用时创建（测试可以直接替换模块的 llm）"""
+    global llm
+    if llm is None:
+        llm = cached_model(routed_model("actor_factory"), "actor_factory")
+    return llm
+
+
+@timed("node", "actor_factory")
+async def actor_factory_node(state: State):
     """
     The Actor Factory Node (The Builder).
     Creates a persona and selects tools for the current subtask.
+
+    本地选择器把握足够时直接返回，否则调用 LLM，并用 LLM 的选择更新选择器的统计。
     """
     current_subtask = state.get("current_subtask")
     if not current_subtask:
         return {}
 
+    decision = tool_selector.select(current_subtask)
+    if tool_selector.should_skip_llm(decision):
+        tool_selector.record_local(decision)
+        return {
+            "actor_persona": tool_selector.persona(current_subtask, state.get("locale", "en-US")),
+            "actor_tools": decision.tools,
+        }
+
     messages = [
         SystemMessage(content=apply_prompt_template(
             "actor_factory_prompt", state)),
@@ -24,16 +50,20 @@ def actor_factory_node(state: State):
     ]
 
     parser = JsonOutputParser()
-    chain = llm | parser
+    chain = get_llm() | parser
 
     try:
-        result = chain.invoke(messages)
-        print('actor_factory_node result', result)
+        start = time.perf_counter()
+        result = await chain.ainvoke(messages)
+        logger.debug("actor_factory_node result: %s", result)
+        tool_selector.learn(current_subtask, result.get("actor_tools"),
+                            decision, time.perf_counter() - start)
 
         return {
             "actor_persona": result.get("actor_persona"),
             "actor_tools": result.get("actor_tools")
         }
     except Exception as e:
-        print(f"Actor Factory Error: {e}")
+        metrics.count_error("node", "actor_factory")
+        logger.warning("Actor Factory Error: %s", e)
         return {}
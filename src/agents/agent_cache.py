@@ -0,0 +1,153 @@
+"""
+子 agent 缓存
+
+create_agent 每次调用都会重新编译整张 agent 图、生成工具 schema。
+这里按 (model, 工具集合, prompt 模板, locale) 缓存编译结果，
+系统提示词改为在调用时通过 runtime context 注入，因此同一个编译好的 agent
+可以在不同请求、不同步骤之间复用。额外传入的中间件按名称参与缓存 key。
+
+用法:
+    agent = agent_cache.get_or_create(
+        model=get_k2_chat_model(),
+        tools=[search_web],
+        prompt_name="research_prompt",
+    )
+    result = await agent.ainvoke(
+        {"messages": [...]},
+        context={"system_prompt": apply_prompt_template("research_prompt", {})},
+    )
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Sequence, Tuple, TypedDict
+
+from langchain.agents import create_agent
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, dynamic_prompt
+from langchain_core.language_models import BaseChatModel
+from langchain_core.tools import BaseTool
+
+# 缓存的最大 agent 数量，超出后按 LRU 淘汰
+DEFAULT_MAX_SIZE = 64
+
+
+class AgentContext(TypedDict, total=False):
+    """缓存 agent 的 runtime context"""
+    system_prompt: str
+
+
+@dynamic_prompt
+def context_system_prompt(request: ModelRequest) -> str:
+    """从 runtime context 中读取本次调用渲染好的系统提示词"""
+    context = request.runtime.context or {}
+    return context.get("system_prompt", "")
+
+
+def _tool_name(tool: Any) -> str:
+    if isinstance(tool, BaseTool):
+        return tool.name
+    return getattr(tool, "__name__", repr(tool))
+
+
+class AgentCache:
+    """带 LRU 淘汰和命中统计的 agent 缓存（线程安全）"""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._agents: "OrderedDict[Tuple[Hashable, ...], Tuple[BaseChatModel, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        model: BaseChatModel,
+        tools: Sequence[Any],
+        prompt_name: str,
+        locale: str = "en-US",
+        middleware: Sequence[AgentMiddleware] = (),
+    ) -> Tuple[Hashable, ...]:
+        """生成缓存 key
+
+        模型使用对象 id 区分（同名模型可能有不同参数），工具按名称排序后组成集合，
+        中间件按顺序使用名称。
+        """
+        model_name = getattr(model, "model_name", None) or type(model).__name__
+        tool_names = tuple(sorted(_tool_name(t) for t in tools))
+        middleware_names = tuple(m.name for m in middleware)
+        return (model_name, id(model), tool_names, prompt_name, locale, middleware_names)
+
+    def get_or_create(
+        self,
+        model: BaseChatModel,
+        tools: Sequence[Any],
+        prompt_name: str,
+        locale: str = "en-US",
+        middleware: Sequence[AgentMiddleware] = (),
+    ) -> Any:
+        """获取缓存的 agent，不存在时编译并放入缓存
+
+        Args:
+            model: 聊天模型
+            tools: 工具列表
+            prompt_name: 系统提示词模板名称（仅用于区分缓存项，提示词在调用时注入）
+            locale: 提示词语言
+            middleware: 额外的 agent 中间件，会排在系统提示词中间件之后
+
+        Returns:
+            编译好的 agent，调用时需要传入 context={"system_prompt": ...}
+        """
+        key = self.make_key(model, tools, prompt_name, locale, middleware)
+        with self._lock:
+            entry = self._agents.get(key)
+            if entry is not None:
+                self._agents.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # 编译放在锁外，避免阻塞其他节点的缓存查询
+        agent = create_agent(
+            model=model,
+            tools=list(tools),
+            middleware=[context_system_prompt, *middleware],
+            context_schema=AgentContext,
+        )
+
+        with self._lock:
+            # 并发编译时以先写入的为准，保证所有调用方拿到同一个实例
+            entry = self._agents.get(key)
+            if entry is not None:
+                self._agents.move_to_end(key)
+                return entry[1]
+            # 同时保存 model 引用，防止对象被回收后 id 被复用
+            self._agents[key] = (model, agent)
+            while len(self._agents) > self.max_size:
+                self._agents.popitem(last=False)
+                self.evictions += 1
+        return agent
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._agents),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        """清空缓存和统计"""
+        with self._lock:
+            self._agents.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+# 进程级共享缓存
+agent_cache = AgentCache()
@@ -1,5 +1,4 @@
 from typing import List, cast
-from langchain.agents import create_agent
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
@@ -7,10 +6,25 @@ from src.state import State, init_agent_state
 from src.prompts.template import apply_prompt_template
 from src.tools.search import search_web
 from src.tools.read_url import read_url_by_markdown
-from src.llms.fz import fz_k2_chat_model
+from src.tools.read_urls import read_urls
+from src.llms.router import routed_model
+from src.agents.agent_cache import agent_cache
+from src.middlewares.compaction import message_compaction
+from src.monitoring.logger import get_logger
+from src.monitoring.metrics import metrics, timed
+
+logger = get_logger(__name__)
 
 # Initialize LLM
-llm = fz_k2_chat_model
+llm = None
+
+
+def get_llm():
+    """返回本节点使用的模型，首次调用时创建（测试可以直接替换模块的 llm）"""
+    global llm
+    if llm is None:
+        llm = routed_model("dynamic_actor")
+    return llm
 
 
 @tool
@@ -37,6 +51,7 @@ def get_tools_by_names(tool_names: List[str]):
         tools.append(search_web)
     if "read_url" in tool_names:
         tools.append(read_url_by_markdown)
+        tools.append(read_urls)
 
     # Always add update_progress
     tools.append(update_progress)
@@ -44,7 +59,8 @@ def get_tools_by_names(tool_names: List[str]):
     return tools
 
 
-def dynamic_actor_node(state: State):
+@timed("node", "dynamic_actor")
+async def dynamic_actor_node(state: State):
     """
     The Dynamic Actor Node (The Worker).
     Executes the subtask using a specific persona and tools.
@@ -66,16 +82,22 @@ def dynamic_actor_node(state: State):
         state,
     )
 
-    # Create agent
-
-    agent = create_agent(model=llm, tools=tools, system_prompt=system_prompt)
+    # Reuse the compiled agent for this tool set; the prompt is injected per call
+    agent = agent_cache.get_or_create(
+        model=get_llm(),
+        tools=tools,
+        prompt_name="dynamic_actor_prompt",
+        middleware=[message_compaction],
+    )
 
     state["messages"].append(HumanMessage(content=current_subtask))
 
     try:
-        result = agent.invoke(
-            {"messages": [HumanMessage(content=current_subtask)]})
-        print('dynamic_actor_node result', result)
+        result = await agent.ainvoke(
+            {"messages": [HumanMessage(content=current_subtask)]},
+            context={"system_prompt": system_prompt},
+        )
+        logger.debug("dynamic_actor_node result: %s", result)
 
         # Extract the final response
         messages = result.get("messages", [])
@@ -92,6 +114,8 @@ def dynamic_actor_node(state: State):
             # "task_history": state.get("task_history", []) + [f"Subtask: {current_subtask}\nResult: {content}"]
         }
     except Exception as e:
+        metrics.count_error("node", "dynamic_actor")
+        logger.warning("Dynamic Actor Error: %s", e)
         return {
             "subtask_result": {
                 "status": "failed",
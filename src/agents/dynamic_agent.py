@@ -1,72 +1,155 @@
+import asyncio
 import json
+import os
+from typing import List, Optional, TypedDict
 from src.agents.dynamic_actor import dynamic_actor_node
 from src.agents.actor_factory import actor_factory_node
 from src.agents.planner import planner_node
 from src.state import State, init_agent_state
+from src.monitoring.logger import get_logger, lazy
+from src.monitoring.metrics import timed
 from langgraph.graph import StateGraph, END, START
+from langgraph.types import Send
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 # Maximum reAct loop iterations
 MAX_REACT_ITERATIONS = 10
 
+# 同时执行的子任务分支数，超出的子任务在下一波派发
+SUBTASK_MAX_PARALLEL = max(1, int(os.getenv("SUBTASK_MAX_PARALLEL", "4")))
+
+
+class SubtaskBranch(TypedDict, total=False):
+    """单个子任务分支的输入（通过 Send 传入）"""
+    subtask: str
+    locale: str
+    progress_list: str
+    OUTPUT_DIR: Optional[str]
+
+
+# 单个子任务的执行流程：actor_factory -> dynamic_actor
+subtask_workflow = StateGraph(State)
+subtask_workflow.add_node("actor_factory", actor_factory_node)
+subtask_workflow.add_node("dynamic_actor", dynamic_actor_node)
+subtask_workflow.add_edge(START, "actor_factory")
+subtask_workflow.add_edge("actor_factory", "dynamic_actor")
+subtask_workflow.add_edge("dynamic_actor", END)
+subtask_graph = subtask_workflow.compile()
+
+
+@timed("node", "subtask")
+async def subtask_node(branch: SubtaskBranch):
+    """
+    The Subtask Branch Node.
+    在独立的 state 中为一个子任务构建 actor 并执行，只把结果写回主图，
+    因此多个分支可以并行而不会互相覆盖 actor_persona / actor_tools。
+    """
+    subtask = branch["subtask"]
+    state = init_agent_state(branch.get("locale", "en-US"))
+    state.update(
+        progress_list=branch.get("progress_list", ""),
+        OUTPUT_DIR=branch.get("OUTPUT_DIR"),
+        current_subtask=subtask,
+    )
+    result = await subtask_graph.ainvoke(state)
+    subtask_result = result.get("subtask_result") or {
+        "status": "failed", "summary": "No result"}
+    return {"subtask_results": [{"subtask": subtask, **subtask_result}]}
+
+
+def dispatch_subtasks(state: State) -> List[Send]:
+    """把待执行的子任务中的前 SUBTASK_MAX_PARALLEL 个派发为并行分支"""
+    batch = (state.get("subtasks") or [])[:SUBTASK_MAX_PARALLEL]
+    logger.info("Dispatching %d subtask(s) in parallel", len(batch))
+    return [
+        Send("subtask", {
+            "subtask": subtask,
+            "locale": state.get("locale", "en-US"),
+            "progress_list": state.get("progress_list", ""),
+            "OUTPUT_DIR": state.get("OUTPUT_DIR"),
+        })
+        for subtask in batch
+    ]
+
 
 # Define the graph
 workflow = StateGraph(State)
 
 # Add nodes
 workflow.add_node("planner", planner_node)
-workflow.add_node("actor_factory", actor_factory_node)
-workflow.add_node("dynamic_actor", dynamic_actor_node)
+workflow.add_node("subtask", subtask_node)
 
 # Define edges
 
 
 def planner_router(state: State):
-    # If the planner decides to finish (e.g. via next_action or no current_subtask)
-    # For now, we check if current_subtask is present
-    print("=== planner_router state ===")
-    print(json.dumps(state, indent=2, ensure_ascii=False, default=str))
-    print("=" * 30)
+    # 只在 DEBUG 级别才序列化整个 state
+    logger.debug("planner_router state: %s", lazy(
+        json.dumps, state, indent=2, ensure_ascii=False, default=str))
 
     # Check if max reAct iterations reached
     react_count = state.get("react_iteration_count", 0)
     if react_count >= MAX_REACT_ITERATIONS:
-        print(
-            f"⚠️  Maximum reAct iterations ({MAX_REACT_ITERATIONS}) reached. Stopping.")
+        logger.warning(
+            "Maximum reAct iterations (%d) reached. Stopping.", MAX_REACT_ITERATIONS)
         return END
 
-    # Check if no current subtask (normal completion)
-    if not state.get("current_subtask"):
+    # Check if no subtask (normal completion)
+    if not state.get("subtasks"):
         return END
 
-    return "actor_factory"
+    return dispatch_subtasks(state)
 
 
 workflow.add_edge(START, "planner")
+workflow.add_conditional_edges("planner", planner_router, ["subtask", END])
+
+
+def join_subtasks_node(state: State) -> dict:
+    """所有分支完成后执行一次：移除已派发的子任务，全部完成时汇总结果"""
+    remaining = (state.get("subtasks") or [])[SUBTASK_MAX_PARALLEL:]
+    if remaining:
+        return {"subtasks": remaining}
+
+    results = state.get("subtask_results") or []
+    if len(results) == 1:
+        subtask_result = results[0]
+    else:
+        failed = sum(1 for r in results if r.get("status") != "success")
+        subtask_result = {
+            "status": "success" if not failed else ("failed" if failed == len(results) else "partial"),
+            "results": results,
+        }
+    return {"subtasks": [], "subtask_result": subtask_result}
+
+
+def join_router(state: State):
+    # 还有未派发的子任务时继续下一波，否则回到 planner
+    if state.get("subtasks"):
+        return dispatch_subtasks(state)
+    return "increment_react_count"
+
+
+workflow.add_node("join_subtasks", join_subtasks_node)
+workflow.add_edge("subtask", "join_subtasks")
 workflow.add_conditional_edges(
-    "planner",
-    planner_router,
-    path_map={
-        "actor_factory": "actor_factory",
-        END: END,
-    },
-)
-workflow.add_edge("actor_factory", "dynamic_actor")
+    "join_subtasks", join_router, ["subtask", "increment_react_count"])
 
 
 def increment_react_count_node(state: State) -> dict:
-    """Increment the reAct iteration counter after dynamic_actor execution."""
+    """Increment the reAct iteration counter after a batch of subtasks."""
     current_count = state.get("react_iteration_count", 0)
     return {"react_iteration_count": current_count + 1}
 
 
 # Add node to increment counter, then route back to planner
 workflow.add_node("increment_react_count", increment_react_count_node)
-workflow.add_edge("dynamic_actor", "increment_react_count")
 workflow.add_edge("increment_react_count", "planner")
 
 # Compile
@@ -77,4 +160,4 @@ if __name__ == "__main__":
     print("\n开始调用 agent (流式输出)...\n")
     print("=" * 80)
     initial_state: State = init_agent_state()
-    dynamic_agent.invoke(initial_state)
+    asyncio.run(dynamic_agent.ainvoke(initial_state))
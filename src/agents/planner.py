@@ -1,14 +1,44 @@
+from typing import List
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import JsonOutputParser
 from src.state import State
 from src.prompts.template import apply_prompt_template
-from src.llms.fz import fz_k2_chat_model
+from src.llms.router import routed_model
+from src.llms.response_cache import cached_model
+from src.middlewares.compaction import compact_text
+from src.monitoring.logger import get_logger
+from src.monitoring.metrics import metrics, timed
 
-# Initialize LLM
-llm = fz_k2_chat_model
+logger = get_logger(__name__)
 
+# Initialize LLM (LLM_CACHE_NODES 包含 planner 时复用缓存的响应)
+llm = None
 
-def planner_node(state: State):
+
+def get_llm():
+    """返回本节点使用的模型，首次调用时创建（测试可以直接替换模块的 llm）"""
+    global llm
+    if llm is None:
+        llm = cached_model(routed_model("planner"), "planner")
+    return llm
+
+
+def parse_subtasks(result: dict) -> List[str]:
+    """从 planner 的输出中取出本轮要派发的子任务
+
+    优先使用 subtasks（互相独立、可以并行的一批子任务），没有时退回 current_subtask；
+    next_action 为 finish 或子任务为 FINISH 时返回空列表。
+    """
+    if str(result.get("next_action", "")).lower() == "finish":
+        return []
+    subtasks = result.get("subtasks") or result.get("current_subtask") or []
+    if isinstance(subtasks, str):
+        subtasks = [subtasks]
+    return [str(s) for s in subtasks if s and str(s).strip().upper() != "FINISH"]
+
+
+@timed("node", "planner")
+async def planner_node(state: State):
     """
     The Planner Node (The Brain).
     Analyzes progress and decides the next step.
@@ -42,23 +72,27 @@ def planner_node(state: State):
         )
         messages.append(
             HumanMessage(
-                content=f"Last Subtask Result:\n{state.get('subtask_result', 'None')}")
+                content=f"Last Subtask Result:\n{compact_text(str(state.get('subtask_result', 'None')))}")
         )
 
     parser = JsonOutputParser()
-    chain = llm | parser
+    chain = get_llm() | parser
 
     try:
-        result = chain.invoke(messages)
-        print(
-            f"[Planner] {'Initial' if is_first_run else 'Update'} planning result:", result)
+        result = await chain.ainvoke(messages)
+        logger.debug("[Planner] %s planning result: %s",
+                     "Initial" if is_first_run else "Update", result)
+        subtasks = parse_subtasks(result)
         return {
             "progress_list": result.get("progress_list"),
-            "current_subtask": result.get("current_subtask"),
-            # 存储 next_action 以便在图中决定何时停止
-            # 目前依赖 current_subtask 为 None 或特定标志
+            "current_subtask": subtasks[0] if subtasks else None,
+            # 互相独立的子任务由图并行派发（见 dynamic_agent.planner_router）
+            "subtasks": subtasks,
+            # 清空上一批子任务的结果
+            "subtask_results": None,
         }
     except Exception as e:
-        print(f"[Planner] Error: {e}")
+        metrics.count_error("node", "planner")
+        logger.warning("[Planner] Error: %s", e)
         # 错误处理
         return {}
@@ -1,10 +1,13 @@
-import hashlib
-from langchain.agents import create_agent
+import asyncio
+import os
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
-from src.llms.fz import fz_k2_chat_model
-from src.tools import search_web, read_url_by_markdown
-from src.monitoring import setup_langsmith, get_langsmith_callbacks
-from langgraph.checkpoint.memory import InMemorySaver
+from src.llms.router import routed_model
+from src.llms.response_cache import cached_model
+from src.agents.agent_cache import agent_cache
+from src.middlewares.compaction import message_compaction
+from src.tools import search_web, read_url_by_markdown, read_urls
+from src.monitoring import get_langsmith_callbacks
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langchain.agents.middleware.todo import TodoListMiddleware
 from langchain.agents.middleware import HumanInTheLoopMiddleware
 from langgraph.types import Command
@@ -14,35 +17,68 @@ from src.state import State
 from langgraph.graph import StateGraph
 from langgraph.graph import START, END
 from langchain_core.output_parsers import JsonOutputParser
-# 初始化 LangSmith（如果配置了环境变量会自动启用）
-setup_langsmith()
-
-memory = InMemorySaver()
-
-
-def research_node(state: State):
-    research_agent = create_agent(
-        model=fz_k2_chat_model,
-        tools=[search_web, read_url_by_markdown],
-        middleware=[],
-        system_prompt=apply_prompt_template("research_prompt", {}),
+from src.monitoring.logger import get_logger
+from src.monitoring.metrics import timed
+
+logger = get_logger(__name__)
+
+# 模型在首次调用节点时创建，避免导入本模块时加载 langchain_openai（测试可以直接替换）
+research_llm = None
+# coordinator 只改写查询，LLM_CACHE_NODES 包含 coordinator 时复用缓存的响应
+coordinator_llm = None
+
+
+def get_research_llm():
+    global research_llm
+    if research_llm is None:
+        research_llm = routed_model("research")
+    return research_llm
+
+
+def get_coordinator_llm():
+    global coordinator_llm
+    if coordinator_llm is None:
+        coordinator_llm = cached_model(routed_model("coordinator"), "coordinator")
+    return coordinator_llm
+
+# 调用这些工具前中断等待人工审批（逗号分隔，留空不中断），api 通过 thread_id 恢复执行
+RESEARCH_INTERRUPT_TOOLS = [
+    name.strip() for name in os.getenv("RESEARCH_INTERRUPT_TOOLS", "").split(",") if name.strip()]
+research_middleware = [message_compaction]
+if RESEARCH_INTERRUPT_TOOLS:
+    research_middleware.append(HumanInTheLoopMiddleware(
+        interrupt_on={name: True for name in RESEARCH_INTERRUPT_TOOLS}))
+
+
+@timed("node", "research")
+async def research_node(state: State):
+    research_agent = agent_cache.get_or_create(
+        model=get_research_llm(),
+        tools=[search_web, read_url_by_markdown, read_urls],
+        prompt_name="research_prompt",
+        middleware=research_middleware,
     )
     user_input_optimized = state.get("user_input_optimized", "")
-    result = research_agent.invoke(
-        {"messages": [HumanMessage(content=user_input_optimized)]}
+    result = await research_agent.ainvoke(
+        {"messages": [HumanMessage(content=user_input_optimized)]},
+        context={"system_prompt": apply_prompt_template("research_prompt", {})},
     )
-    print('research_node result', result)
+    logger.debug("research_node result: %s", result)
+    # 只把最终回答写回图状态：子 agent 的工具调用和工具输出留在子 agent 内部，
+    # 否则 checkpoint 和 values 事件会随每次工具输出不断变大
+    final = next((message for message in reversed(result["messages"])
+                  if isinstance(message, AIMessage) and not message.tool_calls), result["messages"][-1])
     return {
-        "messages": result["messages"]
+        "messages": [final]
     }
 
 
-def coordinator_node(state: State):
-    coordinator_agent = create_agent(
-        model=fz_k2_chat_model,
+@timed("node", "coordinator")
+async def coordinator_node(state: State):
+    coordinator_agent = agent_cache.get_or_create(
+        model=get_coordinator_llm(),
         tools=[],
-        middleware=[],
-        system_prompt=apply_prompt_template("research_coordinator", {}),
+        prompt_name="research_coordinator",
     )
     # 获取用户查询
     user_query = ""
@@ -52,13 +88,13 @@ def coordinator_node(state: State):
             user_query = first_msg.get("content", "")
         elif hasattr(first_msg, "content"):
             user_query = first_msg.content
-    result = coordinator_agent.invoke({
-        "messages": [
-            HumanMessage(content=user_query)
-        ]
-    })
+    result = await coordinator_agent.ainvoke(
+        {"messages": [HumanMessage(content=user_query)]},
+        context={"system_prompt": apply_prompt_template(
+            "research_coordinator", {})},
+    )
     parser = JsonOutputParser()
-    print('coordinator_node result', result)
+    logger.debug("coordinator_node result: %s", result)
     # 从 result 的 messages 中提取最后一个 AI 消息的内容
     last_message = result["messages"][-1]
     content = last_message.content if isinstance(
@@ -71,7 +107,14 @@ def coordinator_node(state: State):
     }
 
 
-def create_workflow():
+def create_workflow(checkpointer: BaseCheckpointSaver | None = None):
+    """
+    构建 research 工作流
+
+    Args:
+        checkpointer: 可选的 checkpointer。langgraph dev/平台部署时由平台负责持久化，
+            不需要传入；api 服务传入 src.persistence.get_checkpointer() 以支持中断恢复。
+    """
     workflow = StateGraph(State)
 
     workflow.add_node("coordinator", coordinator_node)
@@ -81,14 +124,28 @@ def create_workflow():
     workflow.add_edge("coordinator", "research")
     workflow.add_edge("research", END)
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
 
 
-research_agent = create_workflow()
+_research_agent = None
 
-if __name__ == "__main__":
-    print("\n开始调用 agent (流式输出)...\n")
-    print("=" * 80)
+
+def get_research_agent():
+    """langgraph dev 和基准使用的默认工作流（不带 checkpointer），首次使用时构建"""
+    global _research_agent
+    if _research_agent is None:
+        _research_agent = create_workflow()
+    return _research_agent
+
+
+def __getattr__(name: str):
+    # research_agent 在首次访问时才编译，导入本模块（例如 api 只需要 create_workflow）不构建图
+    if name == "research_agent":
+        return get_research_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def main():
     # 获取 LangSmith 回调（如果已配置）
     callbacks = get_langsmith_callbacks()
 
@@ -108,9 +165,16 @@ if __name__ == "__main__":
         ]
     }
 
-    for chunk in research_agent.stream(
+    # 节点均为 async 实现，需要使用 astream 驱动
+    async for chunk in get_research_agent().astream(
         input=input_data,  # type: ignore
         config=config,
         stream_mode=["values"],
     ):
         handle_stream_mode_values(chunk)
+
+
+if __name__ == "__main__":
+    print("\n开始调用 agent (流式输出)...\n")
+    print("=" * 80)
+    asyncio.run(main())
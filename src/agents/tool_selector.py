@@ -0,0 +1,320 @@
+"""
+actor_factory 的本地工具选择器
+
+actor_factory 每轮都要调用一次 LLM，只为了给子任务起一个 persona、从两个工具
+（search_web、read_url）中选出子集。这里先在本地判断，把握足够时直接返回，跳过 LLM：
+
+- 规则：子任务中的 URL、搜索类 / 阅读类 / 整理类关键词（英文按整词匹配）
+- 统计：每次调用 LLM 后，按子任务的特征（英文单词、中文二元组）记录 LLM 选择的工具组合，
+  之后用这些特征投票；统计保存在本地 SQLite 中，跨进程累积
+- 规则和统计的结论合并为一个置信度，低于阈值时才调用 LLM
+- 按 TOOL_SELECTOR_AUDIT_RATE 抽样，即使把握足够也调用 LLM 做对照，统计本地结论与 LLM 的一致率
+
+通过环境变量配置：
+    TOOL_SELECTOR_ENABLED: 是否启用，默认 1
+    TOOL_SELECTOR_MIN_CONFIDENCE: 跳过 LLM 所需的最低置信度，默认 0.75
+    TOOL_SELECTOR_AUDIT_RATE: 抽样对照的比例，默认 0.05
+    TOOL_SELECTOR_MIN_SUPPORT: 统计结论生效所需的最少样本数，默认 3
+    TOOL_SELECTOR_PATH: 数据库路径，默认 <项目根目录>/.data/tool_selector.sqlite
+"""
+import os
+import random
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.monitoring.logger import get_logger
+from src.monitoring.metrics import metrics
+from src.utils.path import get_project_root
+from src.utils.sqlite import connect_sqlite
+
+TOOL_SELECTOR_ENABLED = os.getenv("TOOL_SELECTOR_ENABLED", "1") not in ("0", "false", "False")
+TOOL_SELECTOR_MIN_CONFIDENCE = float(os.getenv("TOOL_SELECTOR_MIN_CONFIDENCE", "0.75"))
+TOOL_SELECTOR_AUDIT_RATE = float(os.getenv("TOOL_SELECTOR_AUDIT_RATE", "0.05"))
+TOOL_SELECTOR_MIN_SUPPORT = int(os.getenv("TOOL_SELECTOR_MIN_SUPPORT", "3"))
+TOOL_SELECTOR_PATH = os.getenv(
+    "TOOL_SELECTOR_PATH", str(get_project_root() / ".data" / "tool_selector.sqlite"))
+
+logger = get_logger(__name__)
+
+# actor_factory 可选的工具（与 dynamic_actor.get_tools_by_names 一致）
+KNOWN_TOOLS = ("search_web", "read_url")
+
+SEARCH_KEYWORDS = (
+    "search", "find", "look up", "lookup", "latest", "news", "current", "recent", "price",
+    "compare", "research", "investigate", "identify", "gather", "collect",
+    "搜索", "查找", "查询", "检索", "最新", "新闻", "价格", "行情", "调研", "收集", "对比", "比较",
+)
+READ_KEYWORDS = (
+    "read", "open", "visit", "page", "article", "document", "link", "website", "extract",
+    "阅读", "打开", "访问", "网页", "页面", "文章", "链接", "网站", "原文", "提取",
+)
+NO_TOOL_KEYWORDS = (
+    "summarize", "summary", "write", "draft", "format", "organize", "conclude", "report",
+    "总结", "汇总", "撰写", "整理", "归纳", "结论", "报告", "润色",
+)
+
+_URL = re.compile(r"https?://\S+")
+_WORD = re.compile(r"[a-z][a-z0-9_]{2,}")
+_CJK_RUN = re.compile(r"[一-鿿]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_votes (
+    feature TEXT NOT NULL,
+    tools TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (feature, tools)
+);
+"""
+
+_PERSONAS = {
+    "zh_CN": "专注的研究分析师，负责：{subtask}",
+    "en_US": "Focused research analyst for: {subtask}",
+}
+# prompt 要求 persona 不超过 120 个字符
+_PERSONA_MAX_CHARS = 120
+
+
+@dataclass
+class ToolDecision:
+    """一次工具选择的结论"""
+    tools: List[str]
+    confidence: float
+    source: str  # rules / learned / rules+learned / none
+
+    @property
+    def key(self) -> str:
+        return ",".join(self.tools)
+
+
+def normalize_tools(tools: Optional[Iterable[Any]]) -> List[str]:
+    """只保留已知工具，按固定顺序排列"""
+    names = {str(t) for t in tools or []}
+    return [t for t in KNOWN_TOOLS if t in names]
+
+
+def extract_features(subtask: str) -> Set[str]:
+    """子任务的特征：英文单词、中文二元组、是否包含 URL"""
+    text = subtask.lower()
+    features = set()
+    if _URL.search(text):
+        features.add("<url>")
+        text = _URL.sub(" ", text)
+    features.update(_WORD.findall(text))
+    for run in _CJK_RUN.findall(text):
+        features.update(run[i:i + 2] for i in range(len(run) - 1))
+    return features
+
+
+def _keyword_patterns(keywords: Tuple[str, ...]) -> Tuple["re.Pattern[str]", ...]:
+    """英文关键词按整词匹配（允许复数 s / es，避免 research 命中 search、already 命中 read），
+    中文关键词按子串匹配"""
+    patterns = []
+    for keyword in keywords:
+        if keyword.isascii():
+            body = re.escape(keyword).replace(r"\ ", r"\s+")
+            patterns.append(re.compile(rf"(?<![a-z0-9]){body}(?:s|es)?(?![a-z0-9])"))
+        else:
+            patterns.append(re.compile(re.escape(keyword)))
+    return tuple(patterns)
+
+
+_SEARCH_PATTERNS = _keyword_patterns(SEARCH_KEYWORDS)
+_READ_PATTERNS = _keyword_patterns(READ_KEYWORDS)
+_NO_TOOL_PATTERNS = _keyword_patterns(NO_TOOL_KEYWORDS)
+
+
+def _hits(text: str, patterns: Tuple["re.Pattern[str]", ...]) -> int:
+    return sum(1 for pattern in patterns if pattern.search(text))
+
+
+def rule_decision(subtask: str) -> Optional[ToolDecision]:
+    """按关键词规则判断，无法判断时返回 None"""
+    # URL 本身不参与关键词匹配（例如路径中的 news）
+    text = _URL.sub(" ", subtask.lower())
+    search = _hits(text, _SEARCH_PATTERNS)
+    read = _hits(text, _READ_PATTERNS)
+    no_tool = _hits(text, _NO_TOOL_PATTERNS)
+
+    if _URL.search(subtask):
+        tools = ["search_web", "read_url"] if search else ["read_url"]
+        return ToolDecision(tools, 0.9, "rules")
+    # 整理类关键词不少于搜索 / 阅读类时（例如“总结收集到的价格数据”）判为不需要工具，
+    # 置信度按多出的关键词数计算；反过来整理类关键词会降低需要工具的置信度
+    if no_tool and no_tool >= search + read:
+        return ToolDecision([], min(0.9, 0.6 + 0.15 * (no_tool - search - read)), "rules")
+    if search:
+        # 搜索结果只有摘要，通常还需要阅读来源
+        return ToolDecision(list(KNOWN_TOOLS), min(0.9, 0.6 + 0.15 * search) - 0.15 * no_tool, "rules")
+    if read:
+        return ToolDecision(list(KNOWN_TOOLS), min(0.8, 0.5 + 0.15 * read) - 0.15 * no_tool, "rules")
+    return None
+
+
+class ToolSelector:
+    """规则 + 历史统计的工具选择器（线程安全，连接在首次使用时打开）
+
+    Args:
+        db_path: 统计数据库路径
+        min_confidence: 跳过 LLM 所需的最低置信度
+        audit_rate: 把握足够时仍调用 LLM 对照的比例
+        min_support: 统计结论生效所需的最少样本数
+        enabled: 关闭时 should_skip_llm 始终返回 False
+    """
+
+    def __init__(
+        self,
+        db_path: str = TOOL_SELECTOR_PATH,
+        min_confidence: float = TOOL_SELECTOR_MIN_CONFIDENCE,
+        audit_rate: float = TOOL_SELECTOR_AUDIT_RATE,
+        min_support: int = TOOL_SELECTOR_MIN_SUPPORT,
+        enabled: bool = TOOL_SELECTOR_ENABLED,
+    ):
+        self.db_path = db_path
+        self.min_confidence = min_confidence
+        self.audit_rate = audit_rate
+        self.min_support = min_support
+        self.enabled = enabled
+        self._conn = None
+        self._votes: Optional[Dict[str, Dict[str, int]]] = None
+        self._lock = threading.Lock()
+
+        # 统计
+        self.local_decisions = 0
+        self.llm_decisions = 0
+        self.audits = 0
+        self.agreements = 0
+        self.disagreements = 0
+        self.llm_seconds = 0.0
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = connect_sqlite(self.db_path)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _load_locked(self) -> Dict[str, Dict[str, int]]:
+        if self._votes is None:
+            votes: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for feature, tools, count in self.conn.execute(
+                    "SELECT feature, tools, count FROM tool_votes"):
+                votes[feature][tools] = count
+            self._votes = votes
+        return self._votes
+
+    def learned_decision(self, features: Set[str]) -> Optional[ToolDecision]:
+        """按历史统计投票：每个已知特征按其工具组合分布投一票"""
+        with self._lock:
+            votes = self._load_locked()
+            known = [votes[f] for f in features if f in votes]
+        # 样本数取出现次数最多的特征，避免一次记录的多个特征被重复计数
+        support = max((sum(v.values()) for v in known), default=0)
+        if support < self.min_support:
+            return None
+        scores: Dict[str, float] = defaultdict(float)
+        for distribution in known:
+            total = sum(distribution.values())
+            for tools, count in distribution.items():
+                scores[tools] += count / total
+        key, score = max(scores.items(), key=lambda item: item[1])
+        return ToolDecision(key.split(",") if key else [], score / len(known), "learned")
+
+    def select(self, subtask: str) -> ToolDecision:
+        """合并规则和统计的结论"""
+        rules = rule_decision(subtask)
+        learned = self.learned_decision(extract_features(subtask))
+        if rules and learned:
+            if rules.key == learned.key:
+                confidence = 1 - (1 - rules.confidence) * (1 - learned.confidence)
+                return ToolDecision(rules.tools, confidence, "rules+learned")
+            # 结论冲突时取把握更大的一方，置信度按差值折减
+            winner, loser = (rules, learned) if rules.confidence >= learned.confidence else (learned, rules)
+            return ToolDecision(winner.tools, winner.confidence - loser.confidence, winner.source)
+        return rules or learned or ToolDecision([], 0.0, "none")
+
+    def should_skip_llm(self, decision: ToolDecision) -> bool:
+        """置信度足够且未被抽中对照时跳过 LLM"""
+        if not self.enabled or decision.confidence < self.min_confidence:
+            return False
+        if self.audit_rate > 0 and random.random() < self.audit_rate:
+            with self._lock:
+                self.audits += 1
+            return False
+        return True
+
+    def record_local(self, decision: ToolDecision) -> None:
+        """记录一次跳过 LLM 的决策"""
+        with self._lock:
+            self.local_decisions += 1
+        metrics.inc("tool_selector_decisions", source="local")
+        logger.info("Tool selection (local, %s, confidence %.2f): %s",
+                    decision.source, decision.confidence, decision.tools)
+
+    def learn(self, subtask: str, llm_tools: Optional[Iterable[Any]],
+              local: ToolDecision, llm_seconds: float) -> None:
+        """记录 LLM 的选择：更新统计，并与本地结论比对"""
+        tools = normalize_tools(llm_tools)
+        key = ",".join(tools)
+        agreed = local.confidence > 0 and local.key == key
+        features = extract_features(subtask)
+        with self._lock:
+            self.llm_decisions += 1
+            self.llm_seconds += llm_seconds
+            if local.confidence > 0:
+                if agreed:
+                    self.agreements += 1
+                else:
+                    self.disagreements += 1
+            votes = self._load_locked()
+            for feature in features:
+                votes[feature][key] = votes[feature].get(key, 0) + 1
+            self.conn.executemany(
+                "INSERT INTO tool_votes (feature, tools, count) VALUES (?, ?, 1) "
+                "ON CONFLICT(feature, tools) DO UPDATE SET count = count + 1",
+                [(feature, key) for feature in features],
+            )
+        metrics.inc("tool_selector_decisions", source="llm")
+        if local.confidence > 0:
+            metrics.inc("tool_selector_agreement", result="agree" if agreed else "disagree")
+        logger.info("Tool selection (llm, %.2fs): %s; local guess %s (%s, confidence %.2f) %s",
+                    llm_seconds, tools, local.tools, local.source, local.confidence,
+                    "agrees" if agreed else "differs")
+
+    def persona(self, subtask: str, locale: str = "en-US") -> str:
+        """本地决策时使用的 persona"""
+        template = _PERSONAS.get(locale.replace("-", "_"), _PERSONAS["en_US"])
+        text = template.format(subtask=" ".join(subtask.split()))
+        if len(text) > _PERSONA_MAX_CHARS:
+            text = text[:_PERSONA_MAX_CHARS - 3].rstrip() + "..."
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        """返回统计信息；saved_seconds 按 LLM 调用的平均耗时估算"""
+        with self._lock:
+            compared = self.agreements + self.disagreements
+            decisions = self.local_decisions + self.llm_decisions
+            avg_llm = self.llm_seconds / self.llm_decisions if self.llm_decisions else 0.0
+            return {
+                "local_decisions": self.local_decisions,
+                "llm_decisions": self.llm_decisions,
+                "local_rate": self.local_decisions / decisions if decisions else 0.0,
+                "audits": self.audits,
+                "agreements": self.agreements,
+                "disagreements": self.disagreements,
+                "agreement_rate": self.agreements / compared if compared else 0.0,
+                "avg_llm_seconds": avg_llm,
+                "saved_seconds": self.local_decisions * avg_llm,
+                "features": len(self._votes) if self._votes is not None else 0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM tool_votes")
+            self._votes = None
+
+
+# 进程级共享的选择器，统计数据库在首次使用时打开
+tool_selector = ToolSelector()
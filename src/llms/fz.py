@@ -1,9 +1,22 @@
-from openai import OpenAI
+"""
+K2 / DeepSeek 聊天模型
+
+langchain_openai（连同 openai SDK）导入耗时接近 1 秒，模型在首次使用时才创建：
+节点通过 get_k2_chat_model() 获取；旧的模块属性 fz_k2_chat_model /
+fz_deepseek_3_1_chat_model 仍可导入，访问时同样按需创建。
+
+两个模型默认使用同一个 ARK_BASE_URL，可以分别通过 K2_BASE_URL / DEEPSEEK_BASE_URL
+指向不同的服务。节点通过 src.llms.router.routed_model 在两者之间路由。
+"""
 import os
-from langchain_openai import ChatOpenAI
-from pydantic import SecretStr
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 # 加载环境变量
 load_dotenv()
 
@@ -18,27 +31,52 @@ FZ_API_KEY = os.environ.get("ARK_API_KEY") or ""
 K2_MODEL_ID = os.environ.get("K2_MODEL_ID") or ""
 K2_MODEL_NAME = "K2"
 
+K2_BASE_URL = os.environ.get("K2_BASE_URL") or ARK_BASE_URL
+DEEPSEEK_BASE_URL = os.environ.get("DEEPSEEK_BASE_URL") or ARK_BASE_URL
+
 
 OPEN_AI_API_KEY = os.environ.get("OPEN_AI_API_KEY") or ""
 OPEN_AI_BASE_URL = os.environ.get(
     "OPEN_AI_BASE_URL") or "https://api.gptsapi.net/v1"
 
-# openai client
-openai_client = OpenAI(
-    base_url="OPEN_AI_BASE_URL",
-    api_key=OPEN_AI_API_KEY
-)
-
-fz_k2_chat_model = ChatOpenAI(
-    model=K2_MODEL_ID,
-    api_key=SecretStr(FZ_API_KEY),
-    base_url=ARK_BASE_URL,
-    model_kwargs={"max_tokens": 32000}
-)
-
-
-fz_deepseek_3_1_chat_model = ChatOpenAI(
-    model=DEEPSEEK_3_1_MODEL_ID,
-    api_key=SecretStr(FZ_API_KEY),
-    base_url=ARK_BASE_URL,
-)
+
+@lru_cache(maxsize=None)
+def get_k2_chat_model() -> "ChatOpenAI":
+    """返回进程内共享的 K2 模型（首次调用时创建）"""
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
+
+    return ChatOpenAI(
+        model=K2_MODEL_ID,
+        api_key=SecretStr(FZ_API_KEY),
+        base_url=K2_BASE_URL,
+        model_kwargs={"max_tokens": 32000},
+        # 非 OpenAI 官方地址默认不在流式响应中返回用量，请求级用量统计依赖它
+        stream_usage=True,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_deepseek_3_1_chat_model() -> "ChatOpenAI":
+    """返回进程内共享的 DeepSeek-3.1 模型（首次调用时创建）"""
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
+
+    return ChatOpenAI(
+        model=DEEPSEEK_3_1_MODEL_ID,
+        api_key=SecretStr(FZ_API_KEY),
+        base_url=DEEPSEEK_BASE_URL,
+        stream_usage=True,
+    )
+
+
+_LAZY_MODELS = {
+    "fz_k2_chat_model": get_k2_chat_model,
+    "fz_deepseek_3_1_chat_model": get_deepseek_3_1_chat_model,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_MODELS:
+        return _LAZY_MODELS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
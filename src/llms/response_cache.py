@@ -0,0 +1,216 @@
+"""
+LLM 响应缓存
+
+coordinator / planner / actor_factory 这类节点发送结构化提示词并解析 JSON，
+相同的输入（重试、重放同一个请求）得到的回答可以直接复用。这里实现 LangChain 的
+BaseCache 接口，按 (模型 id + 调用参数, 消息列表) 的哈希精确匹配，存储在本地 SQLite 中：
+
+- 按节点启用：cached_model(model, "planner") 只在节点名出现在 LLM_CACHE_NODES 中时
+  返回带缓存的模型副本，否则原样返回
+- 计算 key 时去掉系统提示词末尾的 CURRENT_TIME 块和消息 id，否则每次调用都不同；
+  时间敏感的回答由 TTL 控制有效期
+- 超过有效期的条目视为未命中，条目数超过上限时按最近访问时间淘汰（LRU）
+
+通过环境变量配置：
+    LLM_CACHE_NODES: 启用缓存的节点，逗号分隔（coordinator,planner,actor_factory），默认不启用
+    LLM_CACHE_PATH: 数据库路径，默认 <项目根目录>/.data/llm_cache.sqlite
+    LLM_CACHE_TTL: 有效期（秒），默认 3600
+    LLM_CACHE_MAX_ENTRIES: 最大条目数，默认 10000
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, TypeVar
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from src.prompts.template import VOLATILE_VARIABLES
+from src.utils.path import get_project_root
+from src.utils.sqlite import connect_sqlite
+
+LLM_CACHE_NODES = frozenset(
+    n.strip() for n in os.getenv("LLM_CACHE_NODES", "").split(",") if n.strip())
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", str(get_project_root() / ".data" / "llm_cache.sqlite"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# apply_prompt_template 渲染在系统提示词末尾的易变块（见 RenderedPrompt.text）
+_VOLATILE_SUFFIX = re.compile(
+    r"\s*---\n(?:(?:%s):[^\n]*\n)+---\s*\Z" % "|".join(sorted(VOLATILE_VARIABLES)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    generations TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+M = TypeVar("M", bound=BaseChatModel)
+
+
+def _normalize(value: Any) -> Any:
+    """去掉序列化消息中每次调用都会变化的部分（消息 id、CURRENT_TIME 块）"""
+    if isinstance(value, dict):
+        return {
+            k: _VOLATILE_SUFFIX.sub("", v) if k == "content" and isinstance(v, str) else _normalize(v)
+            for k, v in value.items() if k != "id" or "lc" in value
+        }
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """由 BaseCache 的 (prompt, llm_string) 计算缓存 key
+
+    prompt 是 LangChain 序列化后的消息列表（JSON），llm_string 包含模型 id 和调用参数。
+    """
+    try:
+        prompt = json.dumps(_normalize(json.loads(prompt)), ensure_ascii=False, sort_keys=True)
+    except ValueError:
+        pass
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _dump_generations(generations: Sequence[Generation]) -> str:
+    items = []
+    for generation in generations:
+        item: Dict[str, Any] = {"text": generation.text, "generation_info": generation.generation_info}
+        if isinstance(generation, ChatGeneration):
+            # 去掉消息 id，命中时由 LangChain 重新生成，避免重放时覆盖 state 中的同 id 消息
+            item["message"] = message_to_dict(generation.message.model_copy(update={"id": None}))
+        items.append(item)
+    return json.dumps(items, ensure_ascii=False)
+
+
+def _load_generations(data: str) -> RETURN_VAL_TYPE:
+    generations: list = []
+    for item in json.loads(data):
+        if "message" in item:
+            message = messages_from_dict([item["message"]])[0]
+            generations.append(ChatGeneration(message=message, generation_info=item["generation_info"]))
+        else:
+            generations.append(Generation(text=item["text"], generation_info=item["generation_info"]))
+    return generations
+
+
+class SQLiteResponseCache(BaseCache):
+    """基于 SQLite 的 LLM 响应缓存（线程安全，连接在首次使用时打开）
+
+    Args:
+        db_path: 数据库路径
+        ttl: 有效期（秒）
+        max_entries: 最大条目数，超出后按最近访问时间淘汰
+    """
+
+    def __init__(
+        self,
+        db_path: str = LLM_CACHE_PATH,
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = connect_sqlite(self.db_path)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT generations, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] <= now:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expired += 1
+                return None
+            self.conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return _load_generations(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        # 空回答多半是调用异常，不缓存
+        if not return_val or not any(g.text for g in return_val):
+            return
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, generations, created_at, expires_at, "
+                "last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, _dump_generations(return_val), now, now + self.ttl, now),
+            )
+            self.stores += 1
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        count = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)", (excess,))
+            self.evictions += excess
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.expired
+            entries = 0
+            if self._conn is not None:
+                entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# 进程级共享缓存，连接在首次查询时才打开
+response_cache = SQLiteResponseCache()
+
+
+def cached_model(model: M, node: str, nodes: frozenset = LLM_CACHE_NODES) -> M:
+    """节点在 LLM_CACHE_NODES 中时返回使用 response_cache 的模型副本，否则返回原模型"""
+    if node not in nodes:
+        return model
+    return model.model_copy(update={"cache": response_cache})
@@ -0,0 +1,434 @@
+"""
+按节点在 K2 / DeepSeek 之间路由模型请求
+
+每个节点有一条路由策略（policy:模型列表）：
+    - ordered: 按列出的顺序使用，首选模型失败时依次切换到下一个
+    - fastest: 按 EWMA 延迟（按错误率加罚）从低到高排序，还没有样本的模型优先，
+      用于 coordinator / actor_factory 这类只输出 JSON、对模型能力不敏感的节点
+两种策略下，EWMA 错误率超过 LLM_ERROR_THRESHOLD 的模型都排到最后。
+
+延迟和错误率按 (模型, 节点) 统计：不同节点的输入输出规模差别很大，混在一起的延迟
+分位数没有意义。单次尝试超时、连接失败、5xx 和 429 会切换到下一个模型，其余错误
+（如 400）直接抛出。开启对冲（LLM_HEDGE_PERCENTILE）后，非流式请求的耗时超过首选
+模型在该节点上的延迟分位数时，同时向下一个模型发送相同的请求，取先成功的结果并取消
+另一个。流式请求只在收到第一个 chunk 之前切换，不对冲。
+
+路由里只保留配置了模型 id 的模型（K2_MODEL_ID / DEEPSEEK_3_1_MODEL_ID），
+只剩一个模型时直接返回该模型，不做包装。
+
+通过环境变量配置：
+    LLM_ROUTES: 覆盖默认路由，分号分隔，例如 "coordinator=fastest:deepseek,k2;research=ordered:k2"
+    LLM_TIMEOUT: 单次尝试的超时（秒，流式为第一个 chunk 的超时；同步调用时作为 HTTP 客户端的
+        超时传给模型），默认 120
+    LLM_HEDGE_PERCENTILE: 对冲使用的延迟分位数（如 95），默认 0 不对冲
+    LLM_HEDGE_MIN_SAMPLES: 开始对冲所需的最少样本数，默认 20
+    LLM_EWMA_ALPHA: EWMA 平滑系数，默认 0.2
+    LLM_ERROR_THRESHOLD: EWMA 错误率超过该值的模型排到最后，默认 0.5
+"""
+import asyncio
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.llms import fz
+from src.monitoring.logger import get_logger
+from src.monitoring.metrics import metrics
+
+logger = get_logger(__name__)
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+LLM_ERROR_THRESHOLD = float(os.getenv("LLM_ERROR_THRESHOLD", "0.5"))
+
+# 用于计算延迟分位数的最近样本数
+LATENCY_WINDOW = 200
+# fastest 策略中错误率对延迟的加罚系数
+ERROR_PENALTY = 4.0
+
+# 模型名称 -> (返回模型 id 的函数, 创建模型的函数)
+MODELS: Dict[str, Tuple[Callable[[], str], Callable[[], BaseChatModel]]] = {
+    "k2": (lambda: fz.K2_MODEL_ID, fz.get_k2_chat_model),
+    "deepseek": (lambda: fz.DEEPSEEK_3_1_MODEL_ID, fz.get_deepseek_3_1_chat_model),
+}
+
+DEFAULT_ROUTES: Dict[str, str] = {
+    "coordinator": "fastest:k2,deepseek",
+    "actor_factory": "fastest:k2,deepseek",
+    "planner": "ordered:k2,deepseek",
+    "research": "ordered:k2,deepseek",
+    "dynamic_actor": "ordered:k2,deepseek",
+}
+DEFAULT_ROUTE = "ordered:k2,deepseek"
+
+
+def parse_routes(spec: str) -> Dict[str, Tuple[str, List[str]]]:
+    """解析 "node=policy:model1,model2;..."，policy 省略时为 ordered"""
+    routes: Dict[str, Tuple[str, List[str]]] = {}
+    for item in spec.split(";"):
+        if "=" not in item:
+            continue
+        node, route = (part.strip() for part in item.split("=", 1))
+        policy, _, names = route.rpartition(":")
+        policy = policy.strip() or "ordered"
+        if policy not in ("ordered", "fastest"):
+            raise ValueError(f"未知的路由策略 {policy!r}（{item.strip()}）")
+        models = [name.strip() for name in names.split(",") if name.strip()]
+        unknown = [name for name in models if name not in MODELS]
+        if unknown:
+            raise ValueError(f"未知的模型 {unknown}（{item.strip()}）")
+        if node and models:
+            routes[node] = (policy, models)
+    return routes
+
+
+ROUTES = parse_routes(";".join(f"{node}={route}" for node, route in DEFAULT_ROUTES.items()))
+ROUTES.update(parse_routes(os.getenv("LLM_ROUTES", "")))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """超时、连接失败、5xx 和 429 可以换一个模型重试"""
+    if isinstance(error, TimeoutError):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    # openai 的连接错误（包括 APITimeoutError）没有状态码；错误来自 openai 时它一定已经导入
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(error, openai.APIConnectionError)
+
+
+class _Track:
+    __slots__ = ("calls", "errors", "ewma_latency", "ewma_error", "latencies")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error = 0.0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+
+class ModelHealth:
+    """按 (模型, 节点) 统计的 EWMA 延迟、EWMA 错误率和最近的延迟样本（线程安全）
+
+    Args:
+        alpha: EWMA 平滑系数
+    """
+
+    def __init__(self, alpha: float = LLM_EWMA_ALPHA):
+        self.alpha = alpha
+        self._tracks: Dict[Tuple[str, str], _Track] = {}
+        self._lock = threading.Lock()
+        # 统计
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _track(self, model: str, node: str) -> _Track:
+        track = self._tracks.get((model, node))
+        if track is None:
+            track = self._tracks[(model, node)] = _Track()
+        return track
+
+    def count(self, counter: str) -> None:
+        """累加 failovers / hedges / hedge_wins"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record(self, model: str, node: str, latency: Optional[float] = None, error: bool = False) -> None:
+        """记录一次调用结果，失败时 latency 为 None"""
+        with self._lock:
+            track = self._track(model, node)
+            track.calls += 1
+            track.ewma_error += self.alpha * (float(error) - track.ewma_error)
+            if error:
+                track.errors += 1
+                return
+            if latency is not None:
+                track.latencies.append(latency)
+                if track.ewma_latency is None:
+                    track.ewma_latency = latency
+                else:
+                    track.ewma_latency += self.alpha * (latency - track.ewma_latency)
+
+    def error_rate(self, model: str, node: str) -> float:
+        with self._lock:
+            track = self._tracks.get((model, node))
+            return track.ewma_error if track else 0.0
+
+    def score(self, model: str, node: str) -> float:
+        """fastest 策略的排序依据，还没有延迟样本时为 0（优先尝试）"""
+        with self._lock:
+            track = self._tracks.get((model, node))
+            if track is None or track.ewma_latency is None:
+                return 0.0
+            return track.ewma_latency * (1 + ERROR_PENALTY * track.ewma_error)
+
+    def percentile(self, model: str, node: str, q: float, min_samples: int) -> Optional[float]:
+        """最近延迟样本的 q 分位数，样本不足时返回 None"""
+        with self._lock:
+            track = self._tracks.get((model, node))
+            if track is None or len(track.latencies) < max(1, min_samples):
+                return None
+            samples = sorted(track.latencies)
+        return samples[min(len(samples) - 1, max(0, math.ceil(q / 100 * len(samples)) - 1))]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "failovers": self.failovers,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "routes": {
+                    f"{node}/{model}": {
+                        "calls": track.calls,
+                        "errors": track.errors,
+                        "ewma_latency": track.ewma_latency or 0.0,
+                        "ewma_error": track.ewma_error,
+                    }
+                    for (model, node), track in self._tracks.items()
+                },
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tracks.clear()
+            self.failovers = self.hedges = self.hedge_wins = 0
+
+
+# 进程级共享的模型健康统计
+model_health = ModelHealth()
+
+
+class RoutedChatModel(BaseChatModel):
+    """按节点路由的聊天模型：对调用方是一个普通的 BaseChatModel
+
+    names 与 models 一一对应；工具绑定交给首选模型生成参数（都是 OpenAI 兼容接口），
+    绑定参数对所有模型通用。
+    """
+
+    node: str
+    names: List[str]
+    models: List[BaseChatModel]
+    policy: str = "ordered"
+    timeout: float = LLM_TIMEOUT
+    hedge_percentile: float = LLM_HEDGE_PERCENTILE
+    hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES
+    error_threshold: float = LLM_ERROR_THRESHOLD
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # 响应缓存按 llm_string 区分模型：包含每个模型自己的 llm_string（模型 id、base_url、
+        # 采样参数），修改其中任何一个都不会命中旧的缓存
+        return {
+            "model": "|".join(self.names),
+            "node": self.node,
+            "policy": self.policy,
+            "models": [model._get_llm_string() for model in self.models],
+        }
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Any:
+        binding = self.models[0].bind_tools(tools, **kwargs)
+        return self.bind(**binding.kwargs)  # type: ignore[attr-defined]
+
+    def order(self) -> List[int]:
+        """本次请求尝试模型的顺序（models 的下标）"""
+        indexes = list(range(len(self.names)))
+        if self.policy == "fastest":
+            indexes.sort(key=lambda i: model_health.score(self.names[i], self.node))
+        # 错误率过高的模型排到最后（sort 是稳定的）
+        indexes.sort(key=lambda i: model_health.error_rate(self.names[i], self.node) > self.error_threshold)
+        return indexes
+
+    def _failover(self, name: str, error: BaseException) -> None:
+        model_health.count("failovers")
+        metrics.inc("llm_failover", node=self.node, model=name)
+        logger.warning("模型 %s 调用失败，切换到下一个模型: node=%s, error=%r", name, self.node, error)
+
+    # ------------------------------------------------------------------
+    # 非流式
+    # ------------------------------------------------------------------
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # 同步路径不能用 wait_for 取消调用，超时交给 HTTP 客户端（路由的模型都是 OpenAI 兼容接口）
+        kwargs = {"timeout": self.timeout, **kwargs}
+        order = self.order()
+        for position, index in enumerate(order):
+            name = self.names[index]
+            started = time.perf_counter()
+            try:
+                result = self.models[index]._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                model_health.record(name, self.node, error=True)
+                if position == len(order) - 1 or not is_retryable(e):
+                    raise
+                self._failover(name, e)
+                continue
+            model_health.record(name, self.node, time.perf_counter() - started)
+            return result
+        raise RuntimeError("没有可用的模型")
+
+    async def _call(self, index: int, messages: List[BaseMessage], stop: Optional[List[str]],
+                    kwargs: Dict[str, Any]) -> ChatResult:
+        """调用一个模型并记录结果；被取消（对冲落败）时不计入统计"""
+        name = self.names[index]
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                self.models[index]._agenerate(messages, stop=stop, **kwargs), self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            model_health.record(name, self.node, error=True)
+            raise
+        model_health.record(name, self.node, time.perf_counter() - started)
+        return result
+
+    async def _hedged(self, remaining: List[int], messages: List[BaseMessage],
+                      stop: Optional[List[str]], kwargs: Dict[str, Any]) -> ChatResult:
+        """调用 remaining 中的第一个模型（调用过的模型会从 remaining 中移除）
+
+        请求超过该模型的延迟分位数仍未返回时，向下一个模型发送相同的请求，取先成功的结果。
+        """
+        index = remaining.pop(0)
+        threshold = None
+        if self.hedge_percentile > 0 and remaining:
+            threshold = model_health.percentile(
+                self.names[index], self.node, self.hedge_percentile, self.hedge_min_samples)
+        if threshold is None:
+            return await self._call(index, messages, stop, kwargs)
+
+        primary = asyncio.ensure_future(self._call(index, messages, stop, kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done:
+            return primary.result()
+
+        hedge_index = remaining.pop(0)
+        model_health.count("hedges")
+        metrics.inc("llm_hedge", node=self.node, model=self.names[hedge_index])
+        hedge = asyncio.ensure_future(self._call(hedge_index, messages, stop, kwargs))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            model_health.count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        remaining = self.order()
+        while True:
+            name = self.names[remaining[0]]
+            try:
+                return await self._hedged(remaining, messages, stop, kwargs)
+            except Exception as e:
+                if not remaining or not is_retryable(e):
+                    raise
+                self._failover(name, e)
+
+    # ------------------------------------------------------------------
+    # 流式：只在第一个 chunk 之前切换
+    # ------------------------------------------------------------------
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # 同步路径的超时交给 HTTP 客户端，对每次读取生效（包括第一个 chunk）
+        kwargs = {"timeout": self.timeout, **kwargs}
+        order = self.order()
+        for position, index in enumerate(order):
+            name = self.names[index]
+            started = time.perf_counter()
+            stream = self.models[index]._stream(messages, stop=stop, **kwargs)
+            try:
+                first = next(stream, None)
+            except Exception as e:
+                model_health.record(name, self.node, error=True)
+                if position == len(order) - 1 or not is_retryable(e):
+                    raise
+                self._failover(name, e)
+                continue
+            if first is not None:
+                yield first
+                yield from stream
+            model_health.record(name, self.node, time.perf_counter() - started)
+            return
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        order = self.order()
+        for position, index in enumerate(order):
+            name = self.names[index]
+            started = time.perf_counter()
+            stream = self.models[index]._astream(messages, stop=stop, **kwargs)
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), self.timeout)
+            except StopAsyncIteration:
+                model_health.record(name, self.node, time.perf_counter() - started)
+                return
+            except Exception as e:
+                await stream.aclose()
+                model_health.record(name, self.node, error=True)
+                if position == len(order) - 1 or not is_retryable(e):
+                    raise
+                self._failover(name, e)
+                continue
+            yield first
+            async for chunk in stream:
+                yield chunk
+            model_health.record(name, self.node, time.perf_counter() - started)
+            return
+
+
+def routed_model(node: str) -> BaseChatModel:
+    """返回节点使用的模型：按 ROUTES 中的策略路由，只有一个可用模型时直接返回该模型"""
+    policy, names = ROUTES.get(node) or parse_routes(f"{node}={DEFAULT_ROUTE}")[node]
+    available = [name for name in names if MODELS[name][0]()] or names[:1]
+    models = [MODELS[name][1]() for name in available]
+    if len(models) == 1:
+        return models[0]
+    return RoutedChatModel(node=node, names=available, models=models, policy=policy)
@@ -1,5 +1,12 @@
 """
 中间件模块
 """
+from src.middlewares.compaction import (
+    MessageCompactionMiddleware,
+    compact_messages,
+    compact_text,
+    message_compaction,
+)
 
-__all__ = []
+__all__ = ['MessageCompactionMiddleware', 'compact_messages', 'compact_text',
+           'message_compaction']
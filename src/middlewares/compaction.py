@@ -0,0 +1,190 @@
+"""
+按 token 预算压缩上下文
+
+子 agent 的 ReAct 循环每调用一次工具，就会把完整的工具输出（网页正文、搜索结果）
+追加到消息列表中，之后每次调用模型都要重新发送。这里在调用模型之前压缩消息，
+让上下文始终不超过预算：
+    1. 保留开头的系统消息和第一条用户消息（任务目标），以及最近 keep_recent 条消息原样不动
+    2. 从最早的开始，把中间的工具输出替换为开头一段摘录
+    3. 仍然超出预算时，从最早的开始整组删除中间的消息（带工具调用的 AI 消息和对应的工具消息一起删除）
+
+压缩只作用于发送给模型的请求，不修改 agent state 中保存的完整记录。
+
+通过环境变量配置：
+    COMPACTION_MAX_TOKENS: 发送给模型的上下文预算（含系统提示词），默认 24000
+    COMPACTION_KEEP_RECENT: 原样保留的最近消息数，默认 6
+    COMPACTION_SUMMARY_CHARS: 压缩后的工具输出保留的字符数，默认 400
+    COMPACTION_RESULT_MAX_TOKENS: planner 读取的子任务结果上限，默认 2000
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Sequence, Tuple
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.monitoring.logger import get_logger
+from src.monitoring.metrics import metrics
+from src.utils.tokens import count_message_tokens, count_messages_tokens, count_tokens
+
+COMPACTION_MAX_TOKENS = int(os.getenv("COMPACTION_MAX_TOKENS", "24000"))
+COMPACTION_KEEP_RECENT = int(os.getenv("COMPACTION_KEEP_RECENT", "6"))
+COMPACTION_SUMMARY_CHARS = int(os.getenv("COMPACTION_SUMMARY_CHARS", "400"))
+COMPACTION_RESULT_MAX_TOKENS = int(os.getenv("COMPACTION_RESULT_MAX_TOKENS", "2000"))
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CompactionResult:
+    """一次压缩的统计"""
+    tokens_before: int
+    tokens_after: int
+    compressed: int = 0
+    dropped: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return self.compressed > 0 or self.dropped > 0
+
+
+def _head_end(messages: Sequence[BaseMessage]) -> int:
+    """开头的系统消息和第一条用户消息之后的位置"""
+    for i, message in enumerate(messages):
+        if isinstance(message, HumanMessage):
+            return i + 1
+        if not isinstance(message, SystemMessage):
+            return i
+    return len(messages)
+
+
+def _recent_start(messages: Sequence[BaseMessage], head_end: int, keep_recent: int) -> int:
+    """最近 keep_recent 条消息的起始位置，不把工具消息和发起调用的 AI 消息拆开"""
+    start = max(head_end, len(messages) - keep_recent)
+    while start > head_end and isinstance(messages[start], ToolMessage):
+        start -= 1
+    return start
+
+
+def _groups(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """带工具调用的 AI 消息和后面对应的工具消息为一组，其余消息各自一组"""
+    groups: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and groups and (
+                isinstance(groups[-1][0], AIMessage) and groups[-1][0].tool_calls):
+            groups[-1].append(message)
+        else:
+            groups.append([message])
+    return groups
+
+
+def _summarize_tool_output(message: ToolMessage, summary_chars: int) -> ToolMessage:
+    text = message.content if isinstance(message.content, str) else str(message.content)
+    excerpt = text[:summary_chars].rstrip()
+    content = f"{excerpt}\n\n... (工具输出已压缩，原文约 {count_tokens(text)} tokens)"
+    return message.model_copy(update={"content": content})
+
+
+def compact_messages(
+    messages: Sequence[BaseMessage],
+    max_tokens: int = COMPACTION_MAX_TOKENS,
+    keep_recent: int = COMPACTION_KEEP_RECENT,
+    summary_chars: int = COMPACTION_SUMMARY_CHARS,
+) -> Tuple[List[BaseMessage], CompactionResult]:
+    """把消息列表压缩到 max_tokens 以内（开头和最近的消息不会被压缩）
+
+    Returns:
+        (压缩后的消息列表, 统计)；未超出预算时原样返回
+    """
+    total = count_messages_tokens(messages)
+    result = CompactionResult(tokens_before=total, tokens_after=total)
+    if total <= max_tokens:
+        return list(messages), result
+
+    head_end = _head_end(messages)
+    recent_start = _recent_start(messages, head_end, keep_recent)
+    head = list(messages[:head_end])
+    middle = list(messages[head_end:recent_start])
+    recent = list(messages[recent_start:])
+
+    # 1. 从最早的工具输出开始替换为摘录
+    for i, message in enumerate(middle):
+        if total <= max_tokens:
+            break
+        if not isinstance(message, ToolMessage):
+            continue
+        compressed = _summarize_tool_output(message, summary_chars)
+        saved = count_message_tokens(message) - count_message_tokens(compressed)
+        if saved > 0:
+            middle[i] = compressed
+            total -= saved
+            result.compressed += 1
+
+    # 2. 仍然超出时整组删除最早的消息
+    groups = _groups(middle)
+    while total > max_tokens and groups:
+        group = groups.pop(0)
+        total -= count_messages_tokens(group)
+        result.dropped += len(group)
+    middle = [message for group in groups for message in group]
+    if result.dropped:
+        note = HumanMessage(content=f"[为控制上下文长度，已省略较早的 {result.dropped} 条消息]")
+        middle.insert(0, note)
+        total += count_message_tokens(note)
+
+    result.tokens_after = total
+    return head + middle + recent, result
+
+
+def compact_text(text: str, max_tokens: int = COMPACTION_RESULT_MAX_TOKENS) -> str:
+    """把单段文本截断到 max_tokens 以内，附带提示信息"""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep = max(1, int(len(text) * max_tokens / tokens))
+    return f"{text[:keep].rstrip()}\n\n... (内容已截断，原文约 {tokens} tokens)"
+
+
+class MessageCompactionMiddleware(AgentMiddleware):
+    """调用模型前按 token 预算压缩消息的 agent 中间件
+
+    Args:
+        max_tokens: 上下文预算（含系统提示词）
+        keep_recent: 原样保留的最近消息数
+        summary_chars: 压缩后的工具输出保留的字符数
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = COMPACTION_MAX_TOKENS,
+        keep_recent: int = COMPACTION_KEEP_RECENT,
+        summary_chars: int = COMPACTION_SUMMARY_CHARS,
+    ):
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+
+    def _compact(self, request: ModelRequest) -> ModelRequest:
+        budget = self.max_tokens - count_tokens(request.system_prompt or "")
+        messages, result = compact_messages(
+            request.messages, budget, self.keep_recent, self.summary_chars)
+        if not result.changed:
+            return request
+        metrics.inc("compaction_runs")
+        metrics.inc("compaction_tokens_saved", result.tokens_before - result.tokens_after)
+        logger.info("上下文已压缩: %d -> %d tokens（压缩 %d 条工具输出，删除 %d 条消息）",
+                    result.tokens_before, result.tokens_after, result.compressed, result.dropped)
+        return request.override(messages=messages)
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], Any]) -> Any:
+        return handler(self._compact(request))
+
+    async def awrap_model_call(
+        self, request: ModelRequest, handler: Callable[[ModelRequest], Awaitable[Any]]
+    ) -> Any:
+        return await handler(self._compact(request))
+
+
+# 子 agent 共享的压缩中间件
+message_compaction = MessageCompactionMiddleware()
@@ -1,6 +1,11 @@
 """
-监控模块 - LangSmith 集成
+监控模块 - LangSmith 集成、结构化日志、进程内指标与请求用量统计
 """
 from src.monitoring.langsmith_config import setup_langsmith, get_langsmith_callbacks
+from src.monitoring.logger import get_logger, lazy, preview, setup_logging
+from src.monitoring.metrics import MetricsRegistry, metrics, timed
+from src.monitoring.usage import UsageStore, UsageTracker, usage_store
 
-__all__ = ['setup_langsmith', 'get_langsmith_callbacks']
+__all__ = ['setup_langsmith', 'get_langsmith_callbacks', 'get_logger', 'lazy',
+           'preview', 'setup_logging', 'MetricsRegistry', 'metrics', 'timed',
+           'UsageStore', 'UsageTracker', 'usage_store']
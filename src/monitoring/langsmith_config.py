@@ -5,12 +5,18 @@ import os
 from typing import Optional, List
 from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.tracers import LangChainTracer
+from src.monitoring.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 # LangSmith 配置应从环境变量读取，不要硬编码密钥
 LANGSMITH_ENDPOINT = "https://api.smith.langchain.com"
 LANGSMITH_PROJECT = os.getenv("LANGSMITH_PROJECT", "default-project")
 
+# get_langsmith_callbacks 首次调用时执行一次 setup_langsmith，导入模块时不修改环境变量
+_langsmith_configured = False
+
 
 def setup_langsmith(
     api_key: Optional[str] = None,
@@ -43,8 +49,8 @@ def setup_langsmith(
     api_url = api_url or os.getenv("LANGSMITH_ENDPOINT", LANGSMITH_ENDPOINT)
 
     if not api_key:
-        print("⚠️  警告: 未设置 LANGSMITH_API_KEY，LangSmith 追踪将被禁用")
-        print("   请设置环境变量 LANGSMITH_API_KEY 或传入 api_key 参数")
+        logger.info("未设置 LANGSMITH_API_KEY，LangSmith 追踪将被禁用。"
+                    "请设置环境变量 LANGSMITH_API_KEY 或传入 api_key 参数")
         return False
 
     # 设置环境变量
@@ -57,10 +63,7 @@ def setup_langsmith(
     # 启用追踪
     os.environ["LANGCHAIN_TRACING_V2"] = "true"
 
-    print(f"✅ LangSmith 已配置")
-    if project:
-        print(f"   项目: {project}")
-    print(f"   API Key: {api_key[:8]}...")
+    logger.info("LangSmith 已配置，项目: %s，API Key: %s...", project, api_key[:8])
 
     return True
 
@@ -82,9 +85,14 @@ def get_langsmith_callbacks(
         >>> callbacks = get_langsmith_callbacks(project="my-project", tags=["production", "v1"])
         >>> agent.invoke(input, config={"callbacks": callbacks})
     """
+    global _langsmith_configured
+    if not _langsmith_configured:
+        _langsmith_configured = True
+        setup_langsmith()
+
     # 检查是否已配置
     if not os.getenv("LANGSMITH_API_KEY"):
-        print("⚠️  警告: LANGSMITH_API_KEY 未设置，返回空回调列表")
+        logger.debug("LANGSMITH_API_KEY 未设置，返回空回调列表")
         return []
 
     # 使用 LangChainTracer
@@ -0,0 +1,105 @@
+"""
+结构化分级日志
+
+工具和节点统一通过 get_logger(__name__) 输出日志，代替 print：
+    - 日志级别由 LOG_LEVEL 控制，低于该级别的日志不做任何格式化
+    - 参数使用 % 占位符延迟格式化，较大的内容（网页预览、整个 state）用 preview() / lazy()
+      包装，只有日志真正输出时才会截断或序列化
+    - LOG_FORMAT=json 时每行输出一个 JSON 对象，extra 中的字段一并输出，方便日志平台检索
+
+通过环境变量配置：
+    LOG_LEVEL: 日志级别，默认 INFO；工具的输入输出预览在 DEBUG 级别
+    LOG_FORMAT: text（默认）或 json
+"""
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Any, Callable, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+# 由本模块配置的 logger 前缀
+_ROOT_LOGGERS = ("src", "api", "benchmarks")
+# LogRecord 自带的属性，JSON 输出时只保留 extra 传入的其他字段
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName"}
+
+_setup_lock = threading.Lock()
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None, force: bool = False) -> None:
+    """配置 src / api 下的 logger（重复调用时只在 force=True 时重新配置）"""
+    global _configured
+    with _setup_lock:
+        if _configured and not force:
+            return
+        handler = logging.StreamHandler(sys.stderr)
+        if (fmt or LOG_FORMAT) == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S"))
+        for name in _ROOT_LOGGERS:
+            logger = logging.getLogger(name)
+            logger.handlers = [handler]
+            logger.setLevel(level or LOG_LEVEL)
+            logger.propagate = False
+        _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """获取 logger，首次调用时按环境变量完成配置"""
+    if not _configured:
+        setup_logging()
+    return logging.getLogger(name)
+
+
+class _Lazy:
+    """__str__ 时才调用 fn，配合 % 占位符实现延迟格式化"""
+
+    __slots__ = ("fn", "args", "kwargs")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args, **self.kwargs))
+
+
+def lazy(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> _Lazy:
+    """延迟计算的日志参数，例如 logger.debug("state: %s", lazy(json.dumps, state))"""
+    return _Lazy(fn, *args, **kwargs)
+
+
+def _truncate(text: Any, limit: int) -> str:
+    text = str(text)
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+def preview(text: Any, limit: int = 300) -> _Lazy:
+    """延迟截断的文本预览"""
+    return _Lazy(_truncate, text, limit)
@@ -0,0 +1,273 @@
+"""
+进程内指标
+
+记录每个工具、每个节点的耗时直方图和错误次数，以及其他组件的计数器，
+通过 api 的 /metrics 端点以 Prometheus 文本格式（或 JSON）输出。
+
+- 直方图使用固定分桶，observe 只做一次二分查找和加法
+- 其他组件（连接池、缓存、进程池等）通过 register_collector 注册 stats()，
+  数值字段在输出时转换为 gauge
+- METRICS_ENABLED=0 时 timed 直接返回原函数，其余方法立即返回，几乎没有开销
+
+通过环境变量配置：
+    METRICS_ENABLED: 是否启用，默认 1
+"""
+import asyncio
+import bisect
+import functools
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+# 延迟分桶（秒），覆盖毫秒级缓存命中到分钟级的 agent 调用
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_NAME_CLEAN = re.compile(r"[^a-zA-Z0-9_]")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Histogram:
+    """固定分桶的直方图（非累计计数，输出时再累加）"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """按分桶估算分位数（取所在分桶的上界）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= target:
+                return self.buckets[i] if i < len(self.buckets) else math.inf
+        return math.inf
+
+    def cumulative(self) -> Iterator[Tuple[str, int]]:
+        total = 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            yield repr(bound), total
+        yield "+Inf", self.count
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _flatten(prefix: str, value: Any) -> Iterator[Tuple[str, float]]:
+    if isinstance(value, bool):
+        yield prefix, float(value)
+    elif isinstance(value, (int, float)):
+        yield prefix, float(value)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(f"{prefix}_{_NAME_CLEAN.sub('_', str(key))}", item)
+
+
+class MetricsRegistry:
+    """进程内指标注册表（线程安全）
+
+    Args:
+        enabled: 是否启用，关闭时所有记录方法立即返回
+        namespace: Prometheus 指标名前缀
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, namespace: str = "app"):
+        self.enabled = enabled
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+
+    def observe(self, kind: str, name: str, seconds: float) -> None:
+        """记录一次耗时，kind 为 tool / node 等"""
+        if not self.enabled:
+            return
+        key = (kind, name)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram()
+            histogram.observe(seconds)
+
+    def count_error(self, kind: str, name: str) -> None:
+        """记录一次错误"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._errors[(kind, name)] += 1
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """通用计数器，输出为 <namespace>_<name>_total"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def register_collector(self, name: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """注册组件的 stats()，输出时调用，数值字段转换为 gauge"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    # ------------------------------------------------------------------
+    # 输出
+    # ------------------------------------------------------------------
+
+    def _collect(self) -> Dict[str, Any]:
+        with self._lock:
+            collectors = list(self._collectors.items())
+        results = {}
+        for name, collect in collectors:
+            try:
+                results[name] = collect()
+            except Exception as exc:
+                results[name] = {"error": str(exc)}
+        return results
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON 格式的指标快照"""
+        with self._lock:
+            latency: Dict[str, Dict[str, Any]] = defaultdict(dict)
+            for (kind, name), histogram in self._latency.items():
+                latency[kind][name] = histogram.snapshot()
+            errors: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for (kind, name), n in self._errors.items():
+                errors[kind][name] = n
+            counters: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for (name, labels), value in self._counters.items():
+                counters[name].append({"labels": dict(labels), "value": value})
+        return {
+            "enabled": self.enabled,
+            "latency": dict(latency),
+            "errors": dict(errors),
+            "counters": dict(counters),
+            "components": self._collect(),
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        ns = self.namespace
+        lines: List[str] = []
+        with self._lock:
+            latency = [(key, list(h.cumulative()), h.count, h.sum)
+                       for key, h in sorted(self._latency.items())]
+            errors = sorted(self._errors.items())
+            counters = sorted(self._counters.items())
+
+        if latency:
+            lines.append(f"# TYPE {ns}_latency_seconds histogram")
+            for (kind, name), buckets, count, total in latency:
+                base = (("kind", kind), ("name", name))
+                for bound, n in buckets:
+                    lines.append(f"{ns}_latency_seconds_bucket{_labels(base + (('le', bound),))} {n}")
+                lines.append(f"{ns}_latency_seconds_sum{_labels(base)} {total}")
+                lines.append(f"{ns}_latency_seconds_count{_labels(base)} {count}")
+        if errors:
+            lines.append(f"# TYPE {ns}_errors_total counter")
+            for (kind, name), n in errors:
+                lines.append(f"{ns}_errors_total{_labels((('kind', kind), ('name', name)))} {n}")
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{ns}_{_NAME_CLEAN.sub('_', name)}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value}")
+
+        for component, stats in self._collect().items():
+            for metric, value in _flatten(f"{ns}_{_NAME_CLEAN.sub('_', component)}", stats):
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """清空记录的指标（保留已注册的 collector）"""
+        with self._lock:
+            self._latency.clear()
+            self._errors.clear()
+            self._counters.clear()
+
+    # ------------------------------------------------------------------
+    # 装饰器
+    # ------------------------------------------------------------------
+
+    def timed(self, kind: str, name: Optional[str] = None) -> Callable[[F], F]:
+        """记录函数耗时，抛出异常时计入错误次数（同时支持同步和异步函数）"""
+
+        def decorator(fn: F) -> F:
+            if not self.enabled:
+                return fn
+            label = name or fn.__name__
+
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    start = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    except Exception:
+                        self.count_error(kind, label)
+                        raise
+                    finally:
+                        self.observe(kind, label, time.perf_counter() - start)
+                return async_wrapper  # type: ignore[return-value]
+
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                except Exception:
+                    self.count_error(kind, label)
+                    raise
+                finally:
+                    self.observe(kind, label, time.perf_counter() - start)
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+
+# 进程级共享的指标注册表
+metrics = MetricsRegistry()
+timed = metrics.timed
@@ -0,0 +1,281 @@
+"""
+单次请求的 token 用量与节点耗时统计
+
+UsageTracker 是一个 LangChain 回调，放进请求的 config["callbacks"] 后会随 config
+传递到图中的每个节点以及节点内调用的子 agent，汇总：
+    - 每次 LLM 调用的 prompt / completion tokens（取自 AIMessage.usage_metadata，
+      缺失时退回 llm_output["token_usage"]），按模型和所属的顶层节点分组；
+      模型优先取响应中的 model_name，经过路由的调用计入实际返回结果的模型
+    - 每个顶层节点的执行耗时（子 agent 内部的节点计入调用它的顶层节点）
+
+UsageStore 在进程内按 thread_id 累计每次请求的结果（LRU 淘汰），并保留最近的请求
+用于查找慢请求，不依赖 LangSmith。客户端断开而被取消的运行单独计数，
+节省的 tokens 按已完成运行的平均用量减去取消前已用的量估计。
+
+通过环境变量配置：
+    USAGE_MAX_THREADS: 保留统计的 thread 数量上限，默认 1000
+    USAGE_RECENT_REQUESTS: 保留的最近请求数，默认 200
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+USAGE_MAX_THREADS = int(os.getenv("USAGE_MAX_THREADS", "1000"))
+USAGE_RECENT_REQUESTS = int(os.getenv("USAGE_RECENT_REQUESTS", "200"))
+
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+def _empty_usage() -> Dict[str, Any]:
+    return {"llm_calls": 0, "llm_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+            "total_tokens": 0}
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"requests": 0, "cancelled": 0, "duration_s": 0.0, **_empty_usage(),
+            "tokens_saved_estimate": 0}
+
+
+def top_level_node(metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+    """从 langgraph_checkpoint_ns（如 research:<id>|model:<id>）中取出顶层节点名"""
+    if not metadata:
+        return None
+    namespace = metadata.get("langgraph_checkpoint_ns") or ""
+    if namespace:
+        return namespace.split("|", 1)[0].split(":", 1)[0]
+    return metadata.get("langgraph_node")
+
+
+def response_model(response: LLMResult) -> Optional[str]:
+    """实际返回结果的模型（经过路由时与调用参数中的模型不同）"""
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "response_metadata", None) or {}
+            if metadata.get("model_name"):
+                return str(metadata["model_name"])
+    return (response.llm_output or {}).get("model_name")
+
+
+def extract_usage(response: LLMResult) -> Tuple[int, int]:
+    """返回 (prompt_tokens, completion_tokens)"""
+    prompt = completion = 0
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                found = True
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not found:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt = token_usage.get("prompt_tokens", 0)
+        completion = token_usage.get("completion_tokens", 0)
+    return prompt, completion
+
+
+class UsageTracker(BaseCallbackHandler):
+    """汇总一次请求内所有 LLM 调用的 token 用量和顶层节点耗时（每个请求一个实例）"""
+
+    # 只做计数，直接在回调线程中执行，不需要放进线程池
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.totals = _empty_usage()
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self._llm_runs: Dict[UUID, Tuple[str, str, float]] = {}
+        self._node_runs: Dict[UUID, Tuple[str, float]] = {}
+
+    def _node(self, name: str) -> Dict[str, Any]:
+        node = self.nodes.get(name)
+        if node is None:
+            node = self.nodes[name] = {"runs": 0, "seconds": 0.0, **_empty_usage()}
+        return node
+
+    # ------------------------------------------------------------------
+    # LLM 调用
+    # ------------------------------------------------------------------
+
+    def _start_llm(self, serialized: Optional[Dict[str, Any]], run_id: UUID,
+                   metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = (params.get("model") or params.get("model_name")
+                 or (metadata or {}).get("ls_model_name") or kwargs.get("name")
+                 or (serialized or {}).get("name") or "unknown")
+        node = top_level_node(metadata) or "unknown"
+        with self._lock:
+            self._llm_runs[run_id] = (node, str(model), time.perf_counter())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start_llm(serialized, run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start_llm(serialized, run_id, metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        prompt, completion = extract_usage(response)
+        with self._lock:
+            run = self._llm_runs.pop(run_id, None)
+            if run is None:
+                return
+            node, model, started = run
+            model = response_model(response) or model
+            elapsed = time.perf_counter() - started
+            if model not in self.models:
+                self.models[model] = _empty_usage()
+            for usage in (self.totals, self.models[model], self._node(node)):
+                usage["llm_calls"] += 1
+                usage["llm_seconds"] += elapsed
+                usage["prompt_tokens"] += prompt
+                usage["completion_tokens"] += completion
+                usage["total_tokens"] += prompt + completion
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._llm_runs.pop(run_id, None)
+
+    # ------------------------------------------------------------------
+    # 顶层节点
+    # ------------------------------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        # 只统计顶层节点本身：命名空间只有一段，且 run 的名称就是节点名
+        node = (metadata or {}).get("langgraph_node")
+        namespace = (metadata or {}).get("langgraph_checkpoint_ns") or ""
+        if not node or "|" in namespace or kwargs.get("name") != node:
+            return
+        with self._lock:
+            self._node_runs[run_id] = (node, time.perf_counter())
+
+    def _end_chain(self, run_id: UUID) -> None:
+        with self._lock:
+            run = self._node_runs.pop(run_id, None)
+            if run is None:
+                return
+            node = self._node(run[0])
+            node["runs"] += 1
+            node["seconds"] += time.perf_counter() - run[1]
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # 中断（GraphInterrupt）也会走到这里，已执行的时间同样计入
+        self._end_chain(run_id)
+
+    def summary(self) -> Dict[str, Any]:
+        """返回本次请求的用量汇总"""
+        with self._lock:
+            return {
+                "duration_s": time.perf_counter() - self.started,
+                **self.totals,
+                "models": {name: dict(usage) for name, usage in self.models.items()},
+                "nodes": {name: dict(usage) for name, usage in self.nodes.items()},
+            }
+
+
+class UsageStore:
+    """按 thread_id 累计的用量统计（LRU），以及最近请求的记录（线程安全）
+
+    Args:
+        max_threads: 保留统计的 thread 数量上限
+        recent: 保留的最近请求数
+    """
+
+    def __init__(self, max_threads: int = USAGE_MAX_THREADS, recent: int = USAGE_RECENT_REQUESTS):
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self.totals = _empty_totals()
+        # 已完成（未取消）运行的次数和 tokens，用于估计取消节省的用量
+        self._completed = 0
+        self._completed_tokens = 0
+
+    def estimate_saved(self, summary: Dict[str, Any]) -> int:
+        """估计取消一次运行节省的 tokens：已完成运行的平均用量减去已用的量"""
+        with self._lock:
+            if not self._completed:
+                return 0
+            average = self._completed_tokens / self._completed
+        return max(0, round(average - summary.get("total_tokens", 0)))
+
+    def record(self, thread_id: str, summary: Dict[str, Any], cancelled: bool = False) -> Dict[str, Any]:
+        """累计一次请求的汇总，返回该 thread 的累计结果
+
+        cancelled 的请求计入 cancelled 和 tokens_saved_estimate（取自 summary），
+        不参与平均用量的计算。
+        """
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                entry = self._threads[thread_id] = {
+                    "thread_id": thread_id, **_empty_totals(), "nodes": {}}
+            self._threads.move_to_end(thread_id)
+            for target in (entry, self.totals):
+                target["requests"] += 1
+                for key in ("duration_s", "llm_calls", "llm_seconds", *TOKEN_FIELDS):
+                    target[key] += summary.get(key, 0)
+                if cancelled:
+                    target["cancelled"] += 1
+                    target["tokens_saved_estimate"] += summary.get("tokens_saved_estimate", 0)
+            if not cancelled:
+                self._completed += 1
+                self._completed_tokens += summary.get("total_tokens", 0)
+            for name, usage in summary.get("nodes", {}).items():
+                node = entry["nodes"].setdefault(name, {"runs": 0, "seconds": 0.0, **_empty_usage()})
+                for key, value in usage.items():
+                    node[key] += value
+            entry["last_request"] = summary
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+            self._recent.append({
+                "thread_id": thread_id,
+                "cancelled": cancelled,
+                "finished_at": time.time(),
+                "duration_s": summary.get("duration_s", 0.0),
+                "llm_calls": summary.get("llm_calls", 0),
+                "total_tokens": summary.get("total_tokens", 0),
+            })
+            return _copy(entry)
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """返回 thread 的累计用量，没有记录时返回 None"""
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            return _copy(entry) if entry is not None else None
+
+    def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """最近的请求中耗时最长的 limit 个"""
+        with self._lock:
+            recent = list(self._recent)
+        return sorted(recent, key=lambda item: -item["duration_s"])[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"threads": len(self._threads), **self.totals}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._threads.clear()
+            self._recent.clear()
+            self.totals = _empty_totals()
+            self._completed = 0
+            self._completed_tokens = 0
+
+
+def _copy(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {**entry, "nodes": {name: dict(usage) for name, usage in entry["nodes"].items()}}
+
+
+# 进程级共享的用量统计
+usage_store = UsageStore()
@@ -0,0 +1,24 @@
+"""
+持久化模块 - checkpointer 与中断状态存储
+"""
+from src.persistence.sqlite_saver import SqliteSaver
+from src.persistence.interrupt_store import (
+    InterruptStore,
+    MemoryInterruptStore,
+    SqliteInterruptStore,
+)
+from src.persistence.factory import (
+    get_checkpointer,
+    get_interrupt_store,
+    flush_checkpointer,
+)
+
+__all__ = [
+    'SqliteSaver',
+    'InterruptStore',
+    'MemoryInterruptStore',
+    'SqliteInterruptStore',
+    'get_checkpointer',
+    'get_interrupt_store',
+    'flush_checkpointer',
+]
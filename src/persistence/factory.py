@@ -0,0 +1,66 @@
+"""
+checkpointer / 中断存储的后端选择
+
+通过环境变量配置：
+    CHECKPOINT_BACKEND: memory（默认，单进程）或 sqlite（可多 worker 共享）
+    CHECKPOINT_DB_PATH: SQLite 数据库路径，默认 <项目根目录>/.data/checkpoints.sqlite
+    CHECKPOINT_BATCH_SIZE: 批量提交的写入条数，默认 32
+    CHECKPOINT_FLUSH_INTERVAL: 批量提交的最大间隔（秒），默认 0.5
+    CHECKPOINT_TTL_SECONDS: checkpoint 保留时间（秒），默认 7 天
+    INTERRUPT_TTL_SECONDS: 中断状态保留时间（秒），默认 1 天
+"""
+import os
+from functools import lru_cache
+from typing import Any
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.persistence.interrupt_store import (
+    InterruptStore,
+    MemoryInterruptStore,
+    SqliteInterruptStore,
+)
+from src.persistence.sqlite_saver import SqliteSaver
+from src.utils.path import get_project_root
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory")
+CHECKPOINT_DB_PATH = os.getenv(
+    "CHECKPOINT_DB_PATH", str(get_project_root() / ".data" / "checkpoints.sqlite"))
+CHECKPOINT_BATCH_SIZE = int(os.getenv("CHECKPOINT_BATCH_SIZE", "32"))
+CHECKPOINT_FLUSH_INTERVAL = float(os.getenv("CHECKPOINT_FLUSH_INTERVAL", "0.5"))
+CHECKPOINT_TTL_SECONDS = float(
+    os.getenv("CHECKPOINT_TTL_SECONDS", str(7 * 24 * 3600)))
+INTERRUPT_TTL_SECONDS = float(os.getenv("INTERRUPT_TTL_SECONDS", str(24 * 3600)))
+
+
+@lru_cache(maxsize=None)
+def get_checkpointer() -> BaseCheckpointSaver:
+    """返回进程内共享的 checkpointer"""
+    if CHECKPOINT_BACKEND == "sqlite":
+        return SqliteSaver(
+            CHECKPOINT_DB_PATH,
+            batch_size=CHECKPOINT_BATCH_SIZE,
+            flush_interval=CHECKPOINT_FLUSH_INTERVAL,
+            ttl_seconds=CHECKPOINT_TTL_SECONDS,
+        )
+    if CHECKPOINT_BACKEND == "memory":
+        return InMemorySaver()
+    raise ValueError(f"不支持的 CHECKPOINT_BACKEND: {CHECKPOINT_BACKEND}")
+
+
+@lru_cache(maxsize=None)
+def get_interrupt_store() -> InterruptStore:
+    """返回进程内共享的中断状态存储，与 checkpointer 使用同一种后端"""
+    if CHECKPOINT_BACKEND == "sqlite":
+        return SqliteInterruptStore(CHECKPOINT_DB_PATH, ttl_seconds=INTERRUPT_TTL_SECONDS)
+    if CHECKPOINT_BACKEND == "memory":
+        return MemoryInterruptStore(ttl_seconds=INTERRUPT_TTL_SECONDS)
+    raise ValueError(f"不支持的 CHECKPOINT_BACKEND: {CHECKPOINT_BACKEND}")
+
+
+async def flush_checkpointer(checkpointer: Any) -> None:
+    """提交 checkpointer 中缓冲的写入（不支持批量写入的后端直接忽略）"""
+    aflush = getattr(checkpointer, "aflush", None)
+    if aflush is not None:
+        await aflush()
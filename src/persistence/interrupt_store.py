@@ -0,0 +1,145 @@
+"""
+人工审批中断状态存储
+
+api 在检测到中断时保存 action_requests，前端带同一个 thread_id 再次请求时取出并恢复执行。
+提供进程内和 SQLite 两种实现，SQLite 实现可以在多个 uvicorn worker 之间共享。
+两种实现都带 TTL，过期的中断不会被返回，并在写入时顺带清理。
+"""
+import json
+import threading
+from abc import ABC, abstractmethod
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from src.utils.sqlite import connect_sqlite
+
+
+class InterruptStore(ABC):
+    """中断状态存储接口"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """返回未过期的中断状态，不存在时返回 None"""
+
+    @abstractmethod
+    def put(self, thread_id: str, data: Dict[str, Any]) -> None:
+        """保存中断状态（覆盖已有的）"""
+
+    @abstractmethod
+    def delete(self, thread_id: str) -> None:
+        """删除中断状态"""
+
+    def pop(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """取出并删除中断状态"""
+        data = self.get(thread_id)
+        if data is not None:
+            self.delete(thread_id)
+        return data
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        """清理过期的中断状态，返回清理的条数"""
+
+    def __contains__(self, thread_id: str) -> bool:
+        return self.get(thread_id) is not None
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+
+class MemoryInterruptStore(InterruptStore):
+    """进程内实现，仅适用于单 worker"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        super().__init__(ttl_seconds)
+        self._data: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(thread_id)
+            if entry is None:
+                return None
+            if self._expired(entry[0]):
+                del self._data[thread_id]
+                return None
+            return entry[1]
+
+    def put(self, thread_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[thread_id] = (time.time(), data)
+        self.evict_expired()
+
+    def delete(self, thread_id: str) -> None:
+        with self._lock:
+            self._data.pop(thread_id, None)
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            expired = [k for k, (created_at, _) in self._data.items()
+                       if self._expired(created_at)]
+            for key in expired:
+                del self._data[key]
+            return len(expired)
+
+
+class SqliteInterruptStore(InterruptStore):
+    """SQLite 实现，多个 worker 共享同一个数据库文件"""
+
+    def __init__(self, db_path: str, ttl_seconds: Optional[float] = None):
+        super().__init__(ttl_seconds)
+        self.conn = connect_sqlite(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS interrupts ("
+            "thread_id TEXT PRIMARY KEY, data TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT data, created_at FROM interrupts WHERE thread_id = ?",
+                (thread_id,),
+            ).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        return json.loads(row[0])
+
+    def put(self, thread_id: str, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO interrupts (thread_id, data, created_at) "
+                "VALUES (?, ?, ?)",
+                (thread_id, payload, time.time()),
+            )
+        self.evict_expired()
+
+    def delete(self, thread_id: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM interrupts WHERE thread_id = ?", (thread_id,))
+
+    def pop(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        # 用 DELETE ... RETURNING 保证只有一个 worker 能取到同一个中断
+        with self._lock:
+            row = self.conn.execute(
+                "DELETE FROM interrupts WHERE thread_id = ? RETURNING data, created_at",
+                (thread_id,),
+            ).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        return json.loads(row[0])
+
+    def evict_expired(self) -> int:
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM interrupts WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            return cursor.rowcount
@@ -0,0 +1,488 @@
+"""
+基于本地 SQLite 的 LangGraph checkpointer
+
+- WAL 模式：读写互不阻塞，多个 uvicorn worker 可以共享同一个数据库文件
+- 增量写入：channel 值按版本单独存储，每一步只写入发生变化的 channel
+- 批量写入：put / put_writes 先进入内存缓冲，按条数或时间间隔合并为一个事务提交，
+  同进程内的读取会先刷新缓冲，保证读到自己写入的数据
+- TTL 淘汰：最后一次写入早于 ttl_seconds 的 thread 会被整体删除
+
+注意：批量写入意味着进程崩溃时最多丢失 flush_interval 秒内的 checkpoint。
+跨 worker 恢复前需要调用 flush()/aflush()（api 在每次流结束时会调用）。
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from src.utils.sqlite import connect_sqlite
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_created_at ON checkpoints (created_at);
+"""
+
+_INSERT_CHECKPOINT = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+    "parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_BLOB = (
+    "INSERT OR IGNORE INTO blobs (thread_id, checkpoint_ns, channel, version, type, blob) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_UPSERT_WRITE = (
+    "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, "
+    "idx, channel, type, value, task_path, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_WRITE = _UPSERT_WRITE.replace("OR REPLACE", "OR IGNORE")
+
+
+class SqliteSaver(BaseCheckpointSaver[str]):
+    """带批量写入和 TTL 淘汰的 SQLite checkpointer
+
+    Args:
+        db_path: 数据库文件路径，":memory:" 表示内存数据库（仅用于测试）
+        batch_size: 缓冲达到多少条写入时提交，1 表示每次写入立即提交
+        flush_interval: 距上次提交超过多少秒时，下一次写入会触发提交
+        ttl_seconds: thread 的保留时间，None 表示不淘汰
+        eviction_interval: 两次 TTL 淘汰之间的最小间隔（秒）
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        *,
+        batch_size: int = 32,
+        flush_interval: float = 0.5,
+        ttl_seconds: Optional[float] = None,
+        eviction_interval: float = 60.0,
+        serde: Any = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.ttl_seconds = ttl_seconds
+        self.eviction_interval = eviction_interval
+        self.conn = connect_sqlite(db_path)
+        self.conn.executescript(_SCHEMA)
+        # 连接锁：串行化所有 SQLite 读写，提交期间会长时间持有
+        self._lock = threading.RLock()
+        # 缓冲锁：只保护缓冲本身，持有时间很短，事件循环上的写入不会等待磁盘 I/O
+        self._pending_lock = threading.Lock()
+        # 缓冲的写入：(sql, params)
+        self._pending: List[Tuple[str, tuple]] = []
+        self._last_flush = time.monotonic()
+        self._last_eviction = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # 缓冲与提交
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, rows: List[Tuple[str, tuple]]) -> bool:
+        """写入缓冲，返回是否需要提交"""
+        with self._pending_lock:
+            self._pending.extend(rows)
+            return (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+    def flush(self) -> int:
+        """将缓冲中的写入合并为一个事务提交，返回提交的条数"""
+        with self._lock:
+            # 取出缓冲后立即释放缓冲锁，提交期间新的写入继续进入缓冲；
+            # 取出和提交都在连接锁内，各批次按取出的顺序提交
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            if pending:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for sql, params in pending:
+                        self.conn.execute(sql, params)
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+            if (
+                self.ttl_seconds is not None
+                and time.monotonic() - self._last_eviction >= self.eviction_interval
+            ):
+                self.evict_expired()
+            return len(pending)
+
+    async def aflush(self) -> int:
+        return await asyncio.to_thread(self.flush)
+
+    def evict_expired(self, ttl_seconds: Optional[float] = None) -> int:
+        """删除最后一次写入早于 TTL 的 thread，返回删除的 thread 数"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl is None:
+            return 0
+        cutoff = time.time() - ttl
+        with self._lock:
+            self._last_eviction = time.monotonic()
+            rows = self.conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id "
+                "HAVING MAX(created_at) < ?",
+                (cutoff,),
+            ).fetchall()
+            for (thread_id,) in rows:
+                self._delete_thread_locked(thread_id)
+            return len(rows)
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [
+            (task_id, channel, self.serde.loads_typed((type_, value)))
+            for task_id, channel, type_, value in rows
+        ]
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict:
+        values = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row and row[0] != "empty":
+                values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _row_to_tuple(self, row: tuple) -> CheckpointTuple:
+        (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+         type_, checkpoint, metadata_type, metadata) = row
+        checkpoint_: Checkpoint = self.serde.loads_typed((type_, checkpoint))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint_,
+                "channel_values": self._load_blobs(
+                    thread_id, checkpoint_ns, checkpoint_["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=self._load_writes(
+                thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = (
+            "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata"
+        )
+        with self._lock:
+            # 先提交缓冲，保证读到本进程最新的写入
+            self.flush()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? "
+                    "AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? "
+                    "AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._row_to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute(sql, params).fetchall()
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                item = self._row_to_tuple(row)
+                if filter and not all(
+                    item.metadata.get(k) == v for k, v in filter.items()
+                ):
+                    continue
+                results.append(item)
+        yield from results
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _checkpoint_rows(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Tuple[List[Tuple[str, tuple]], RunnableConfig]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        # 只序列化本步骤有新版本的 channel
+        rows: List[Tuple[str, tuple]] = []
+        for channel, version in new_versions.items():
+            blob_type, blob = (
+                self.serde.dumps_typed(values[channel])
+                if channel in values else ("empty", b"")
+            )
+            rows.append((_INSERT_BLOB, (
+                thread_id, checkpoint_ns, channel, str(version), blob_type, blob)))
+        type_, serialized = self.serde.dumps_typed(c)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata))
+        rows.append((
+            _INSERT_CHECKPOINT,
+            (
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),
+                type_,
+                serialized,
+                metadata_type,
+                serialized_metadata,
+                time.time(),
+            ),
+        ))
+        next_config: RunnableConfig = {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+        return rows, next_config
+
+    def _write_rows(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str,
+    ) -> List[Tuple[str, tuple]]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 特殊 channel（错误、中断、恢复）允许覆盖，普通写入保持首次写入的结果
+        sql = _UPSERT_WRITE if all(
+            w[0] in WRITES_IDX_MAP for w in writes) else _INSERT_WRITE
+        now = time.time()
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append((sql, (
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                type_,
+                serialized,
+                task_path,
+                now,
+            )))
+        return rows
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        rows, next_config = self._checkpoint_rows(
+            config, checkpoint, metadata, new_versions)
+        if self._enqueue(rows):
+            self.flush()
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if self._enqueue(self._write_rows(config, writes, task_id, task_path)):
+            self.flush()
+
+    def _delete_thread_locked(self, thread_id: str) -> None:
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        self.conn.execute("DELETE FROM blobs WHERE thread_id = ?", (thread_id,))
+        self.conn.execute("COMMIT")
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.flush()
+            self._delete_thread_locked(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        next_v = current_v + 1
+        next_h = random.random()
+        return f"{next_v:032}.{next_h:016}"
+
+    # ------------------------------------------------------------------
+    # 异步接口：写入只进缓冲，磁盘 I/O 放到线程池，避免阻塞事件循环
+    # ------------------------------------------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        rows, next_config = self._checkpoint_rows(
+            config, checkpoint, metadata, new_versions)
+        if self._enqueue(rows):
+            await self.aflush()
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if self._enqueue(self._write_rows(config, writes, task_id, task_path)):
+            await self.aflush()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
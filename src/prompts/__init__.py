@@ -1,9 +1,18 @@
 """
 Prompts 模块
 """
-from src.prompts.template import apply_prompt_template, get_prompt_template
+from src.prompts.template import (
+    RenderedPrompt,
+    apply_prompt_template,
+    get_prompt_template,
+    prompt_registry,
+    render_prompt,
+)
 
 __all__ = [
     "get_prompt_template",
     "apply_prompt_template",
+    "render_prompt",
+    "RenderedPrompt",
+    "prompt_registry",
 ]
@@ -2,11 +2,16 @@
 # SPDX-License-Identifier: MIT
 
 import dataclasses
+import hashlib
 import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
-from jinja2 import Environment, FileSystemLoader, TemplateNotFound, select_autoescape
+from jinja2 import Environment, FileSystemLoader, Template, TemplateNotFound, select_autoescape
 
 from src.config.configuration import Configuration
 
@@ -17,6 +22,159 @@ env = Environment(
     trim_blocks=True,
     lstrip_blocks=True,
 )
+# Static prefix / volatile suffix are compiled from strings; keep the same
+# (non-escaping) behaviour the .md file templates get from select_autoescape.
+_string_env = env.overlay(autoescape=False)
+
+# Variables that change between calls. Lines referencing them are moved out of
+# the static prefix into the volatile suffix so that the rendered system prompt
+# starts with a byte-identical prefix, which provider-side prompt/KV caches reuse.
+VOLATILE_VARIABLES = frozenset({"CURRENT_TIME"})
+
+_FRONT_MATTER = re.compile(r"\A---\n(.*?)---\n", re.DOTALL)
+_VARIABLE = re.compile(r"{{-?\s*(\w+)")
+
+# Number of distinct prefix hashes remembered per template
+_PREFIX_HISTORY = 32
+
+
+def _normalize_locale(locale: str) -> str:
+    return locale.replace("-", "_") if locale and locale.strip() else "en_US"
+
+
+def split_volatile(source: str) -> Tuple[str, str]:
+    """
+    Split template source into a static part and a volatile part.
+
+    Lines that reference a variable in VOLATILE_VARIABLES are removed from the
+    static part. If the front matter block ends up empty it is dropped as well.
+
+    Returns:
+        (static_source, volatile_source); volatile_source is wrapped in its own
+        front matter block, or empty if the template has no volatile lines
+    """
+    static_lines, volatile_lines = [], []
+    for line in source.splitlines(keepends=True):
+        if VOLATILE_VARIABLES.intersection(_VARIABLE.findall(line)):
+            volatile_lines.append(line)
+        else:
+            static_lines.append(line)
+    if not volatile_lines:
+        return source, ""
+
+    static_source = "".join(static_lines)
+    match = _FRONT_MATTER.match(static_source)
+    if match and not match.group(1).strip():
+        static_source = static_source[match.end():]
+    volatile_source = "---\n" + "".join(volatile_lines).rstrip("\n") + "\n---"
+    return static_source.lstrip("\n"), volatile_source
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """A rendered prompt split into a cacheable prefix and a per-call suffix."""
+
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        if not self.suffix:
+            return self.prefix
+        return f"{self.prefix.rstrip()}\n\n{self.suffix}"
+
+
+class CompiledPrompt:
+    """A resolved and precompiled prompt template with prefix reuse statistics."""
+
+    def __init__(self, name: str, template: Template):
+        self.name = name
+        self.template = template
+        source, _, _ = env.loader.get_source(env, name)  # type: ignore[union-attr]
+        static_source, volatile_source = split_volatile(source)
+        self.prefix_template = _string_env.from_string(static_source)
+        self.suffix_template = _string_env.from_string(volatile_source) if volatile_source else None
+
+        self._lock = threading.Lock()
+        self._prefixes: "OrderedDict[str, None]" = OrderedDict()
+        self.renders = 0
+        self.prefix_reuses = 0
+
+    def render(self, variables: Dict[str, Any]) -> RenderedPrompt:
+        prefix = self.prefix_template.render(**variables)
+        suffix = self.suffix_template.render(**variables) if self.suffix_template else ""
+        self._record(prefix)
+        return RenderedPrompt(prefix, suffix)
+
+    def _record(self, prefix: str) -> None:
+        digest = hashlib.sha1(prefix.encode("utf-8")).hexdigest()
+        with self._lock:
+            self.renders += 1
+            if digest in self._prefixes:
+                self.prefix_reuses += 1
+                self._prefixes.move_to_end(digest)
+                return
+            self._prefixes[digest] = None
+            if len(self._prefixes) > _PREFIX_HISTORY:
+                self._prefixes.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "renders": self.renders,
+                "prefix_reuses": self.prefix_reuses,
+                "prefix_reuse_rate": self.prefix_reuses / self.renders if self.renders else 0.0,
+                "distinct_prefixes": len(self._prefixes),
+            }
+
+
+class PromptRegistry:
+    """
+    Resolves (prompt_name, locale) to a template file once and caches the
+    compiled result, so rendering does not go through TemplateNotFound again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiled: Dict[Tuple[str, str], CompiledPrompt] = {}
+
+    def get(self, prompt_name: str, locale: str = "en-US") -> CompiledPrompt:
+        key = (prompt_name, _normalize_locale(locale))
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                compiled = self._compile(*key)
+                self._compiled[key] = compiled
+            return compiled
+
+    @staticmethod
+    def _compile(prompt_name: str, normalized_locale: str) -> CompiledPrompt:
+        # Try locale-specific template first (e.g., researcher.zh_CN.md)
+        name = f"{prompt_name}.{normalized_locale}.md"
+        try:
+            template = env.get_template(name)
+        except TemplateNotFound:
+            # Fallback to English template if locale-specific not found
+            name = f"{prompt_name}.md"
+            template = env.get_template(name)
+        return CompiledPrompt(name, template)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-template render and prefix reuse counters"""
+        with self._lock:
+            compiled = list(self._compiled.items())
+        return {f"{name}:{locale}": c.stats() for (name, locale), c in compiled}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._compiled.clear()
+
+
+# Process-wide registry
+prompt_registry = PromptRegistry()
 
 
 def get_prompt_template(
@@ -36,32 +194,23 @@ def get_prompt_template(
         The template string with proper variable substitution syntax
     """
     try:
-        # Normalize locale format
-        normalized_locale = locale.replace(
-            "-", "_") if locale and locale.strip() else "en_US"
-
-        # Try locale-specific template first (e.g., researcher.zh_CN.md)
-        try:
-            template = env.get_template(
-                f"{prompt_name}.{normalized_locale}.md")
-            return template.render(**(context or {}))
-        except TemplateNotFound:
-            # Fallback to English template if locale-specific not found
-            template = env.get_template(f"{prompt_name}.md")
-            return template.render(**(context or {}))
+        return prompt_registry.get(prompt_name, locale).template.render(**(context or {}))
     except Exception as e:
         raise ValueError(
             f"Error loading template {prompt_name} for locale {locale}: {e}")
 
 
-def apply_prompt_template(
+def render_prompt(
     prompt_name: str,
     state: Any,
     configurable: Optional[Configuration] = None,
     locale: str = "en-US",
-) -> str:
+) -> RenderedPrompt:
     """
-    Apply template variables to a prompt template and return formatted messages.
+    Render a prompt template into a static prefix and a volatile suffix.
+
+    The prefix only depends on the template and the state/configurable
+    variables; per-call values such as CURRENT_TIME are rendered into the suffix.
 
     Args:
         prompt_name: Name of the prompt template to use
@@ -70,7 +219,7 @@ def apply_prompt_template(
         locale: Language locale for template selection (e.g., en-US, zh-CN)
 
     Returns:
-        List of messages with the system prompt as the first message
+        RenderedPrompt with prefix and suffix
     """
     # Convert state to dict for template rendering
     state_vars = {
@@ -83,20 +232,31 @@ def apply_prompt_template(
         state_vars.update(dataclasses.asdict(configurable))
 
     try:
-        # Normalize locale format
-        normalized_locale = locale.replace(
-            "-", "_") if locale and locale.strip() else "en_US"
-
-        # Try locale-specific template first
-        try:
-            template = env.get_template(
-                f"{prompt_name}.{normalized_locale}.md")
-        except TemplateNotFound:
-            # Fallback to English template
-            template = env.get_template(f"{prompt_name}.md")
-
-        system_prompt = template.render(**state_vars)
-        return system_prompt
+        return prompt_registry.get(prompt_name, locale).render(state_vars)
     except Exception as e:
         raise ValueError(
             f"Error applying template {prompt_name} for locale {locale}: {e}")
+
+
+def apply_prompt_template(
+    prompt_name: str,
+    state: Any,
+    configurable: Optional[Configuration] = None,
+    locale: str = "en-US",
+) -> str:
+    """
+    Apply template variables to a prompt template and return the system prompt.
+
+    The static prefix comes first and the volatile suffix (CURRENT_TIME) last,
+    so consecutive calls share a byte-identical prefix.
+
+    Args:
+        prompt_name: Name of the prompt template to use
+        state: Current agent state (as a dict-like mapping) containing variables to substitute
+        configurable: Configuration object with additional variables
+        locale: Language locale for template selection (e.g., en-US, zh-CN)
+
+    Returns:
+        The rendered system prompt
+    """
+    return render_prompt(prompt_name, state, configurable, locale).text
@@ -4,6 +4,13 @@ from langchain_core.messages import BaseMessage
 import operator
 
 
+def merge_subtask_results(left: Optional[List[dict]], right: Optional[List[dict]]) -> List[dict]:
+    """并行子任务结果的 reducer：各分支的结果依次追加，写入 None 时清空"""
+    if right is None:
+        return []
+    return (left or []) + right
+
+
 class State(MessagesState):
     # ReAct Loop Control
     react_iteration_count: int  # Counter for reAct loop iterations
@@ -20,6 +27,10 @@ class State(MessagesState):
     current_subtask: Optional[str]
     subtask_result: Optional[dict]
 
+    # Parallel Subtasks (fan-out via Send)
+    subtasks: Optional[List[str]]  # Independent subtasks not dispatched yet
+    subtask_results: Annotated[List[dict], merge_subtask_results]  # Results of the current batch
+
     next_agent: Optional[str]  # Next agent to call, decided by supervisor
     iteration_count: Dict[str, int]  # Track iterations for each agent
     is_completed: bool  # Whether the workflow is completed
@@ -38,6 +49,8 @@ def init_agent_state(locale: str = "en-US"):
         "actor_tools": None,
         "current_subtask": None,
         "subtask_result": None,
+        "subtasks": None,
+        "subtask_results": [],
         "next_agent": None,
         "iteration_count": {},
         "is_completed": False,
@@ -3,8 +3,9 @@
 """
 from src.tools.search import search_web
 from src.tools.read_url import read_url_by_markdown, read_url_by_originally
+from src.tools.read_urls import read_urls
 from src.tools.write_file import write_file
 from src.tools.get_file import get_file
 
 __all__ = ['search_web', 'read_url_by_markdown',
-           'read_url_by_originally', 'write_file', 'get_file']
+           'read_url_by_originally', 'read_urls', 'write_file', 'get_file']
@@ -1,10 +1,15 @@
 from langchain_core.tools import tool
 from langchain.tools import ToolRuntime
+from src.monitoring.logger import get_logger, preview
+from src.monitoring.metrics import metrics, timed
 from src.utils.path import resolve_file_path
 from typing import Optional
 
+logger = get_logger(__name__)
+
 
 @tool("get_file", parse_docstring=True)
+@timed("tool", "get_file")
 def get_file(file_path: str, runtime: ToolRuntime) -> str:
     """读取指定文件的文本内容。
 
@@ -21,13 +26,13 @@ def get_file(file_path: str, runtime: ToolRuntime) -> str:
         str: 文件文本内容；失败时返回以 "Error:" 开头的错误信息。
     """
 
-    # 打印输入信息
-    print(f"[get_file] 输入: file_path={file_path}")
+    logger.debug("[get_file] 输入: file_path=%s", file_path)
 
     # 使用通用路径解析函数
     target_path, error = resolve_file_path(file_path, "get_file")
     if error:
-        print(f"[get_file] 输出: {error}")
+        metrics.count_error("tool", "get_file")
+        logger.warning("[get_file] 输出: %s", error)
         return error
 
     # 此时 target_path 必定不为 None（因为 error 为空）
@@ -37,27 +42,30 @@ def get_file(file_path: str, runtime: ToolRuntime) -> str:
     try:
         with open(target_path, "r", encoding="utf-8") as f:
             content = f.read()
-            output_preview = content[:200] + \
-                "..." if len(content) > 200 else content
-            print(f"[get_file] 输出: {output_preview}")
+            logger.debug("[get_file] 输出: %s", preview(content, 200))
             return content
     except FileNotFoundError:
         output = f"Error: 文件不存在 {target_path}"
-        print(f"[get_file] 输出: {output}")
+        metrics.count_error("tool", "get_file")
+        logger.warning("[get_file] 输出: %s", output)
         return output
     except UnicodeDecodeError:
         output = f"Error: 文件不是 UTF-8 文本或解码失败: {target_path}"
-        print(f"[get_file] 输出: {output}")
+        metrics.count_error("tool", "get_file")
+        logger.warning("[get_file] 输出: %s", output)
         return output
     except PermissionError:
         output = f"Error: 没有权限读取文件 {target_path}"
-        print(f"[get_file] 输出: {output}")
+        metrics.count_error("tool", "get_file")
+        logger.warning("[get_file] 输出: %s", output)
         return output
     except OSError as e:
         output = f"Error: 文件读取失败: {str(e)}"
-        print(f"[get_file] 输出: {output}")
+        metrics.count_error("tool", "get_file")
+        logger.warning("[get_file] 输出: %s", output)
         return output
     except Exception as e:
         output = f"Error: 发生未知错误: {str(e)}"
-        print(f"[get_file] 输出: {output}")
+        metrics.count_error("tool", "get_file")
+        logger.warning("[get_file] 输出: %s", output)
         return output
@@ -1,23 +1,198 @@
 """
 网页读取工具
+
+所有请求都通过共享连接池 src.utils.http_client 发出，同一 host 的多次抓取复用连接。
+read_url_by_markdown 的下载和提取结果保存在 src.utils.page_cache 中，命中时直接返回。
+正文提取在 src.utils.extract_pool 的进程池中执行，不占用调用线程的 GIL。
+下载通过 src.utils.download 流式读取，字节上限由 max_chars 决定，二进制内容直接拒绝。
+工具同时提供同步和异步实现：tool.invoke 走同步客户端，tool.ainvoke 走异步客户端，
+不会阻塞事件循环。
 """
-from langchain_core.tools import tool
+import asyncio
+import importlib.util
+from typing import Optional
+
+from langchain_core.tools import StructuredTool
 from langchain.tools import ToolRuntime
+from src.monitoring.logger import get_logger, preview
+from src.monitoring.metrics import metrics, timed
+from src.utils.download import (
+    Download,
+    UnsupportedContentError,
+    adownload_text,
+    byte_cap,
+    download_text,
+)
+from src.utils.http_client import httpx
+from src.utils.page_cache import CachedPage, page_cache
+from src.utils.extract_pool import extraction_pool
 from src.utils.mock import mock_tool_runtime
 
-try:
-    import requests
-except ImportError:
-    requests = None
+# trafilatura 只在提取进程中导入，这里仅检查是否已安装
+TRAFILATURA_AVAILABLE = importlib.util.find_spec("trafilatura") is not None
+
+# read_url_by_originally 直接返回原文，按 UTF-8 每个字符最多 4 字节计算下载上限
+ORIGINALLY_BYTES_PER_CHAR = 4
+ORIGINALLY_MIN_BYTES = 16 * 1024
+
+logger = get_logger(__name__)
+
+
+def _validate_args(url: str, max_chars: int) -> Optional[str]:
+    """校验参数，返回错误信息；参数合法时返回 None"""
+    if not url:
+        return "Error: url 不能为空"
+
+    if not isinstance(max_chars, int) or max_chars <= 0:
+        return "Error: max_chars 必须是正整数"
+
+    if not url.startswith(("http://", "https://")):
+        return "Error: 仅支持 http 或 https 协议"
+
+    if httpx is None:
+        return "Error: httpx 库未安装。请运行: uv add httpx"
+
+    return None
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """按 max_chars 截断文本，截断时附带提示信息"""
+    if len(text) <= max_chars:
+        return text
+    truncated = text[:max_chars].rstrip()
+    return f"{truncated}\n\n... (内容已截断，原文共 {len(text)} 个字符)"
+
+
+def _originally_result(download: Download, max_chars: int) -> str:
+    text = download.text.strip()
+    if not text:
+        output = "读取成功，但页面内容为空"
+        logger.debug("[read_url_by_originally] 输出: %s", output)
+        return output
+
+    if download.truncated and len(text) <= max_chars:
+        output = f"{text}\n\n... (内容已截断，仅读取了前 {download.bytes_read} 字节)"
+    elif download.truncated:
+        output = f"{text[:max_chars].rstrip()}\n\n... (内容已截断，页面超过 {download.bytes_read} 字节)"
+    else:
+        output = _truncate(text, max_chars)
+    logger.debug("[read_url_by_originally] 输出: %s", preview(output))
+    return output
+
+
+def _originally_byte_cap(max_chars: int) -> int:
+    return byte_cap(max_chars, ORIGINALLY_BYTES_PER_CHAR, ORIGINALLY_MIN_BYTES)
+
+
+def _markdown_output(markdown_text: Optional[str], max_chars: int) -> str:
+    if not markdown_text:
+        output = "读取成功，但页面内容为空或无法提取正文"
+        logger.debug("[read_url] 输出: %s", output)
+        return output
+
+    output = _truncate(markdown_text, max_chars)
+    logger.debug("[read_url] 输出: %s", preview(output))
+    return output
+
+
+class EmptyDownloadError(Exception):
+    """下载成功但响应体为空"""
+
+
+def _cached_lookup(url: str) -> Optional[CachedPage]:
+    return page_cache.get(url) if page_cache is not None else None
+
+
+def _revalidated(url: str, download: Download, cached: Optional[CachedPage]) -> bool:
+    """服务端返回 304 时刷新缓存有效期"""
+    if cached is not None and download.status_code == 304:
+        logger.debug("[read_url] 缓存重新验证通过: %s", url)
+        page_cache.refresh(url, download.headers)
+        return True
+    return False
+
+
+def _downloaded_text(download: Download) -> str:
+    if not download.text:
+        raise EmptyDownloadError("Error: 无法下载网页内容")
+    if download.truncated:
+        logger.info("[read_url] 页面超过下载上限，仅读取了前 %d 字节: %s",
+                    download.bytes_read, download.url)
+    logger.debug("[read_url] 下载的网页内容: %s", preview(download.text, 500))
+    return download.text
+
+
+def _store(url: str, download: Download, markdown_text: Optional[str]) -> None:
+    # 截断的页面不缓存，避免之后用更大的 max_chars 读取时拿到不完整的内容
+    if page_cache is not None and not download.truncated:
+        page_cache.put(url, download.headers, download.text, markdown_text)
 
-try:
-    import trafilatura
-except ImportError:
-    trafilatura = None
 
+def fetch_markdown(url: str, max_chars: int = 4000) -> Optional[str]:
+    """下载网页并提取完整的 Markdown 正文（不截断），优先使用缓存
 
-@tool("read_url_by_originally", parse_docstring=True)
-def read_url_by_originally(url: str, runtime: ToolRuntime, max_chars: int = 4000) -> str:
+    网页按 max_chars 对应的字节上限流式下载，超出部分不会下载。
+
+    Returns:
+        Markdown 正文，页面为空或无法提取正文时返回 None
+
+    Raises:
+        EmptyDownloadError: 响应体为空
+        UnsupportedContentError: 响应不是文本内容
+        Exception: 下载或提取失败
+    """
+    cached = _cached_lookup(url)
+    if cached is not None and cached.fresh:
+        logger.debug("[read_url] 缓存命中: %s", url)
+        return cached.markdown
+
+    # 通过共享连接池流式下载网页内容，缓存过期时发起条件请求
+    download = download_text(
+        url, byte_cap(max_chars), headers=cached.validators() if cached else None)
+    if _revalidated(url, download, cached):
+        return cached.markdown
+
+    # 使用 trafilatura 提取网页内容并转换为 Markdown
+    markdown_text = extraction_pool.extract(_downloaded_text(download))
+    _store(url, download, markdown_text)
+    return markdown_text
+
+
+async def afetch_markdown(url: str, max_chars: int = 4000) -> Optional[str]:
+    """fetch_markdown 的异步实现（缓存的 SQLite 读写在线程池中执行，不阻塞事件循环）"""
+    cached = await asyncio.to_thread(_cached_lookup, url)
+    if cached is not None and cached.fresh:
+        logger.debug("[read_url] 缓存命中: %s", url)
+        return cached.markdown
+
+    download = await adownload_text(
+        url, byte_cap(max_chars), headers=cached.validators() if cached else None)
+    if await asyncio.to_thread(_revalidated, url, download, cached):
+        return cached.markdown
+
+    markdown_text = await extraction_pool.aextract(_downloaded_text(download))
+    await asyncio.to_thread(_store, url, download, markdown_text)
+    return markdown_text
+
+
+def _markdown_error(exc: Exception) -> str:
+    output = str(exc) if isinstance(
+        exc, EmptyDownloadError) else f"读取页面失败: {exc}"
+    metrics.count_error("tool", "read_url_by_markdown")
+    logger.warning("[read_url] 输出: %s", output)
+    return output
+
+
+def validate_markdown_args(url: str, max_chars: int) -> Optional[str]:
+    """校验 read_url_by_markdown 的参数，返回错误信息；参数合法时返回 None"""
+    error = _validate_args(url, max_chars)
+    if not error and not TRAFILATURA_AVAILABLE:
+        error = "Error: trafilatura 库未安装。请运行: uv add trafilatura"
+    return error
+
+
+@timed("tool", "read_url_by_originally")
+def _read_url_by_originally(url: str, runtime: ToolRuntime, max_chars: int = 4000) -> str:
     """读取指定网页并返回原始正文文本。
 
     Args:
@@ -28,61 +203,49 @@ def read_url_by_originally(url: str, runtime: ToolRuntime, max_chars: int = 4000
         str: 网页正文文本，如需截断会附带提示信息
     """
 
-    # 打印输入信息
-    print(f"[read_url_by_originally] 输入: url={url}, max_chars={max_chars}")
+    logger.debug("[read_url_by_originally] 输入: url=%s, max_chars=%s", url, max_chars)
 
-    if not url:
-        return "Error: url 不能为空"
+    error = _validate_args(url, max_chars)
+    if error:
+        metrics.count_error("tool", "read_url_by_originally")
+        logger.warning("[read_url_by_originally] 输出: %s", error)
+        return error
 
-    if not isinstance(max_chars, int) or max_chars <= 0:
-        return "Error: max_chars 必须是正整数"
+    try:
+        download = download_text(url, _originally_byte_cap(max_chars))
+    except (httpx.HTTPError, UnsupportedContentError) as exc:
+        output = f"读取页面失败: {exc}"
+        metrics.count_error("tool", "read_url_by_originally")
+        logger.warning("[read_url_by_originally] 输出: %s", output)
+        return output
 
-    if not url.startswith(("http://", "https://")):
-        return "Error: 仅支持 http 或 https 协议"
+    return _originally_result(download, max_chars)
 
-    if requests is None:
-        output = "Error: requests 库未安装。请运行: uv add requests"
-        print(f"[read_url_by_originally] 输出: {output}")
-        return output
+
+@timed("tool", "read_url_by_originally")
+async def _aread_url_by_originally(url: str, runtime: ToolRuntime, max_chars: int = 4000) -> str:
+    """read_url_by_originally 的异步实现"""
+    logger.debug("[read_url_by_originally] 输入: url=%s, max_chars=%s", url, max_chars)
+
+    error = _validate_args(url, max_chars)
+    if error:
+        metrics.count_error("tool", "read_url_by_originally")
+        logger.warning("[read_url_by_originally] 输出: %s", error)
+        return error
 
     try:
-        response = requests.get(
-            url,
-            timeout=10,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/118.0.0.0 Safari/537.36"
-                )
-            },
-        )
-        response.raise_for_status()
-    except requests.exceptions.RequestException as exc:
+        download = await adownload_text(url, _originally_byte_cap(max_chars))
+    except (httpx.HTTPError, UnsupportedContentError) as exc:
         output = f"读取页面失败: {exc}"
-        print(f"[read_url_by_originally] 输出: {output}")
-        return output
-
-    text = response.text.strip()
-    if not text:
-        output = "读取成功，但页面内容为空"
-        print(f"[read_url_by_originally] 输出: {output}")
+        metrics.count_error("tool", "read_url_by_originally")
+        logger.warning("[read_url_by_originally] 输出: %s", output)
         return output
 
-    if len(text) <= max_chars:
-        output_preview = text[:300] + "..." if len(text) > 300 else text
-        print(f"[read_url_by_originally] 输出: {output_preview}")
-        return text
-
-    truncated = text[:max_chars].rstrip()
-    output = f"{truncated}\n\n... (内容已截断，原文共 {len(text)} 个字符)"
-    output_preview = output[:300] + "..." if len(output) > 300 else output
-    print(f"[read_url_by_originally] 输出: {output_preview}")
-    return output
+    return _originally_result(download, max_chars)
 
 
-@tool("read_url_by_markdown", parse_docstring=True)
-def read_url_by_markdown(url: str, runtime: ToolRuntime, max_chars: int = 4000) -> str:
+@timed("tool", "read_url_by_markdown")
+def _read_url_by_markdown(url: str, runtime: ToolRuntime, max_chars: int = 4000) -> str:
     """读取指定网页并返回 Markdown 格式的正文内容。
 
     使用 trafilatura 库提取网页正文并转换为 Markdown 格式，自动过滤广告、导航等噪音内容。
@@ -95,82 +258,50 @@ def read_url_by_markdown(url: str, runtime: ToolRuntime, max_chars: int = 4000)
         str: 网页正文的 Markdown 格式文本，如需截断会附带提示信息
     """
 
-    # 打印输入信息
-    print(f"[read_url] 输入: url={url}, max_chars={max_chars}")
+    logger.debug("[read_url] 输入: url=%s, max_chars=%s", url, max_chars)
 
-    if not url:
-        return "Error: url 不能为空"
+    error = validate_markdown_args(url, max_chars)
+    if error:
+        metrics.count_error("tool", "read_url_by_markdown")
+        logger.warning("[read_url] 输出: %s", error)
+        return error
 
-    if not isinstance(max_chars, int) or max_chars <= 0:
-        return "Error: max_chars 必须是正整数"
+    try:
+        return _markdown_output(fetch_markdown(url, max_chars), max_chars)
+    except Exception as exc:
+        return _markdown_error(exc)
 
-    if not url.startswith(("http://", "https://")):
-        return "Error: 仅支持 http 或 https 协议"
 
-    if requests is None:
-        output = "Error: requests 库未安装。请运行: uv add requests"
-        print(f"[read_url] 输出: {output}")
-        return output
+@timed("tool", "read_url_by_markdown")
+async def _aread_url_by_markdown(url: str, runtime: ToolRuntime, max_chars: int = 4000) -> str:
+    """read_url_by_markdown 的异步实现"""
+    logger.debug("[read_url] 输入: url=%s, max_chars=%s", url, max_chars)
 
-    if trafilatura is None:
-        output = "Error: trafilatura 库未安装。请运行: uv add trafilatura"
-        print(f"[read_url] 输出: {output}")
-        return output
+    error = validate_markdown_args(url, max_chars)
+    if error:
+        metrics.count_error("tool", "read_url_by_markdown")
+        logger.warning("[read_url] 输出: %s", error)
+        return error
 
     try:
-        # 使用 requests 下载网页内容
-        response = requests.get(
-            url,
-            timeout=10,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/118.0.0.0 Safari/537.36"
-                )
-            },
-        )
-        response.raise_for_status()
-        downloaded = response.text
-
-        if not downloaded:
-            output = "Error: 无法下载网页内容"
-            print(f"[read_url] 输出: {output}")
-            return output
-        print(f"[read_url] 下载的网页内容: {downloaded[:500]}...")
-
-        # 使用 trafilatura 提取网页内容并转换为 Markdown
-        markdown_text = trafilatura.extract(
-            downloaded,
-            output_format="markdown",
-            include_comments=False,
-            include_tables=True,
-            include_images=False,
-            include_links=True,
-        )
-
-        if not markdown_text or not markdown_text.strip():
-            output = "读取成功，但页面内容为空或无法提取正文"
-            print(f"[read_url] 输出: {output}")
-            return output
-
-        text = markdown_text.strip()
-
-        if len(text) <= max_chars:
-            output_preview = text[:300] + "..." if len(text) > 300 else text
-            print(f"[read_url] 输出: {output_preview}")
-            return text
-
-        truncated = text[:max_chars].rstrip()
-        output = f"{truncated}\n\n... (内容已截断，原文共 {len(text)} 个字符)"
-        output_preview = output[:300] + "..." if len(output) > 300 else output
-        print(f"[read_url] 输出: {output_preview}")
-        return output
-
+        return _markdown_output(await afetch_markdown(url, max_chars), max_chars)
     except Exception as exc:
-        output = f"读取页面失败: {exc}"
-        print(f"[read_url] 输出: {output}")
-        return output
+        return _markdown_error(exc)
+
+
+read_url_by_originally = StructuredTool.from_function(
+    func=_read_url_by_originally,
+    coroutine=_aread_url_by_originally,
+    name="read_url_by_originally",
+    parse_docstring=True,
+)
+
+read_url_by_markdown = StructuredTool.from_function(
+    func=_read_url_by_markdown,
+    coroutine=_aread_url_by_markdown,
+    name="read_url_by_markdown",
+    parse_docstring=True,
+)
 
 
 if __name__ == "__main__":
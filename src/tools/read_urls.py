@@ -0,0 +1,219 @@
+"""
+批量网页读取工具
+
+一次工具调用读取多个 URL（例如搜索结果的前几条），下载和正文提取并发执行，
+整体耗时取决于最慢的一个页面，而不是所有页面耗时之和。
+
+- 全局并发上限 READ_URLS_CONCURRENCY（进程内所有调用共享，同步调用方共享一个线程信号量，
+  异步调用方每个事件循环共享一个 asyncio 信号量），单 host 并发上限由 src.utils.http_client 保证
+- 正文提取在 src.utils.extract_pool 的进程池中并行执行
+- 与 read_url_by_markdown 共享网页缓存
+- 多个页面共享一个字符预算：内容短的页面用不完的额度分给内容长的页面
+
+通过环境变量配置：
+    READ_URLS_CONCURRENCY: 同时下载的最大页面数，默认 8
+    READ_URLS_MAX_URLS: 单次调用最多读取的 URL 数，默认 10
+"""
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+from langchain_core.tools import StructuredTool
+from langchain.tools import ToolRuntime
+from src.tools.read_url import (
+    EmptyDownloadError,
+    _truncate,
+    afetch_markdown,
+    fetch_markdown,
+    validate_markdown_args,
+)
+from src.monitoring.logger import get_logger, preview
+from src.monitoring.metrics import metrics, timed
+from src.utils.page_cache import normalize_url
+from src.utils.mock import mock_tool_runtime
+
+READ_URLS_CONCURRENCY = int(os.getenv("READ_URLS_CONCURRENCY", "8"))
+READ_URLS_MAX_URLS = int(os.getenv("READ_URLS_MAX_URLS", "10"))
+
+logger = get_logger(__name__)
+
+# 单个页面的读取结果：正文、None（无法提取正文）或异常
+PageResult = Union[str, None, Exception]
+
+# 所有调用共享的并发名额
+_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, READ_URLS_CONCURRENCY))
+_async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary())
+
+
+def _async_semaphore() -> asyncio.Semaphore:
+    """当前事件循环共享的并发名额"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        semaphore = _async_slots.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, READ_URLS_CONCURRENCY))
+            _async_slots[loop] = semaphore
+        return semaphore
+
+
+def dedupe_urls(urls: Sequence[str]) -> List[str]:
+    """按规范化后的 URL 去重，保持原有顺序"""
+    seen = set()
+    unique = []
+    for url in urls:
+        url = (url or "").strip()
+        key = normalize_url(url) if url.startswith(("http://", "https://")) else url
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(url)
+    return unique
+
+
+def allocate_budget(lengths: Sequence[int], budget: int) -> List[int]:
+    """把字符预算分配给多个页面
+
+    先平均分配，内容不足平均额度的页面只占用实际长度，剩余额度继续平均分给其他页面。
+    """
+    allocation = [0] * len(lengths)
+    remaining = list(range(len(lengths)))
+    while remaining and budget > 0:
+        share = budget // len(remaining)
+        if share == 0:
+            break
+        short = [i for i in remaining if lengths[i] <= share]
+        if not short:
+            for i in remaining:
+                allocation[i] = share
+            break
+        for i in short:
+            allocation[i] = lengths[i]
+            budget -= lengths[i]
+        remaining = [i for i in remaining if i not in short]
+    return allocation
+
+
+def _page_error(exc: Exception) -> str:
+    return str(exc) if isinstance(exc, EmptyDownloadError) else f"读取页面失败: {exc}"
+
+
+def _combine(urls: Sequence[str], results: Sequence[PageResult], max_chars: int) -> str:
+    """按共享的字符预算拼接各页面的结果"""
+    lengths = [len(r) if isinstance(r, str) else 0 for r in results]
+    allocation = allocate_budget(lengths, max_chars)
+
+    sections = []
+    for i, (url, result) in enumerate(zip(urls, results)):
+        if isinstance(result, Exception):
+            metrics.count_error("tool", "read_urls")
+            logger.warning("[read_urls] 读取失败: %s %s", url, result)
+            body = _page_error(result)
+        elif not result:
+            body = "读取成功，但页面内容为空或无法提取正文"
+        elif allocation[i] <= 0:
+            body = f"... (字符预算已用完，原文共 {len(result)} 个字符)"
+        else:
+            body = _truncate(result, allocation[i])
+        sections.append(f"## [{i + 1}] {url}\n\n{body}")
+    return "\n\n".join(sections)
+
+
+def _validate(urls: List[str], max_chars: int) -> Optional[str]:
+    if not urls:
+        return "Error: urls 不能为空"
+    if len(urls) > READ_URLS_MAX_URLS:
+        return f"Error: 单次最多读取 {READ_URLS_MAX_URLS} 个 URL"
+    for url in urls:
+        error = validate_markdown_args(url, max_chars)
+        if error:
+            return f"{error}（{url}）" if url else error
+    return None
+
+
+def _fetch_one(url: str, max_chars: int) -> PageResult:
+    with _slots:
+        try:
+            return fetch_markdown(url, max_chars)
+        except Exception as exc:
+            return exc
+
+
+@timed("tool", "read_urls")
+def _read_urls(urls: List[str], runtime: ToolRuntime, max_chars: int = 12000) -> str:
+    """并发读取多个网页，返回合并后的 Markdown 正文。
+
+    适合一次性阅读搜索结果中的多个页面，比逐个调用 read_url_by_markdown 快得多。
+    所有页面共享 max_chars 字符预算，每个页面的结果以 "## [序号] URL" 开头。
+
+    Args:
+        urls (List[str]): 需要读取的 http/https 地址列表，重复的地址只读取一次
+        max_chars (int, optional): 所有页面合计的最大字符数，默认 12000
+
+    Returns:
+        str: 各页面的 Markdown 正文，读取失败的页面附带错误信息
+    """
+
+    logger.debug("[read_urls] 输入: urls=%s, max_chars=%s", urls, max_chars)
+
+    urls = dedupe_urls(urls)
+    error = _validate(urls, max_chars)
+    if error:
+        metrics.count_error("tool", "read_urls")
+        logger.warning("[read_urls] 输出: %s", error)
+        return error
+
+    workers = max(1, min(READ_URLS_CONCURRENCY, len(urls)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="read_urls") as executor:
+        results = list(executor.map(lambda url: _fetch_one(url, max_chars), urls))
+
+    output = _combine(urls, results, max_chars)
+    logger.debug("[read_urls] 输出: %s", preview(output))
+    return output
+
+
+@timed("tool", "read_urls")
+async def _aread_urls(urls: List[str], runtime: ToolRuntime, max_chars: int = 12000) -> str:
+    """read_urls 的异步实现"""
+    logger.debug("[read_urls] 输入: urls=%s, max_chars=%s", urls, max_chars)
+
+    urls = dedupe_urls(urls)
+    error = _validate(urls, max_chars)
+    if error:
+        metrics.count_error("tool", "read_urls")
+        logger.warning("[read_urls] 输出: %s", error)
+        return error
+
+    semaphore = _async_semaphore()
+
+    async def fetch_one(url: str) -> PageResult:
+        async with semaphore:
+            try:
+                return await afetch_markdown(url, max_chars)
+            except Exception as exc:
+                return exc
+
+    results = await asyncio.gather(*(fetch_one(url) for url in urls))
+
+    output = _combine(urls, results, max_chars)
+    logger.debug("[read_urls] 输出: %s", preview(output))
+    return output
+
+
+read_urls = StructuredTool.from_function(
+    func=_read_urls,
+    coroutine=_aread_urls,
+    name="read_urls",
+    parse_docstring=True,
+)
+
+
+if __name__ == "__main__":
+    print(read_urls.invoke({
+        "urls": ["https://www.baidu.com", "https://www.qq.com"],
+        "runtime": mock_tool_runtime()
+    }))
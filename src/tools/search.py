@@ -1,12 +1,113 @@
 """
 网络搜索工具
+
+- 查询规范化：全角转半角、合并空白、转小写，"最新黄金价格 " 与 "最新黄金价格" 视为同一查询
+- TTL 缓存：相同查询在有效期内直接返回格式化后的结果
+- 单飞合并：N 个并发的相同查询只触发一次上游搜索
+- 搜索客户端在调用之间复用
+
+通过环境变量配置：
+    SEARCH_CACHE_TTL: 搜索结果缓存时间（秒），默认 300，0 表示不缓存
+    SEARCH_CACHE_MAX_ENTRIES: 最大缓存条目数，默认 1024
 """
-from langchain_core.tools import tool
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Protocol
+
+from langchain_core.tools import StructuredTool
 from langchain.tools import ToolRuntime
+from src.monitoring.logger import get_logger, preview
+from src.monitoring.metrics import metrics, timed
+from src.utils.singleflight import SingleFlight
+from src.utils.ttl_cache import TTLCache
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+SEARCH_MAX_RESULTS = 5
+
+logger = get_logger(__name__)
+
+
+class SearchProvider(Protocol):
+    """搜索服务接口，返回 [{"title", "body", "href"}, ...]"""
+
+    def text(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        ...
+
+
+class DDGSProvider:
+    """DuckDuckGo 搜索，DDGS 客户端在首次使用时创建并复用"""
+
+    def __init__(self) -> None:
+        self._ddgs = None
+        self._lock = threading.Lock()
+
+    def text(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._ddgs is None:
+                from ddgs import DDGS
+                self._ddgs = DDGS()
+        # ddgs 是代理类，延迟加载 和 按需加载
+        return list(self._ddgs.text(query, max_results=max_results))  # type: ignore[attr-defined]
+
+
+# 进程级共享的搜索服务、结果缓存和单飞合并
+search_provider: SearchProvider = DDGSProvider()
+search_cache = TTLCache(SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES)
+search_flight = SingleFlight()
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询，作为缓存和合并的 key"""
+    query = unicodedata.normalize("NFKC", query)
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def _format_results(results: List[Dict[str, Any]]) -> str:
+    if not results:
+        return "未找到搜索结果"
+
+    formatted_results = []
+    for i, result in enumerate(results, 1):
+        title = result.get('title', 'No title')
+        body = result.get('body', 'No description')
+        url = result.get('href', 'No URL')
+        formatted_results.append(f"{i}. {title}\n   {body}\n   {url}")
+    return "\n\n".join(formatted_results)
 
 
-@tool("search_web", parse_docstring=True)
-def search_web(query: str, runtime: ToolRuntime) -> str:
+def _search_upstream(query: str) -> str:
+    """调用上游搜索并格式化，成功时写入缓存（异常不缓存）"""
+    output = _format_results(search_provider.text(query, SEARCH_MAX_RESULTS))
+    if SEARCH_CACHE_TTL > 0:
+        search_cache.set(normalize_query(query), output)
+    return output
+
+
+def _cached(query: str) -> Optional[str]:
+    if SEARCH_CACHE_TTL <= 0:
+        return None
+    return search_cache.get(normalize_query(query))
+
+
+def _log_output(output: str) -> None:
+    logger.debug("[search_web] 输出: %s", preview(output))
+
+
+def _search_error(exc: Exception) -> str:
+    if isinstance(exc, ImportError):
+        output = "Error: ddgs 库未安装。请运行: uv add ddgs"
+    else:
+        output = f"搜索出错: {str(exc)}"
+    metrics.count_error("tool", "search_web")
+    logger.warning("[search_web] 输出: %s", output)
+    return output
+
+
+@timed("tool", "search_web")
+def _search_web(query: str, runtime: ToolRuntime) -> str:
     """搜索网络信息并返回格式化文本。
 
     Args:
@@ -16,40 +117,38 @@ def search_web(query: str, runtime: ToolRuntime) -> str:
         str: 带编号的搜索结果列表，每项包含标题、摘要和URL
     """
 
-    # 打印输入信息
-    print(f"[search_web] 输入: query={query}")
+    logger.debug("[search_web] 输入: query=%s", query)
 
     try:
-        from ddgs import DDGS
-
-        # 使用 DuckDuckGo 搜索
-        ddgs = DDGS()
-        # ddgs 是代理类，延迟加载 和 按需加载
-        # type: ignore[attr-defined]
-        results = list(ddgs.text(query, max_results=5))
-
-        if not results:
-            output = "未找到搜索结果"
-            print(f"[search_web] 输出: {output}")
-            return output
-
-        # 格式化搜索结果
-        formatted_results = []
-        for i, result in enumerate(results, 1):
-            title = result.get('title', 'No title')
-            body = result.get('body', 'No description')
-            url = result.get('href', 'No URL')
-            formatted_results.append(f"{i}. {title}\n   {body}\n   {url}")
-
-        output = "\n\n".join(formatted_results)
-        output_preview = output[:300] + "..." if len(output) > 300 else output
-        print(f"[search_web] 输出: {output_preview}")
-        return output
-    except ImportError:
-        output = "Error: ddgs 库未安装。请运行: uv add ddgs"
-        print(f"[search_web] 输出: {output}")
+        output = _cached(query)
+        if output is None:
+            output = search_flight.do(
+                normalize_query(query), lambda: _search_upstream(query))
+        _log_output(output)
         return output
     except Exception as e:
-        output = f"搜索出错: {str(e)}"
-        print(f"[search_web] 输出: {output}")
+        return _search_error(e)
+
+
+@timed("tool", "search_web")
+async def _asearch_web(query: str, runtime: ToolRuntime) -> str:
+    """search_web 的异步实现，上游搜索在线程池中执行"""
+    logger.debug("[search_web] 输入: query=%s", query)
+
+    try:
+        output = _cached(query)
+        if output is None:
+            output = await search_flight.ado(
+                normalize_query(query), lambda: _search_upstream(query))
+        _log_output(output)
         return output
+    except Exception as e:
+        return _search_error(e)
+
+
+search_web = StructuredTool.from_function(
+    func=_search_web,
+    coroutine=_asearch_web,
+    name="search_web",
+    parse_docstring=True,
+)
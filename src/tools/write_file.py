@@ -4,10 +4,15 @@
 from langchain_core.tools import tool
 from langchain.tools import ToolRuntime
 from typing import Optional
+from src.monitoring.logger import get_logger
+from src.monitoring.metrics import metrics, timed
 from src.utils.path import resolve_file_path, get_project_root
 
+logger = get_logger(__name__)
+
 
 @tool("write_file", parse_docstring=True)
+@timed("tool", "write_file")
 def write_file(file_path: str, content: str, runtime: ToolRuntime) -> str:
     """将内容写入到本地文件系统中的指定文件。
 
@@ -23,17 +28,18 @@ def write_file(file_path: str, content: str, runtime: ToolRuntime) -> str:
     Returns:
         str: 成功时返回文件路径和写入状态，失败时返回错误信息
     """
-    # 打印输入信息
-    print(
-        f"[write_file] 输入: file_path={file_path}, content_length={len(content)}")
+    logger.debug("[write_file] 输入: file_path=%s, content_length=%s",
+                 file_path, len(content))
 
     if not isinstance(content, str):
+        metrics.count_error("tool", "write_file")
         return "Error: content 必须是字符串类型"
 
     # 使用通用路径解析函数
     target_path, error = resolve_file_path(file_path, "write_file")
     if error:
-        print(f"[write_file] 输出: {error}")
+        metrics.count_error("tool", "write_file")
+        logger.warning("[write_file] 输出: %s", error)
         return error
 
     # 此时 target_path 必定不为 None（因为 error 为空）
@@ -59,20 +65,23 @@ def write_file(file_path: str, content: str, runtime: ToolRuntime) -> str:
         except ValueError:
             # 如果无法计算相对路径（绝对路径在项目外），显示绝对路径
             output = f"✅ 文件写入成功: {target_path}\n文件大小: {file_size} 字节"
-        print(f"[write_file] 输出: {output}")
+        logger.debug("[write_file] 输出: %s", output)
         return output
 
     except PermissionError:
         output = f"Error: 没有权限写入文件 {target_path}"
-        print(f"[write_file] 输出: {output}")
+        metrics.count_error("tool", "write_file")
+        logger.warning("[write_file] 输出: %s", output)
         return output
     except OSError as e:
         output = f"Error: 文件写入失败: {str(e)}"
-        print(f"[write_file] 输出: {output}")
+        metrics.count_error("tool", "write_file")
+        logger.warning("[write_file] 输出: %s", output)
         return output
     except Exception as e:
         output = f"Error: 发生未知错误: {str(e)}"
-        print(f"[write_file] 输出: {output}")
+        metrics.count_error("tool", "write_file")
+        logger.warning("[write_file] 输出: %s", output)
         return output
 
 
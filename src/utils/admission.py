@@ -0,0 +1,160 @@
+"""
+/stream/chat 的准入控制
+
+- 全局并发上限：同时执行的图运行数不超过 max_concurrent，超出的请求排队等待
+- 有界等待队列：排队数达到 max_queue 时立即拒绝（429 + Retry-After），
+  排队超过 queue_timeout 秒同样拒绝，避免流量尖峰把请求堆积成上游的限流
+- 同一 thread_id 互斥：同一个 thread 的请求依次执行，避免并发修改同一份 checkpoint；
+  先取得 thread 锁再占用全局名额，等待同一 thread 的请求不占用执行名额
+
+限制是进程级的，多 worker 部署时总并发为 worker 数乘以 max_concurrent。
+
+通过环境变量配置：
+    STREAM_MAX_CONCURRENT: 同时执行的请求数，默认 32
+    STREAM_MAX_QUEUE: 最多排队的请求数，默认 64
+    STREAM_QUEUE_TIMEOUT: 最长排队时间（秒），默认 30
+"""
+import asyncio
+import math
+import os
+import time
+from typing import Any, Dict, Tuple
+
+from src.monitoring.metrics import metrics
+
+STREAM_MAX_CONCURRENT = int(os.getenv("STREAM_MAX_CONCURRENT", "32"))
+STREAM_MAX_QUEUE = int(os.getenv("STREAM_MAX_QUEUE", "64"))
+STREAM_QUEUE_TIMEOUT = float(os.getenv("STREAM_QUEUE_TIMEOUT", "30"))
+
+# 还没有完成过的请求时，Retry-After 使用的单次请求耗时估计（秒）
+DEFAULT_RUN_SECONDS = 10.0
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"请求过多（{reason}），请 {retry_after} 秒后重试")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Admission:
+    """一次已准入的请求，release 可以重复调用"""
+
+    def __init__(self, controller: "AdmissionController", thread_id: str, waited: float):
+        self.controller = controller
+        self.thread_id = thread_id
+        self.waited = waited
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        if self.released:
+            return
+        self.released = True
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """全局并发上限 + 有界等待队列 + thread 互斥（在单个事件循环中使用）
+
+    Args:
+        max_concurrent: 同时执行的请求数
+        max_queue: 最多排队的请求数，达到后新请求立即被拒绝
+        queue_timeout: 最长排队时间（秒）
+    """
+
+    def __init__(self, max_concurrent: int = STREAM_MAX_CONCURRENT,
+                 max_queue: int = STREAM_MAX_QUEUE, queue_timeout: float = STREAM_QUEUE_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        # thread_id -> (锁, 持有或等待该锁的请求数)
+        self._threads: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self.running = 0
+        self.waiting = 0
+        # 统计
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.completed = 0
+
+    def retry_after(self) -> int:
+        """按平均执行时间估计排在队尾的请求需要等待多久"""
+        average = self.run_seconds / self.completed if self.completed else DEFAULT_RUN_SECONDS
+        return max(1, math.ceil(average * (self.waiting + 1) / self.max_concurrent))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected += 1
+        metrics.inc("admission_rejected", reason=reason)
+        return AdmissionRejected(reason, self.retry_after())
+
+    async def acquire(self, thread_id: str) -> Admission:
+        """等待执行名额，排队已满或等待超时时抛出 AdmissionRejected"""
+        if self.waiting >= self.max_queue and (
+                self.running >= self.max_concurrent or thread_id in self._threads):
+            raise self._reject("queue_full")
+
+        started = time.monotonic()
+        lock, holders = self._threads.get(thread_id) or (asyncio.Lock(), 0)
+        self._threads[thread_id] = (lock, holders + 1)
+        self.waiting += 1
+        acquired_lock = False
+        try:
+            deadline = started + self.queue_timeout
+            await asyncio.wait_for(lock.acquire(), timeout=self.queue_timeout)
+            acquired_lock = True
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            if acquired_lock:
+                lock.release()
+            self._drop_thread(thread_id)
+            raise self._reject("timeout") from None
+        except BaseException:
+            if acquired_lock:
+                lock.release()
+            self._drop_thread(thread_id)
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.running += 1
+        self.admitted += 1
+        self.wait_seconds += waited
+        metrics.observe("admission", "wait", waited)
+        return Admission(self, thread_id, waited)
+
+    def _drop_thread(self, thread_id: str) -> None:
+        lock, holders = self._threads[thread_id]
+        if holders <= 1:
+            del self._threads[thread_id]
+        else:
+            self._threads[thread_id] = (lock, holders - 1)
+
+    def _release(self, admission: Admission) -> None:
+        self.running -= 1
+        self.completed += 1
+        self.run_seconds += time.monotonic() - admission.started
+        self._slots.release()
+        self._threads[admission.thread_id][0].release()
+        self._drop_thread(admission.thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queue_depth": self.waiting,
+            "threads": len(self._threads),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.wait_seconds / self.admitted if self.admitted else 0.0,
+        }
+
+
+# api 进程内共享的准入控制
+admission = AdmissionController()
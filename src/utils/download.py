@@ -0,0 +1,199 @@
+"""
+流式下载网页文本
+
+read_url 等工具只需要页面的前一部分内容，这里边下载边解码，读到字节上限后立即断开，
+不会把大页面、PDF 或不结束的响应完整读入内存，也不会一直等到读取超时。
+
+- 字节上限由调用方根据 max_chars 计算（byte_cap），并受 DOWNLOAD_MAX_BYTES 硬性限制
+- 响应头声明为二进制类型，或首个数据块带有 PDF / 图片 / 压缩包等文件签名时直接拒绝
+- 字符集按 Content-Type、BOM、<meta charset> 的顺序确定，使用增量解码器逐块解码
+
+通过环境变量配置：
+    DOWNLOAD_MAX_BYTES: 单个页面的最大下载字节数（解压后），默认 5MB
+    DOWNLOAD_MIN_BYTES: 按 max_chars 计算出的上限不低于该值，默认 256KB
+    DOWNLOAD_HTML_BYTES_PER_CHAR: 提取 Markdown 时每个输出字符对应的 HTML 字节数，默认 64
+"""
+import codecs
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+from src.utils.http_client import http_client
+
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", str(5 * 1024 * 1024)))
+DOWNLOAD_MIN_BYTES = int(os.getenv("DOWNLOAD_MIN_BYTES", str(256 * 1024)))
+DOWNLOAD_HTML_BYTES_PER_CHAR = int(os.getenv("DOWNLOAD_HTML_BYTES_PER_CHAR", "64"))
+
+# 按文本处理的 Content-Type
+_TEXT_TYPES = (
+    "application/xhtml+xml", "application/xml", "application/json",
+    "application/javascript", "application/rss+xml", "application/atom+xml",
+)
+# 未声明类型时需要嗅探的 Content-Type
+_UNKNOWN_TYPES = ("", "application/octet-stream", "binary/octet-stream")
+# 常见二进制文件签名
+_BINARY_SIGNATURES = (
+    b"%PDF-", b"PK\x03\x04", b"\x89PNG", b"GIF87a", b"GIF89a", b"\xff\xd8\xff",
+    b"\x1f\x8b", b"BZh", b"7z\xbc\xaf", b"Rar!", b"\x7fELF", b"OggS", b"ID3",
+    b"RIFF", b"\xd0\xcf\x11\xe0",
+)
+_SNIFF_BYTES = 1024
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+
+class UnsupportedContentError(Exception):
+    """响应不是文本内容"""
+
+
+@dataclass
+class Download:
+    """流式下载结果"""
+    url: str
+    status_code: int
+    headers: Any
+    text: str
+    encoding: str
+    bytes_read: int
+    # 是否因达到字节上限而提前断开
+    truncated: bool
+
+
+def byte_cap(max_chars: int, bytes_per_char: int = DOWNLOAD_HTML_BYTES_PER_CHAR,
+             minimum: int = DOWNLOAD_MIN_BYTES) -> int:
+    """根据输出字符数计算下载字节上限"""
+    return max(1, min(DOWNLOAD_MAX_BYTES, max(minimum, max_chars * bytes_per_char)))
+
+
+def _media_type(headers: Mapping[str, str]) -> str:
+    return headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+def _check_content_type(media_type: str) -> None:
+    if media_type in _UNKNOWN_TYPES or media_type.startswith("text/"):
+        return
+    if media_type in _TEXT_TYPES or media_type.endswith(("+xml", "+json")):
+        return
+    raise UnsupportedContentError(f"不支持的内容类型: {media_type}")
+
+
+def sniff_binary(head: bytes) -> bool:
+    """根据首个数据块判断是否为二进制内容"""
+    if head.startswith(_BINARY_SIGNATURES):
+        return True
+    # UTF-16 文本带 BOM 时会包含 NUL 字节
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return False
+    return b"\x00" in head[:_SNIFF_BYTES]
+
+
+def detect_encoding(declared: Optional[str], head: bytes) -> str:
+    """确定字符集：Content-Type 声明 > BOM > <meta charset> > utf-8"""
+    candidates = [declared]
+    if head.startswith(codecs.BOM_UTF8):
+        candidates.append("utf-8-sig")
+    elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates.append("utf-16")
+    match = _META_CHARSET.search(head[:_SNIFF_BYTES * 4])
+    if match:
+        candidates.append(match.group(1).decode("ascii", "ignore"))
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+class _TextReader:
+    """逐块累积并解码响应体，达到字节上限后停止"""
+
+    def __init__(self, declared_encoding: Optional[str], max_bytes: int):
+        self.declared_encoding = declared_encoding
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self.encoding: Optional[str] = None
+        self._decoder: Any = None
+        self._head = b""
+        self._parts: list[str] = []
+
+    def feed(self, chunk: bytes) -> bool:
+        """写入一个数据块，返回是否还需要继续读取"""
+        remaining = self.max_bytes - self.bytes_read
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+
+        if self._decoder is None:
+            self._head += chunk
+            if len(self._head) < _SNIFF_BYTES and not self.truncated:
+                return True
+            self._start()
+        else:
+            self._parts.append(self._decoder.decode(chunk))
+        return not self.truncated
+
+    def _start(self) -> None:
+        if sniff_binary(self._head):
+            raise UnsupportedContentError("不支持的内容类型: 二进制文件")
+        self.encoding = detect_encoding(self.declared_encoding, self._head)
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        self._parts.append(self._decoder.decode(self._head))
+        self._head = b""
+
+    def text(self) -> str:
+        if self._decoder is None:
+            self._start()
+        # 截断时丢弃末尾不完整的多字节字符
+        self._parts.append(self._decoder.decode(b"", final=not self.truncated))
+        return "".join(self._parts)
+
+
+def _prepare(response: Any, max_bytes: int) -> Optional[_TextReader]:
+    """检查状态码和响应头，返回用于读取响应体的 _TextReader；304 时返回 None"""
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    _check_content_type(_media_type(response.headers))
+    return _TextReader(response.charset_encoding, max_bytes)
+
+
+def _result(url: str, response: Any, reader: Optional[_TextReader]) -> Download:
+    if reader is None:
+        return Download(url, response.status_code, response.headers, "", "utf-8", 0, False)
+    text = reader.text()
+    return Download(url, response.status_code, response.headers, text,
+                    reader.encoding or "utf-8", reader.bytes_read, reader.truncated)
+
+
+def download_text(url: str, max_bytes: int = DOWNLOAD_MAX_BYTES,
+                  headers: Optional[Dict[str, str]] = None) -> Download:
+    """流式下载网页文本，最多读取 max_bytes 字节
+
+    Raises:
+        httpx.HTTPStatusError: 状态码为 4xx / 5xx
+        UnsupportedContentError: 响应不是文本内容
+    """
+    with http_client.stream("GET", url, headers=headers) as response:
+        reader = _prepare(response, max_bytes)
+        if reader is not None:
+            for chunk in response.iter_bytes():
+                if not reader.feed(chunk):
+                    break
+        return _result(url, response, reader)
+
+
+async def adownload_text(url: str, max_bytes: int = DOWNLOAD_MAX_BYTES,
+                         headers: Optional[Dict[str, str]] = None) -> Download:
+    """download_text 的异步实现"""
+    async with http_client.astream("GET", url, headers=headers) as response:
+        reader = _prepare(response, max_bytes)
+        if reader is not None:
+            async for chunk in response.aiter_bytes():
+                if not reader.feed(chunk):
+                    break
+        return _result(url, response, reader)
@@ -0,0 +1,255 @@
+"""
+网页正文提取进程池
+
+trafilatura.extract 是 CPU 密集的 HTML 解析，在调用线程里执行会长时间持有 GIL，
+拖慢同一 worker 上的其他请求。这里把提取放到独立的进程池中：
+    - 进程数有上限，排队中的文档数超过 max_queue 时直接拒绝（ExtractionOverloaded）
+    - 每个文档有超时时间，从子进程开始处理时计时（排队时间不计入）。子进程在开始处理时
+      设置定时器，超时由 SIGALRM 的默认动作直接结束该进程（卡在 C 代码里也有效），进程池
+      补上新的子进程；定时器只覆盖当前文档，不会误杀之后的文档，排队中和其他子进程上的
+      文档不受影响（ExtractionTimeout）。没有 setitimer 的平台上超时的文档同样会失败，
+      但卡住的子进程要等处理结束才能继续接任务
+    - 子进程使用 spawn 启动，不继承父进程的线程和锁
+
+通过环境变量配置：
+    EXTRACT_POOL_WORKERS: 进程数，默认 min(4, CPU 核数)，0 表示在调用线程内直接提取
+    EXTRACT_POOL_MAX_QUEUE: 最大在途文档数，默认 进程数 * 8
+    EXTRACT_TIMEOUT: 单个文档的提取超时（秒，从子进程开始处理时计时），默认 15
+"""
+import asyncio
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+EXTRACT_POOL_WORKERS = int(os.getenv(
+    "EXTRACT_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_POOL_MAX_QUEUE = int(os.getenv(
+    "EXTRACT_POOL_MAX_QUEUE", str(max(1, EXTRACT_POOL_WORKERS) * 8)))
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "15"))
+
+
+class ExtractionError(Exception):
+    """正文提取失败"""
+
+
+class ExtractionOverloaded(ExtractionError):
+    """排队中的文档过多"""
+
+
+class ExtractionTimeout(ExtractionError):
+    """单个文档提取超时"""
+
+
+def extract_markdown(html: str) -> Optional[str]:
+    """使用 trafilatura 提取网页正文并转换为 Markdown，无法提取时返回 None
+
+    在子进程中执行，trafilatura 在首次调用时才导入。
+    """
+    import trafilatura
+
+    markdown_text = trafilatura.extract(
+        html,
+        output_format="markdown",
+        include_comments=False,
+        include_tables=True,
+        include_images=False,
+        include_links=True,
+    )
+    if not markdown_text or not markdown_text.strip():
+        return None
+    return markdown_text.strip()
+
+
+# 子进程能否在超时后自行结束
+_HAS_ITIMER = hasattr(signal, "setitimer")
+
+# 子进程中：开始处理任务时通知父进程的队列，以及单个任务的超时
+_started_queue: Optional[Any] = None
+_task_timeout = 0.0
+
+
+def _init_worker(started: Any, timeout: float) -> None:
+    global _started_queue, _task_timeout
+    _started_queue, _task_timeout = started, timeout
+    if _HAS_ITIMER:
+        # 默认动作是结束进程，不依赖解释器执行信号处理函数
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+
+def _run_task(task_id: int, fn: Callable[..., Any], args: tuple) -> Any:
+    """在子进程中执行任务，开始前报告 task_id，父进程从这时开始计算超时"""
+    if _started_queue is not None:
+        _started_queue.put(task_id)
+    armed = _HAS_ITIMER and _task_timeout > 0
+    if armed:
+        signal.setitimer(signal.ITIMER_REAL, _task_timeout)
+    try:
+        return fn(*args)
+    finally:
+        if armed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class _Task:
+    def __init__(self) -> None:
+        self.future: Future = Future()
+        self.started_at: Optional[float] = None
+
+
+class ExtractionPool:
+    """带排队上限和超时的正文提取进程池（进程在首次使用时启动）
+
+    Args:
+        max_workers: 进程数，0 表示不使用进程池
+        max_queue: 最大在途文档数（包括正在提取的）
+        timeout: 单个文档的提取超时（秒），从子进程开始处理时计时
+    """
+
+    def __init__(
+        self,
+        max_workers: int = EXTRACT_POOL_WORKERS,
+        max_queue: int = EXTRACT_POOL_MAX_QUEUE,
+        timeout: float = EXTRACT_TIMEOUT,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pool: Optional[Any] = None
+        # 未完成的任务（包括排队中的）
+        self._pending: Dict[int, _Task] = {}
+        self._task_ids = itertools.count()
+
+        # 统计
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _ensure_pool(self) -> Any:
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            started = context.Queue()
+            # 定期替换子进程，避免 lxml 长期运行导致内存增长
+            self._pool = context.Pool(self.max_workers, initializer=_init_worker,
+                                      initargs=(started, self.timeout), maxtasksperchild=200)
+            threading.Thread(target=self._watch, args=(self._pool, started),
+                             name="extract-watchdog", daemon=True).start()
+        return self._pool
+
+    def _watch(self, pool: Any, started: Any) -> None:
+        """记录任务开始处理的时间，并让超时的任务失败（进程池关闭后退出）"""
+        tick = max(0.01, min(0.5, self.timeout / 4))
+        while self._pool is pool:
+            try:
+                task_id = started.get(timeout=tick)
+            except queue.Empty:
+                pass
+            else:
+                with self._lock:
+                    task = self._pending.get(task_id)
+                    if task is not None:
+                        task.started_at = time.monotonic()
+            self._expire(self.timeout + tick)
+        started.close()
+
+    def _expire(self, limit: float) -> None:
+        """让开始处理超过 limit 秒的任务失败
+
+        子进程已经在 timeout 秒时自行结束（limit 比 timeout 多一个检查周期，正常完成的结果
+        先到达），被结束的任务不会再有结果，在这里直接失败；排队中的任务由其他子进程继续处理。
+        父进程不向子进程发送信号：子进程可能已经在处理下一个文档。
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                (task_id, task) for task_id, task in self._pending.items()
+                if task.started_at is not None and now - task.started_at > limit
+            ]
+            for task_id, _ in expired:
+                del self._pending[task_id]
+            self.timeouts += len(expired)
+            if _HAS_ITIMER:
+                self.restarts += len(expired)
+        for _, task in expired:
+            if not task.future.done():
+                task.future.set_exception(ExtractionTimeout(f"正文提取超时（{self.timeout} 秒）"))
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                self.rejected += 1
+                raise ExtractionOverloaded(
+                    f"正文提取队列已满（{self.max_queue} 个文档排队中）")
+            pool = self._ensure_pool()
+            task_id = next(self._task_ids)
+            task = self._pending[task_id] = _Task()
+            self.submitted += 1
+        future = task.future
+
+        def on_done(result: Any) -> None:
+            with self._lock:
+                self._pending.pop(task_id, None)
+                self.completed += 1
+            if not future.done():
+                future.set_result(result)
+
+        def on_error(exc: BaseException) -> None:
+            with self._lock:
+                self._pending.pop(task_id, None)
+            if not future.done():
+                future.set_exception(exc)
+
+        pool.apply_async(_run_task, (task_id, fn, args),
+                         callback=on_done, error_callback=on_error)
+        return future
+
+    def extract(self, html: str) -> Optional[str]:
+        """同步提取（阻塞当前线程等待结果，但不持有 GIL）"""
+        if self.max_workers <= 0:
+            return extract_markdown(html)
+        return self._submit(extract_markdown, html).result()
+
+    async def aextract(self, html: str) -> Optional[str]:
+        """异步提取"""
+        if self.max_workers <= 0:
+            # 不使用进程池时在线程中提取，不阻塞事件循环
+            return await asyncio.to_thread(extract_markdown, html)
+        return await asyncio.wrap_future(self._submit(extract_markdown, html))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回进程池统计信息"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_depth": len(self._pending),
+                "max_queue": self.max_queue,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+            }
+
+    def close(self) -> None:
+        """关闭进程池"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            pending, self._pending = self._pending, {}
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        for task in pending.values():
+            if not task.future.done():
+                task.future.set_exception(ExtractionError("正文提取进程池已关闭"))
+
+
+# 进程级共享的提取进程池
+extraction_pool = ExtractionPool()
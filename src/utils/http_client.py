@@ -0,0 +1,264 @@
+"""
+共享的 HTTP 连接池
+
+read_url 等工具通过这里发起请求，复用 TCP/TLS 连接（keep-alive），避免每次抓取都重新
+DNS 解析、建立连接和握手。同时提供同步和异步两套客户端：
+    - 同步客户端供 tool.invoke 使用
+    - 异步客户端供 tool.ainvoke 使用，每个事件循环一个
+
+通过环境变量配置：
+    HTTP_MAX_CONNECTIONS: 连接池最大连接数，默认 100
+    HTTP_MAX_KEEPALIVE: 最大空闲 keep-alive 连接数，默认 20
+    HTTP_MAX_PER_HOST: 单个 host 的最大并发请求数，默认 6
+    HTTP_CONNECT_TIMEOUT: 建连超时（秒），默认 5
+    HTTP_READ_TIMEOUT: 读取超时（秒），默认 10
+    HTTP_HTTP2: 是否启用 HTTP/2（需要安装 h2），默认 1
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/118.0.0.0 Safari/537.36"
+)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "6"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "1") not in ("0", "false", "False")
+
+
+def _host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class HttpClientPool:
+    """带单 host 并发限制和统计的 httpx 连接池
+
+    Args:
+        max_connections: 连接池最大连接数
+        max_keepalive: 最大空闲 keep-alive 连接数
+        max_per_host: 单个 host 的最大并发请求数
+        connect_timeout: 建连超时（秒）
+        read_timeout: 读取超时（秒）
+        http2: 是否启用 HTTP/2，未安装 h2 时自动降级为 HTTP/1.1
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        max_per_host: int = HTTP_MAX_PER_HOST,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        http2: bool = HTTP_HTTP2,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.max_per_host = max_per_host
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+
+        self._lock = threading.Lock()
+        self._client: Optional["httpx.Client"] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary())
+        self._host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_host_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary())
+
+        # 统计
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.host_requests: Dict[str, int] = defaultdict(int)
+
+    # ------------------------------------------------------------------
+    # 客户端构造
+    # ------------------------------------------------------------------
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "timeout": httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+            ),
+            "headers": {"User-Agent": DEFAULT_USER_AGENT},
+            "follow_redirects": True,
+            "http2": self.http2,
+        }
+
+    @property
+    def client(self) -> "httpx.Client":
+        """同步客户端（进程内共享）"""
+        if httpx is None:
+            raise RuntimeError("httpx 库未安装。请运行: uv add httpx")
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._client_kwargs())
+            return self._client
+
+    @property
+    def async_client(self) -> "httpx.AsyncClient":
+        """当前事件循环的异步客户端"""
+        if httpx is None:
+            raise RuntimeError("httpx 库未安装。请运行: uv add httpx")
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(**self._client_kwargs())
+                self._async_clients[loop] = client
+            return client
+
+    # ------------------------------------------------------------------
+    # 单 host 并发限制
+    # ------------------------------------------------------------------
+
+    def _host_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    def _async_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._async_host_semaphores.setdefault(loop, {})
+            semaphore = semaphores.get(host)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_per_host)
+                semaphores[host] = semaphore
+            return semaphore
+
+    def _begin(self, host: str) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.host_requests[host] += 1
+
+    def _end(self, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.errors += 1
+
+    # ------------------------------------------------------------------
+    # 请求
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs: Any):
+        """同步流式请求，受单 host 并发限制"""
+        host = _host_of(url)
+        with self._host_semaphore(host):
+            self._begin(host)
+            failed = False
+            try:
+                with self.client.stream(method, url, **kwargs) as response:
+                    yield response
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self._end(failed)
+
+    @asynccontextmanager
+    async def astream(self, method: str, url: str, **kwargs: Any):
+        """异步流式请求，受单 host 并发限制"""
+        host = _host_of(url)
+        async with self._async_host_semaphore(host):
+            self._begin(host)
+            failed = False
+            try:
+                async with self.async_client.stream(method, url, **kwargs) as response:
+                    yield response
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self._end(failed)
+
+    def get(self, url: str, **kwargs: Any) -> "httpx.Response":
+        """同步 GET，读取完整响应体"""
+        with self.stream("GET", url, **kwargs) as response:
+            response.read()
+            return response
+
+    async def aget(self, url: str, **kwargs: Any) -> "httpx.Response":
+        """异步 GET，读取完整响应体"""
+        async with self.astream("GET", url, **kwargs) as response:
+            await response.aread()
+            return response
+
+    # ------------------------------------------------------------------
+    # 统计与关闭
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _pool_connections(client: Any) -> Dict[str, int]:
+        # httpx 未公开连接池，这里读取 transport 内部的 httpcore 连接池，读取失败时返回 0
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for c in connections if c.is_idle())
+        return {"open": len(connections), "idle": idle}
+
+    def stats(self) -> Dict[str, Any]:
+        """返回连接池统计信息"""
+        with self._lock:
+            sync_pool = self._pool_connections(self._client) if self._client else {"open": 0, "idle": 0}
+            async_open = async_idle = 0
+            for client in list(self._async_clients.values()):
+                info = self._pool_connections(client)
+                async_open += info["open"]
+                async_idle += info["idle"]
+            return {
+                "http2": self.http2,
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "hosts": dict(self.host_requests),
+                "connections": {
+                    "sync": sync_pool,
+                    "async": {"open": async_open, "idle": async_idle},
+                },
+            }
+
+    def close(self) -> None:
+        """关闭同步客户端"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的异步客户端以及同步客户端"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+        self.close()
+
+
+# 进程级共享连接池
+http_client = HttpClientPool()
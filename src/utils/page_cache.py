@@ -0,0 +1,298 @@
+"""
+网页缓存
+
+按规范化后的 URL 缓存原始响应体和 trafilatura 提取出的 Markdown，跨轮次、跨 thread、
+跨用户复用，命中时无需再次下载和提取。
+
+- 遵循 Cache-Control：no-store 不缓存，no-cache 每次重新验证，max-age / Expires 决定有效期，
+  响应未声明时使用默认有效期
+- 过期后带 If-None-Match / If-Modified-Since 条件请求，服务端返回 304 时直接复用缓存
+- 存储在本地 SQLite 中，总大小超过上限时按最近访问时间淘汰（LRU）
+
+通过环境变量配置：
+    PAGE_CACHE_ENABLED: 是否启用，默认 1
+    PAGE_CACHE_PATH: 数据库路径，默认 <项目根目录>/.data/page_cache.sqlite
+    PAGE_CACHE_MAX_BYTES: 缓存总大小上限（字节），默认 256MB
+    PAGE_CACHE_DEFAULT_TTL: 响应未声明有效期时的默认值（秒），默认 600
+"""
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.utils.path import get_project_root
+from src.utils.sqlite import connect_sqlite
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+PAGE_CACHE_PATH = os.getenv(
+    "PAGE_CACHE_PATH", str(get_project_root() / ".data" / "page_cache.sqlite"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+PAGE_CACHE_DEFAULT_TTL = float(os.getenv("PAGE_CACHE_DEFAULT_TTL", "600"))
+
+# 规范化时去掉的跟踪参数（只去掉确定不影响页面内容的参数，from 等通用参数名可能是业务参数）
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|spm|fbclid|gclid)$")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url_key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body TEXT,
+    markdown TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages (last_access);
+"""
+
+
+def normalize_url(url: str) -> str:
+    """规范化 URL，作为缓存 key
+
+    协议和 host 转小写，去掉默认端口、fragment 和跟踪参数，query 参数按 key 排序。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(k)
+    ))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """解析 Cache-Control 头，返回 {指令: 参数}"""
+    directives: Dict[str, Optional[str]] = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, arg = item.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Mapping[str, str], default_ttl: float) -> Optional[float]:
+    """根据响应头计算缓存有效期（秒），返回 None 表示不可缓存"""
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                pass
+    expires = headers.get("expires")
+    if expires:
+        try:
+            return max(0.0, parsedate_to_datetime(expires).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return default_ttl
+
+
+@dataclass
+class CachedPage:
+    """缓存的网页"""
+    url: str
+    body: str
+    markdown: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """条件请求头"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """基于 SQLite 的网页缓存（线程安全，连接在首次使用时打开）
+
+    Args:
+        db_path: 数据库路径
+        max_bytes: 缓存总大小上限，超出后按最近访问时间淘汰
+        default_ttl: 响应未声明有效期时的默认有效期（秒）
+    """
+
+    def __init__(
+        self,
+        db_path: str = PAGE_CACHE_PATH,
+        max_bytes: int = PAGE_CACHE_MAX_BYTES,
+        default_ttl: float = PAGE_CACHE_DEFAULT_TTL,
+    ):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._conn = None
+        self._lock = threading.Lock()
+        # 缓存总大小（字节），打开连接时统计一次，之后随写入和删除增减
+        self._total = 0
+
+        # 统计
+        self.hits = 0
+        self.stale = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.db_path)
+            conn.executescript(_SCHEMA)
+            self._total = self._sum_size(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _sum_size(conn: Any) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def _size_locked(self, key: str) -> int:
+        row = self.conn.execute("SELECT size FROM pages WHERE url_key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """查询缓存，过期的条目也会返回，调用方用 validators() 发起条件请求"""
+        key = normalize_url(url)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT url, body, markdown, etag, last_modified, expires_at "
+                "FROM pages WHERE url_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE pages SET last_access = ? WHERE url_key = ?", (time.time(), key))
+            page = CachedPage(*row)
+            if page.fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+        return page
+
+    def put(
+        self,
+        url: str,
+        headers: Mapping[str, str],
+        body: str,
+        markdown: Optional[str],
+    ) -> bool:
+        """按响应头写入缓存，返回是否写入"""
+        lifetime = freshness_lifetime(headers, self.default_ttl)
+        if lifetime is None:
+            return False
+        now = time.time()
+        size = len(body.encode("utf-8")) + len((markdown or "").encode("utf-8"))
+        if size > self.max_bytes:
+            return False
+        key = normalize_url(url)
+        with self._lock:
+            replaced = self._size_locked(key)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url_key, url, etag, last_modified, body, "
+                "markdown, fetched_at, expires_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, url, headers.get("etag"),
+                    headers.get("last-modified"), body, markdown, now,
+                    now + lifetime, now, size,
+                ),
+            )
+            self._total += size - replaced
+            self.stores += 1
+            self._evict_locked()
+        return True
+
+    def refresh(self, url: str, headers: Mapping[str, str]) -> None:
+        """服务端返回 304 后，按新的响应头延长有效期"""
+        lifetime = freshness_lifetime(headers, self.default_ttl)
+        key = normalize_url(url)
+        with self._lock:
+            self.revalidated += 1
+            if lifetime is None:
+                self._total -= self._size_locked(key)
+                self.conn.execute("DELETE FROM pages WHERE url_key = ?", (key,))
+                return
+            now = time.time()
+            self.conn.execute(
+                "UPDATE pages SET expires_at = ?, last_access = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                "WHERE url_key = ?",
+                (now + lifetime, now, headers.get("etag"),
+                 headers.get("last-modified"), key),
+            )
+
+    def _evict_locked(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        # 多个 worker 共享数据库文件，本进程的计数可能偏离，淘汰前重新统计一次
+        total = self._sum_size(self.conn)
+        while total > self.max_bytes:
+            row = self.conn.execute(
+                "SELECT url_key, size FROM pages ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self.conn.execute("DELETE FROM pages WHERE url_key = ?", (row[0],))
+            total -= row[1]
+            self.evictions += 1
+        self._total = total
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.stale + self.misses
+            if self._conn is not None:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+            else:
+                entries, size = 0, 0
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale": self.stale,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM pages")
+            self._total = 0
+
+
+# 进程级共享缓存，PAGE_CACHE_ENABLED=0 时为 None
+page_cache: Optional[PageCache] = PageCache() if PAGE_CACHE_ENABLED else None
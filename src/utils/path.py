@@ -1,6 +1,10 @@
 from pathlib import Path
 from typing import Tuple, Optional
 
+from src.monitoring.logger import get_logger
+
+logger = get_logger(__name__)
+
 
 def get_project_root() -> Path:
     return Path(__file__).parent.parent.parent
@@ -61,7 +65,7 @@ def resolve_file_path(file_path: str, tool_name: str = "tool") -> Tuple[Optional
             # 如果不在项目根目录内，检查是否为绝对路径且用户明确指定
             # 对于绝对路径，允许访问，但给出警告提示
             if input_path.is_absolute():
-                print(f"[{tool_name}] 警告: 访问项目根目录外的绝对路径: {resolved_path}")
+                logger.warning("[%s] 访问项目根目录外的绝对路径: %s", tool_name, resolved_path)
             else:
                 return None, f"Error: 文件路径必须在项目根目录内: {project_root}"
 
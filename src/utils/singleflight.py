@@ -0,0 +1,98 @@
+"""
+单飞（single-flight）请求合并
+
+同一个 key 同时只执行一次上游调用，并发到达的其他调用方等待并共享同一个结果（或异常）。
+同步调用方（线程）和异步调用方（协程）会合并到同一次上游调用中。
+"""
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """按 key 合并并发调用"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task[Any]]]" = (
+            weakref.WeakKeyDictionary())
+        # 统计
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """同步执行 fn，同一 key 的并发调用只执行一次"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """异步执行阻塞函数 fn（在线程池中），同一 key 的并发调用只执行一次
+
+        上游调用在独立的 task 中执行，不依赖任何一个调用方：同一事件循环内的调用方
+        （包括发起调用的第一个）都通过 asyncio.shield 等待这个 task，某个调用方被取消
+        只影响它自己，其他等待方照常拿到结果。task 内再通过 do() 与同步调用方合并。
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            tasks = self._async_calls.setdefault(loop, {})
+            task = tasks.get(key)
+            if task is None:
+                task = loop.create_task(asyncio.to_thread(self.do, key, fn))
+                tasks[key] = task
+                task.add_done_callback(lambda done: self._forget(tasks, key, done))
+            else:
+                self.calls += 1
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, tasks: Dict[Hashable, "asyncio.Task[Any]"], key: Hashable,
+                task: "asyncio.Task[Any]") -> None:
+        with self._lock:
+            if tasks.get(key) is task:
+                del tasks[key]
+        if not task.cancelled():
+            # 等待方全部被取消时避免 "exception was never retrieved" 警告
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+            }
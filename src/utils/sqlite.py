@@ -0,0 +1,22 @@
+"""
+SQLite 连接工具
+"""
+import sqlite3
+from pathlib import Path
+
+
+def connect_sqlite(db_path: str) -> sqlite3.Connection:
+    """打开 SQLite 连接并启用 WAL 模式
+
+    连接为 autocommit 模式（isolation_level=None），需要事务时显式 BEGIN/COMMIT。
+    允许跨线程使用，调用方需要自行加锁。
+    """
+    if db_path != ":memory:":
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False,
+                           isolation_level=None, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL 下 NORMAL 只在 checkpoint 时 fsync，提交延迟远低于 FULL
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
@@ -0,0 +1,74 @@
+"""
+SSE 事件编码
+
+/stream/chat 在 tokens 模式下每次运行会产生上千个很小的事件，编码和写出的开销不可忽略：
+- 事件直接编码为 bytes 帧（data: <json>\\n\\n），安装了 orjson 时使用 orjson，
+  否则退化为标准库 json；orjson 不支持的对象（例如超出 64 位的整数）单个回退到 json
+- 内容固定的帧（如 done）在导入时编码一次
+- 转发时把已经缓冲的事件合并为一次写出，coalesce 窗口大于 0 时再多等一小段时间，
+  把这段时间内产生的事件也合并进来（见 StreamBuffer.iter_batches）
+
+通过环境变量配置：
+    SSE_SERIALIZER: auto（默认，优先 orjson）/ orjson / json
+    SSE_COALESCE_MS: 合并写出的等待窗口（毫秒），默认 0，即只合并已经缓冲的事件
+"""
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+SSE_SERIALIZER = os.getenv("SSE_SERIALIZER", "auto")
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "0"))
+
+
+def _json_dumps(event: Dict[str, Any]) -> bytes:
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _load_orjson() -> Optional[Callable[[Any], bytes]]:
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson.dumps
+
+
+def _select(name: str) -> Callable[[Dict[str, Any]], bytes]:
+    if name == "json":
+        return _json_dumps
+    orjson_dumps = _load_orjson()
+    if orjson_dumps is None:
+        if name == "orjson":
+            raise ImportError("SSE_SERIALIZER=orjson 需要安装 orjson")
+        return _json_dumps
+
+    def dumps(event: Dict[str, Any]) -> bytes:
+        try:
+            return orjson_dumps(event)
+        except TypeError:
+            return _json_dumps(event)
+
+    dumps.__name__ = "orjson"
+    return dumps
+
+
+dumps = _select(SSE_SERIALIZER)
+
+
+def serializer_name() -> str:
+    """当前使用的序列化方式"""
+    return "orjson" if dumps.__name__ == "orjson" else "json"
+
+
+def set_serializer(name: str) -> None:
+    """切换序列化方式（json / orjson / auto），用于基准对比"""
+    global dumps
+    dumps = _select(name)
+
+
+def sse_frame(event: Dict[str, Any]) -> bytes:
+    """把事件编码为一个 SSE data 帧"""
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+# 内容固定的帧
+DONE_FRAME = sse_frame({"type": "done", "message": "流结束"})
@@ -0,0 +1,210 @@
+"""
+/stream/chat 的事件重放缓冲
+
+每个 thread_id 一个 StreamBuffer，图运行产生的 SSE 事件先写入缓冲并分配单调递增的 id
+（同一 thread 的多次运行连续编号），再由连接上来的客户端读取：
+    - POST /stream/chat 的响应从本次运行的第一个事件开始读
+    - 断线的客户端带上 Last-Event-ID 重新连接，从缓冲中补发之后的事件并继续跟随，
+      不会重新执行图，也不会产生新的 LLM 调用
+
+运行中的缓冲没有任何客户端时，等待 grace 秒后取消运行；期间重新连接则继续执行。
+缓冲保存在进程内，多 worker 部署时重新连接需要路由到同一个 worker。
+
+通过环境变量配置：
+    STREAM_REPLAY_EVENTS: 每个 thread 保留的事件数，默认 4096
+    STREAM_REPLAY_THREADS: 保留缓冲的 thread 数量上限（只淘汰已结束的运行），默认 128
+    STREAM_RESUME_GRACE: 客户端全部断开后，运行继续等待重新连接的时间（秒），默认 15
+"""
+import asyncio
+import os
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from src.monitoring.metrics import metrics
+
+STREAM_REPLAY_EVENTS = int(os.getenv("STREAM_REPLAY_EVENTS", "4096"))
+STREAM_REPLAY_THREADS = int(os.getenv("STREAM_REPLAY_THREADS", "128"))
+STREAM_RESUME_GRACE = float(os.getenv("STREAM_RESUME_GRACE", "15"))
+
+
+class StreamBuffer:
+    """一个 thread 的事件缓冲（在单个事件循环中使用）
+
+    Args:
+        thread_id: 所属 thread
+        max_events: 保留的事件数，超出后丢弃最早的事件
+        grace: 没有客户端后等待重新连接的时间（秒），<= 0 时立即取消运行
+    """
+
+    def __init__(self, thread_id: str, max_events: int = STREAM_REPLAY_EVENTS,
+                 grace: float = STREAM_RESUME_GRACE):
+        self.thread_id = thread_id
+        self.grace = grace
+        # (event_id, run, data)
+        self.events: Deque[Tuple[int, int, bytes]] = deque(maxlen=max_events)
+        self.last_id = 0
+        self.run = 0
+        self.finished = True
+        self.subscribers = 0
+        self._task: Optional["asyncio.Task[Any]"] = None
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        # 唤醒所有等待中的读取方，之后的等待使用新的 Event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def start(self, task: "asyncio.Task[Any]") -> None:
+        """开始一次新的运行，task 在没有客户端超过 grace 秒后被取消"""
+        if not self.finished:
+            raise RuntimeError(f"thread {self.thread_id} 的上一次运行尚未结束")
+        self.run += 1
+        self.finished = False
+        self._task = task
+
+    def append(self, data: bytes) -> int:
+        """写入一个事件，返回分配的 id"""
+        self.last_id += 1
+        self.events.append((self.last_id, self.run, data))
+        self._notify()
+        return self.last_id
+
+    def finish(self) -> None:
+        """当前运行结束（正常完成、中断或被取消）"""
+        self.finished = True
+        self._task = None
+        self._cancel_idle_timer()
+        self._notify()
+
+    def run_start(self) -> int:
+        """当前（或最近一次）运行第一个缓冲事件之前的 id"""
+        for event_id, event_run, _ in self.events:
+            if event_run == self.run:
+                return event_id - 1
+        return self.last_id
+
+    def missing(self, after: int) -> bool:
+        """after 之后的事件是否已经有一部分被丢弃"""
+        first_id = self.events[0][0] if self.events else self.last_id + 1
+        return after + 1 < first_id
+
+    async def iter_batches(self, after: int, window: float = 0.0) -> AsyncIterator[List[Tuple[int, bytes]]]:
+        """依次返回 after 之后的事件，读完 after 所在的那次运行后结束
+
+        每次返回当前已缓冲的全部新事件；window > 0 时被唤醒后再等待 window 秒，
+        把这段时间内产生的事件合并为一批。
+        """
+        run = None
+        while True:
+            batch: List[Tuple[int, bytes]] = []
+            ended = False
+            if self.events:
+                start = max(0, after + 1 - self.events[0][0])
+                for event_id, event_run, data in islice(self.events, start, None):
+                    if run is None:
+                        run = event_run
+                    elif event_run != run:
+                        ended = True
+                        break
+                    batch.append((event_id, data))
+            if batch:
+                after = batch[-1][0]
+                yield batch
+            if ended or (self.finished and (run is None or run == self.run)):
+                return
+            if after < self.last_id:
+                continue
+            await self._changed.wait()
+            if window > 0 and not self.finished:
+                await asyncio.sleep(window)
+
+    # ------------------------------------------------------------------
+    # 客户端
+    # ------------------------------------------------------------------
+
+    def attach(self) -> None:
+        self.subscribers += 1
+        self._cancel_idle_timer()
+
+    def detach(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers > 0 or self.finished or self._task is None:
+            return
+        if self.grace <= 0:
+            self._cancel_run()
+        else:
+            loop = asyncio.get_running_loop()
+            self._idle_timer = loop.call_later(self.grace, self._cancel_run)
+
+    def _cancel_idle_timer(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _cancel_run(self) -> None:
+        self._idle_timer = None
+        if self.subscribers == 0 and self._task is not None and not self._task.done():
+            metrics.inc("stream_idle_cancelled")
+            self._task.cancel()
+
+
+class StreamBuffers:
+    """thread_id -> StreamBuffer（LRU，只淘汰已结束且没有客户端的缓冲）
+
+    Args:
+        max_threads: 保留缓冲的 thread 数量上限
+        max_events: 每个 thread 保留的事件数
+        grace: 没有客户端后等待重新连接的时间（秒）
+    """
+
+    def __init__(self, max_threads: int = STREAM_REPLAY_THREADS,
+                 max_events: int = STREAM_REPLAY_EVENTS, grace: float = STREAM_RESUME_GRACE):
+        self.max_threads = max_threads
+        self.max_events = max_events
+        self.grace = grace
+        self._buffers: "OrderedDict[str, StreamBuffer]" = OrderedDict()
+        # 统计
+        self.reattached = 0
+        self.replayed = 0
+        self.gaps = 0
+
+    def get(self, thread_id: str) -> Optional[StreamBuffer]:
+        return self._buffers.get(thread_id)
+
+    def open(self, thread_id: str) -> StreamBuffer:
+        """返回 thread 的缓冲，不存在时创建"""
+        buffer = self._buffers.get(thread_id)
+        if buffer is None:
+            buffer = self._buffers[thread_id] = StreamBuffer(thread_id, self.max_events, self.grace)
+        else:
+            buffer.grace = self.grace
+        self._buffers.move_to_end(thread_id)
+        self._evict(keep=thread_id)
+        return buffer
+
+    def _evict(self, keep: str) -> None:
+        excess = len(self._buffers) - self.max_threads
+        if excess <= 0:
+            return
+        idle = [key for key, buffer in self._buffers.items()
+                if key != keep and buffer.finished and buffer.subscribers == 0]
+        for thread_id in idle[:excess]:
+            del self._buffers[thread_id]
+
+    def stats(self) -> Dict[str, Any]:
+        buffers = list(self._buffers.values())
+        return {
+            "threads": len(buffers),
+            "running": sum(not buffer.finished for buffer in buffers),
+            "subscribers": sum(buffer.subscribers for buffer in buffers),
+            "events": sum(len(buffer.events) for buffer in buffers),
+            "reattached": self.reattached,
+            "replayed_events": self.replayed,
+            "gaps": self.gaps,
+        }
+
+
+# api 进程内共享的事件缓冲
+stream_buffers = StreamBuffers()
@@ -0,0 +1,85 @@
+"""
+本地 token 计数
+
+用于在调用模型之前估算上下文长度，不需要请求模型服务。
+- 安装了 tiktoken 且能加载编码表时使用 tiktoken，编码表只加载一次
+- 未安装或加载失败（例如离线环境下载不到编码表）时退化为按字符估算：
+  ASCII 约 4 个字符 1 个 token，CJK 等非 ASCII 字符每个字符约 1 个 token
+- 相同文本的计数结果有 LRU 缓存，多轮循环中反复出现的历史消息只编码一次
+
+通过环境变量配置：
+    TOKENIZER_ENCODING: tiktoken 编码名称，默认 o200k_base
+"""
+import math
+import os
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+
+# 每条消息的固定开销（role、分隔符等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=1)
+def _encoder() -> Optional[Callable[[str], Any]]:
+    """加载 tiktoken 编码器，不可用时返回 None（结果缓存，失败后不再重试）"""
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:
+        return None
+    return encoding.encode_ordinary
+
+
+def tokenizer_name() -> str:
+    """当前使用的计数方式"""
+    return f"tiktoken:{TOKENIZER_ENCODING}" if _encoder() is not None else "estimate"
+
+
+def estimate_tokens(text: str) -> int:
+    """不依赖分词器的估算"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+@lru_cache(maxsize=1024)
+def count_tokens(text: str) -> int:
+    """计算文本的 token 数"""
+    if not text:
+        return 0
+    encode = _encoder()
+    if encode is None:
+        return estimate_tokens(text)
+    return len(encode(text))
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            if isinstance(item, str):
+                parts.append(item)
+            elif isinstance(item, dict) and isinstance(item.get("text"), str):
+                parts.append(item["text"])
+        return "".join(parts)
+    return str(content)
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    """计算单条消息的 token 数（内容 + 工具调用参数 + 固定开销）"""
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(_content_text(message.content))
+    if isinstance(message, AIMessage):
+        for call in message.tool_calls:
+            tokens += count_tokens(call.get("name") or "") + count_tokens(str(call.get("args") or ""))
+    return tokens
+
+
+def count_messages_tokens(messages: Iterable[BaseMessage]) -> int:
+    """计算消息列表的 token 数"""
+    return sum(count_message_tokens(m) for m in messages)
@@ -2,6 +2,7 @@
 Pytest 配置文件
 自动设置 Python 路径，使测试能够导入项目模块
 """
+import os
 import sys
 from pathlib import Path
 
@@ -9,3 +10,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
+
+# 测试环境不访问真实模型，提供占位密钥避免导入 src.llms.fz 时构造客户端失败
+os.environ.setdefault("ARK_API_KEY", "test")
+os.environ.setdefault("OPEN_AI_API_KEY", "test")
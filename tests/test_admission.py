@@ -0,0 +1,74 @@
+"""
+/stream/chat 准入控制的单元测试
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as api_main
+from src.utils.admission import AdmissionController, AdmissionRejected
+
+
+def test_queue_limit_and_timeout():
+    """测试名额用满后排队，队列满时立即拒绝，排队超时同样拒绝"""
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.2)
+        first = await controller.acquire("a")
+        queued = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+        assert controller.stats()["queue_depth"] == 1
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("c")
+        assert rejected.value.reason == "queue_full" and rejected.value.retry_after >= 1
+
+        first.release()
+        first.release()  # 重复释放不影响计数
+        second = await queued
+        assert second.waited > 0 and controller.stats()["running"] == 1
+
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await controller.acquire("d")
+        assert timed_out.value.reason == "timeout"
+        second.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["running"] == 0 and stats["threads"] == 0
+    assert stats["admitted"] == 2 and stats["rejected"] == 2
+
+
+def test_same_thread_runs_one_at_a_time():
+    """测试同一 thread_id 的请求依次执行，其他 thread 不受影响"""
+    async def scenario():
+        controller = AdmissionController(max_concurrent=4, max_queue=4, queue_timeout=1)
+        order = []
+
+        async def run(thread_id: str, name: str):
+            ticket = await controller.acquire(thread_id)
+            order.append(f"{name} start")
+            await asyncio.sleep(0.05)
+            order.append(f"{name} end")
+            ticket.release()
+
+        await asyncio.gather(run("t", "a"), run("t", "b"), run("other", "c"))
+        return order
+
+    order = asyncio.run(scenario())
+    assert order.index("a end") < order.index("b start")
+    assert order.index("c start") < order.index("a end")
+
+
+def test_stream_chat_returns_429_with_retry_after():
+    """测试准入被拒绝时返回 429 和 Retry-After，不启动图运行"""
+    async def reject(thread_id):
+        raise AdmissionRejected("queue_full", 7)
+
+    with patch.object(api_main.admission, "acquire", reject):
+        response = TestClient(api_main.app).post("/stream/chat", json={"message": "hi"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert response.json()["reason"] == "queue_full"
@@ -0,0 +1,71 @@
+"""
+子 agent 缓存的单元测试
+"""
+import asyncio
+from typing import Any, List
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from src.agents.agent_cache import AgentCache
+
+
+class RecordingChatModel(FakeListChatModel):
+    """记录每次收到的消息的假模型"""
+    received: List[List[BaseMessage]] = []
+
+    def _call(self, messages: List[BaseMessage], *args: Any, **kwargs: Any) -> str:
+        self.received.append(messages)
+        return super()._call(messages, *args, **kwargs)
+
+
+def test_get_or_create_hits_and_misses():
+    """测试相同 key 复用同一个 agent，并统计命中"""
+    cache = AgentCache(max_size=4)
+    model = FakeListChatModel(responses=["ok"])
+
+    first = cache.get_or_create(model=model, tools=[], prompt_name="research_prompt")
+    second = cache.get_or_create(model=model, tools=[], prompt_name="research_prompt")
+    other = cache.get_or_create(model=model, tools=[], prompt_name="research_coordinator")
+
+    assert first is second
+    assert other is not first
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_lru_eviction():
+    """测试超过容量后淘汰最久未使用的 agent"""
+    cache = AgentCache(max_size=2)
+    model = FakeListChatModel(responses=["ok"])
+
+    a = cache.get_or_create(model=model, tools=[], prompt_name="a")
+    cache.get_or_create(model=model, tools=[], prompt_name="b")
+    # 访问 a，使 b 成为最久未使用
+    cache.get_or_create(model=model, tools=[], prompt_name="a")
+    cache.get_or_create(model=model, tools=[], prompt_name="c")
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_create(model=model, tools=[], prompt_name="a") is a
+    misses = cache.stats()["misses"]
+    cache.get_or_create(model=model, tools=[], prompt_name="b")
+    assert cache.stats()["misses"] == misses + 1
+
+
+def test_system_prompt_injected_per_call():
+    """测试系统提示词在调用时注入，缓存的 agent 可以使用不同提示词"""
+    cache = AgentCache()
+    model = RecordingChatModel(responses=["ok", "ok"], received=[])
+    agent = cache.get_or_create(model=model, tools=[], prompt_name="p")
+
+    for prompt in ("prompt-1", "prompt-2"):
+        asyncio.run(agent.ainvoke(
+            {"messages": [HumanMessage(content="hi")]},
+            context={"system_prompt": prompt},
+        ))
+
+    system_prompts = [
+        m.content for call in model.received for m in call if isinstance(m, SystemMessage)
+    ]
+    assert system_prompts == ["prompt-1", "prompt-2"]
@@ -0,0 +1,151 @@
+"""
+客户端断开时取消图运行的单元测试
+"""
+import asyncio
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessageChunk
+
+import api.main as api_main
+from src.monitoring.usage import UsageStore
+from src.utils.stream_buffer import StreamBuffer
+
+
+class SlowGraph:
+    """推送一个 chunk 后长时间阻塞的假图，记录是否被取消"""
+
+    def __init__(self):
+        self.inputs = []
+        self.cancelled = False
+
+    async def astream(self, input, config=None, stream_mode="values"):
+        self.inputs.append(input)
+        yield ("messages", (AIMessageChunk(content="金价", id="c1"),
+                            {"langgraph_node": "research"}))
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+class GatedGraph:
+    """推送一个 chunk 后等待 gate 的假图"""
+
+    def __init__(self):
+        self.inputs = []
+        self.gate = asyncio.Event()
+
+    async def astream(self, input, config=None, stream_mode="values"):
+        self.inputs.append(input)
+        yield ("messages", (AIMessageChunk(content="金价", id="c1"),
+                            {"langgraph_node": "research"}))
+        await self.gate.wait()
+
+
+class FakeRequest:
+    """receive() 在 disconnect 被设置后返回 http.disconnect"""
+
+    def __init__(self):
+        self.disconnect = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+
+async def consume_until_disconnect(body):
+    request = FakeRequest()
+    response = await api_main.stream_chat(body, request)
+    events = []
+    async for chunk in response.body_iterator:
+        events.append(chunk)
+        request.disconnect.set()
+    await response.background()
+    return events
+
+
+def test_disconnect_cancels_run_and_next_request_resumes():
+    """测试断开后图运行被取消、记录取消标记，同一 thread 的 resume 请求从 checkpoint 继续，
+    带新消息的请求放弃断点并处理新消息"""
+    graph = SlowGraph()
+    store = UsageStore()
+    thread_id = "t-cancel"
+    body = api_main.ChatRequest(message="最新黄金价格", thread_id=thread_id, mode="tokens")
+
+    tasks = []
+    start = StreamBuffer.start
+
+    def record_start(buffer, task):
+        tasks.append(task)
+        start(buffer, task)
+
+    # 不等待重新连接，断开后立即取消
+    with patch.object(api_main, "research_agent", graph), \
+            patch.object(api_main, "usage_store", store), \
+            patch.object(api_main.stream_buffers, "grace", 0), \
+            patch.object(StreamBuffer, "start", record_start):
+        events = asyncio.run(asyncio.wait_for(consume_until_disconnect(body), timeout=5))
+        assert graph.cancelled
+        # 取消没有被吞掉，运行的 task 以取消状态结束
+        assert tasks[0].cancelled()
+        assert api_main.interrupt_store.get(thread_id)["cancelled"] is True
+        assert not any(b'"done"' in event for event in events)
+        assert store.stats()["cancelled"] == 1
+
+        # resume 请求在同一 thread 上用 None 继续，取消标记被消费
+        resume = api_main.ChatRequest(message="", thread_id=thread_id, mode="tokens", resume=True)
+        asyncio.run(asyncio.wait_for(consume_until_disconnect(resume), timeout=5))
+        assert graph.inputs[1] is None
+
+        # 带新消息的请求不继续上次的运行，直接处理新消息
+        follow_up = api_main.ChatRequest(message="换成白银", thread_id=thread_id, mode="tokens")
+        asyncio.run(asyncio.wait_for(consume_until_disconnect(follow_up), timeout=5))
+
+    assert graph.inputs[2] == {"messages": [{"role": "user", "content": "换成白银"}]}
+    api_main.interrupt_store.pop(thread_id)
+    assert api_main.admission.stats()["running"] == 0
+
+
+def test_same_thread_waits_for_run_continuing_after_disconnect():
+    """测试断开后运行在 grace 内继续时仍占用名额，同一 thread 的下一个请求等待其结束后再运行"""
+    graph = GatedGraph()
+    thread_id = "t-grace"
+    body = api_main.ChatRequest(message="最新黄金价格", thread_id=thread_id, mode="tokens")
+
+    async def scenario():
+        await consume_until_disconnect(body)
+        assert api_main.admission.stats()["running"] == 1
+
+        second = asyncio.create_task(consume_until_disconnect(body))
+        await asyncio.sleep(0.1)
+        assert not second.done() and len(graph.inputs) == 1
+
+        graph.gate.set()
+        await second
+
+    with patch.object(api_main, "research_agent", graph), \
+            patch.object(api_main, "usage_store", UsageStore()), \
+            patch.object(api_main.stream_buffers, "grace", 5):
+        asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+    assert len(graph.inputs) == 2
+    assert api_main.interrupt_store.get(thread_id) is None
+    assert api_main.admission.stats()["running"] == 0
+
+
+def test_store_estimates_tokens_saved_from_completed_runs():
+    """测试节省的 tokens 按已完成运行的平均用量估计，取消的运行不计入平均值"""
+    store = UsageStore()
+    assert store.estimate_saved({"total_tokens": 10}) == 0
+
+    store.record("t1", {"total_tokens": 100})
+    store.record("t2", {"total_tokens": 300})
+    cancelled = {"total_tokens": 50}
+    cancelled["tokens_saved_estimate"] = store.estimate_saved(cancelled)
+    store.record("t3", cancelled, cancelled=True)
+
+    assert cancelled["tokens_saved_estimate"] == 150
+    assert store.estimate_saved({"total_tokens": 0}) == 200
+    assert store.stats()["tokens_saved_estimate"] == 150
+    assert store.get("t3")["cancelled"] == 1
@@ -0,0 +1,104 @@
+"""
+上下文压缩的单元测试
+"""
+import asyncio
+
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.middlewares.compaction import MessageCompactionMiddleware, compact_messages, compact_text
+from src.utils.tokens import count_messages_tokens, count_tokens
+
+PAGE = "黄金价格 gold price " * 500
+
+
+def make_history(turns: int):
+    messages = [SystemMessage(content="你是研究助手"), HumanMessage(content="调研黄金价格")]
+    for i in range(turns):
+        messages.append(AIMessage(content="", tool_calls=[
+            {"name": "read_url", "args": {"url": f"https://example.com/{i}"}, "id": f"call_{i}"}]))
+        messages.append(ToolMessage(content=f"{i}:{PAGE}", tool_call_id=f"call_{i}"))
+    return messages
+
+
+def test_under_budget_unchanged():
+    """测试未超出预算时消息保持不变"""
+    messages = make_history(2)
+    compacted, result = compact_messages(messages, max_tokens=10**6)
+    assert compacted == messages
+    assert not result.changed
+
+
+def test_compresses_old_tool_outputs_first():
+    """测试先压缩最早的工具输出，保留开头和最近的消息原样"""
+    messages = make_history(6)
+    budget = count_messages_tokens(messages) - 2 * count_tokens(messages[3].content)
+    compacted, result = compact_messages(messages, max_tokens=budget, keep_recent=4)
+
+    assert result.compressed >= 2 and result.dropped == 0
+    assert result.tokens_after <= budget
+    assert compacted[:2] == messages[:2]
+    assert compacted[-4:] == messages[-4:]
+    assert "工具输出已压缩" in compacted[3].content
+    assert compacted[3].tool_call_id == "call_0"
+
+
+def test_drops_whole_groups_when_still_over_budget():
+    """测试压缩后仍超出预算时整组删除，工具消息不会和 AI 消息分开"""
+    messages = make_history(8)
+    compacted, result = compact_messages(messages, max_tokens=4000, keep_recent=3)
+
+    assert result.dropped > 0
+    assert compacted[:2] == messages[:2]
+    assert "已省略" in compacted[2].content
+    # 最近窗口向前扩展到发起调用的 AI 消息
+    assert compacted[-4:] == messages[-4:]
+    for i, message in enumerate(compacted):
+        if isinstance(message, ToolMessage):
+            previous = compacted[i - 1]
+            assert isinstance(previous, AIMessage) and previous.tool_calls
+
+
+def test_compact_text():
+    """测试长文本截断"""
+    assert compact_text("short", max_tokens=10) == "short"
+    text = compact_text("字" * 1000, max_tokens=100)
+    assert text.startswith("字" * 100) and "内容已截断" in text
+
+
+def test_middleware_compacts_model_request():
+    """测试中间件在调用模型前压缩消息，agent state 中保留完整记录"""
+    seen = []
+
+    class RecordingModel(GenericFakeChatModel):
+        def _generate(self, messages, *args, **kwargs):
+            seen.append(messages)
+            return super()._generate(messages, *args, **kwargs)
+
+    model = RecordingModel(messages=iter([AIMessage(content="完成")]))
+    agent = create_agent(model=model, tools=[], middleware=[
+        MessageCompactionMiddleware(max_tokens=5000, keep_recent=2)])
+    history = make_history(4)[1:] + [HumanMessage(content="总结一下")]
+    result = agent.invoke({"messages": history})
+
+    assert count_messages_tokens(seen[0]) <= 5000 < count_messages_tokens(history)
+    assert len(result["messages"]) == len(history) + 1
+    assert result["messages"][2].content == history[2].content
+
+
+def test_research_node_returns_only_final_answer():
+    """测试 research 节点只把最终回答写回图状态，不带子 agent 的工具记录"""
+    from unittest.mock import patch
+
+    from src.agents import research
+
+    class FakeAgent:
+        async def ainvoke(self, inputs, context=None):
+            return {"messages": inputs["messages"] + make_history(3)[2:] + [AIMessage(content="黄金价格上涨")]}
+
+    with patch.object(research.agent_cache, "get_or_create", return_value=FakeAgent()), \
+            patch.object(research, "get_research_llm", return_value=None):
+        update = asyncio.run(research.research_node({"user_input_optimized": "调研黄金价格"}))
+
+    assert [message.content for message in update["messages"]] == ["黄金价格上涨"]
@@ -0,0 +1,98 @@
+"""
+流式下载的单元测试（使用本地 HTTP 服务）
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.download import (
+    UnsupportedContentError,
+    adownload_text,
+    detect_encoding,
+    download_text,
+)
+
+PAGE = ("<html><body>" + "<p>今日黄金价格上涨。</p>" * 20000 + "</body></html>").encode("utf-8")
+GBK_PAGE = '<html><head><meta charset="gbk"></head><body>黄金价格</body></html>'.encode("gbk")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/endless":
+            # 不断输出内容、永不结束的响应
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            try:
+                while True:
+                    self.wfile.write(b"<p>" + b"x" * 4096 + b"</p>")
+                    time.sleep(0.01)
+            except OSError:
+                return
+        content_type, body = {
+            "/large": ("text/html; charset=utf-8", PAGE),
+            "/gbk": ("text/html", GBK_PAGE),
+            "/pdf": ("application/pdf", b"%PDF-1.7\n" + b"\x00" * 1000),
+            "/disguised": ("text/html", b"%PDF-1.7\n" + b"\x00" * 1000),
+        }[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_download_stops_at_byte_cap(server):
+    """测试达到字节上限后停止下载，且不会截出半个字符"""
+    download = download_text(f"{server}/large", max_bytes=10001)
+    assert download.truncated
+    assert download.bytes_read == 10001
+    assert "�" not in download.text
+    assert download.text.startswith("<html><body><p>今日黄金价格上涨。</p>")
+
+    full = download_text(f"{server}/large", max_bytes=len(PAGE) + 1)
+    assert not full.truncated
+    assert full.text == PAGE.decode("utf-8")
+
+
+def test_download_endless_response(server):
+    """测试不结束的响应在达到上限后立即返回"""
+    start = time.perf_counter()
+    download = asyncio.run(adownload_text(f"{server}/endless", max_bytes=64 * 1024))
+    assert time.perf_counter() - start < 2
+    assert download.truncated and download.bytes_read == 64 * 1024
+
+
+def test_download_rejects_binary(server):
+    """测试拒绝声明为二进制或带有文件签名的响应"""
+    with pytest.raises(UnsupportedContentError):
+        download_text(f"{server}/pdf")
+    with pytest.raises(UnsupportedContentError):
+        download_text(f"{server}/disguised")
+
+
+def test_download_detects_charset(server):
+    """测试从 <meta charset> 识别字符集"""
+    download = download_text(f"{server}/gbk")
+    assert download.encoding == "gbk"
+    assert "黄金价格" in download.text
+    assert detect_encoding("utf-8", b'<meta charset="gbk">') == "utf-8"
+    assert detect_encoding(None, b"\xef\xbb\xbf<html>") == "utf-8-sig"
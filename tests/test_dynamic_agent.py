@@ -0,0 +1,84 @@
+"""
+dynamic_agent 并行子任务派发的单元测试
+"""
+import asyncio
+import importlib
+import json
+import time
+from unittest.mock import patch
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from benchmarks.fake_llm import SleepyChatModel
+from src.agents import actor_factory, dynamic_actor, planner
+from src.agents.planner import parse_subtasks
+from src.agents.tool_selector import ToolSelector
+from src.state import init_agent_state, merge_subtask_results
+
+# src.agents 包导出了同名的 dynamic_agent 图，这里取模块本身
+dynamic_agent_module = importlib.import_module("src.agents.dynamic_agent")
+
+LATENCY = 0.2
+
+
+def planner_model(*outputs):
+    return GenericFakeChatModel(
+        messages=iter([AIMessage(content=json.dumps(o, ensure_ascii=False)) for o in outputs]))
+
+
+def run_graph(subtasks, max_parallel=4):
+    model = planner_model(
+        {"progress_list": "- [ ] 调研", "next_action": "continue", "subtasks": subtasks},
+        {"progress_list": "- [x] 调研", "next_action": "finish"},
+    )
+    factory = SleepyChatModel(latency=LATENCY, response='{"actor_persona": "分析师", "actor_tools": []}')
+    actor = SleepyChatModel(latency=LATENCY, response="完成")
+    state = init_agent_state()
+    state["messages"] = [HumanMessage(content="比较黄金、白银和铜的价格走势")]
+
+    with patch.object(planner, "llm", model), patch.object(actor_factory, "llm", factory), \
+            patch.object(dynamic_actor, "llm", actor), \
+            patch.object(actor_factory, "tool_selector", ToolSelector(":memory:", enabled=False)), \
+            patch.object(dynamic_agent_module, "SUBTASK_MAX_PARALLEL", max_parallel):
+        start = time.perf_counter()
+        result = asyncio.run(dynamic_agent_module.dynamic_agent.ainvoke(state))
+        return result, time.perf_counter() - start
+
+
+def test_parse_subtasks():
+    """测试 planner 输出的子任务列表解析"""
+    assert parse_subtasks({"subtasks": ["a", "b"]}) == ["a", "b"]
+    assert parse_subtasks({"current_subtask": "a"}) == ["a"]
+    assert parse_subtasks({"current_subtask": "FINISH"}) == []
+    assert parse_subtasks({"next_action": "finish", "subtasks": ["a"]}) == []
+
+
+def test_merge_subtask_results_reducer():
+    """测试结果 reducer 追加与清空"""
+    assert merge_subtask_results([{"a": 1}], [{"b": 2}]) == [{"a": 1}, {"b": 2}]
+    assert merge_subtask_results([{"a": 1}], None) == []
+
+
+def test_independent_subtasks_run_in_parallel():
+    """测试一批独立子任务并行执行，耗时接近单个分支"""
+    subtasks = ["查询黄金价格", "查询白银价格", "查询铜价格"]
+    result, elapsed = run_graph(subtasks)
+
+    # 每个分支为 actor_factory + dynamic_actor 两次模型调用
+    assert elapsed < len(subtasks) * 2 * LATENCY
+    merged = result["subtask_result"]
+    assert merged["status"] == "success"
+    assert [r["subtask"] for r in merged["results"]] == subtasks
+    assert result["react_iteration_count"] == 1
+    assert result["subtasks"] == []
+
+
+def test_max_parallel_dispatches_in_waves():
+    """测试超出最大并行数的子任务在下一波执行，结果全部汇总"""
+    subtasks = ["a", "b", "c"]
+    result, elapsed = run_graph(subtasks, max_parallel=2)
+
+    assert elapsed >= 2 * 2 * LATENCY
+    assert [r["subtask"] for r in result["subtask_result"]["results"]] == subtasks
+    assert result["react_iteration_count"] == 1
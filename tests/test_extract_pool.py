@@ -0,0 +1,76 @@
+"""
+正文提取进程池的单元测试
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.extract_pool import (
+    ExtractionOverloaded,
+    ExtractionPool,
+    ExtractionTimeout,
+    extract_markdown,
+)
+
+ARTICLE = (
+    "<html><body><article>"
+    + "<p>今日黄金价格上涨，市场避险情绪升温，多家机构上调了全年金价预测。</p>" * 20
+    + "</article></body></html>"
+)
+
+
+def test_extract_in_process_pool():
+    """测试在子进程中提取正文（同步与异步）"""
+    pool = ExtractionPool(max_workers=1)
+    try:
+        assert "黄金价格" in pool.extract(ARTICLE)
+        assert "黄金价格" in asyncio.run(pool.aextract(ARTICLE))
+        assert pool.stats()["completed"] == 2
+    finally:
+        pool.close()
+
+
+def test_queue_limit_rejects():
+    """测试在途文档达到上限时直接拒绝"""
+    pool = ExtractionPool(max_workers=1, max_queue=0)
+    try:
+        with pytest.raises(ExtractionOverloaded):
+            pool.extract(ARTICLE)
+        assert pool.stats()["rejected"] == 1
+    finally:
+        pool.close()
+
+
+def test_timeout_replaces_only_stuck_worker():
+    """测试超时从子进程开始处理时计时，只替换卡住的子进程，排队中的文档继续提取"""
+    pool = ExtractionPool(max_workers=1, timeout=2)
+    try:
+        stuck = pool._submit(time.sleep, 30)
+        # 排在卡住的任务后面，排队时间不计入超时
+        queued = pool._submit(extract_markdown, ARTICLE)
+        with pytest.raises(ExtractionTimeout):
+            stuck.result(timeout=20)
+        assert "黄金价格" in queued.result(timeout=20)
+        stats = pool.stats()
+        assert stats["timeouts"] == 1 and stats["restarts"] == 1 and stats["completed"] == 1
+    finally:
+        pool.close()
+
+
+def test_inline_async_extract_runs_off_event_loop():
+    """测试不使用进程池时异步提取在线程中执行，不阻塞事件循环"""
+    threads = []
+
+    def record(html):
+        threads.append(threading.get_ident())
+        return html
+
+    async def run():
+        with patch("src.utils.extract_pool.extract_markdown", record):
+            return await ExtractionPool(max_workers=0).aextract("正文")
+
+    assert asyncio.run(run()) == "正文"
+    assert threads and threads[0] != threading.get_ident()
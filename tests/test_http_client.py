@@ -0,0 +1,83 @@
+"""
+共享 HTTP 连接池的单元测试（使用本地 HTTP 服务）
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.http_client import HttpClientPool
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 记录服务端接受的 TCP 连接数和并发请求峰值
+    connections = 0
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StandInHandler.lock:
+            StandInHandler.connections += 1
+
+    def do_GET(self):
+        with StandInHandler.lock:
+            StandInHandler.active += 1
+            StandInHandler.peak = max(StandInHandler.peak, StandInHandler.active)
+        if self.path == "/slow":
+            time.sleep(0.05)
+        body = "<html><body><p>黄金价格</p></body></html>".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with StandInHandler.lock:
+            StandInHandler.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandInHandler.connections = StandInHandler.active = StandInHandler.peak = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_sync_requests_reuse_connection(server):
+    """测试同一 host 的多次请求复用 keep-alive 连接"""
+    pool = HttpClientPool()
+    for _ in range(5):
+        response = pool.get(f"{server}/page")
+        assert "黄金价格" in response.text
+    pool.close()
+
+    assert StandInHandler.connections == 1
+    assert pool.stats()["requests"] == 5
+
+
+def test_async_per_host_limit(server):
+    """测试单 host 并发请求数不超过 max_per_host"""
+    pool = HttpClientPool(max_per_host=2)
+
+    async def run():
+        await asyncio.gather(*(pool.aget(f"{server}/slow") for _ in range(6)))
+        stats = pool.stats()
+        await pool.aclose()
+        return stats
+
+    stats = asyncio.run(run())
+    assert StandInHandler.peak <= 2
+    assert stats["requests"] == 6
+    assert stats["errors"] == 0
+    assert stats["connections"]["async"]["open"] <= 2
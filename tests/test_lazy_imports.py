@@ -0,0 +1,34 @@
+"""
+延迟导入的单元测试
+"""
+import subprocess
+import sys
+
+
+def test_api_import_defers_models_and_dynamic_agent():
+    """测试导入 api.main 时不加载 langchain_openai 和 dynamic_agent"""
+    code = ("import sys, api.main; "
+            "print(sorted(m for m in ('langchain_openai', 'openai', 'src.agents.dynamic_agent') "
+            "if m in sys.modules))")
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert completed.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_api_import_does_not_build_graphs():
+    """测试导入 api.main 时不编译 research 工作流、不打开 checkpointer"""
+    code = ("import api.main, src.agents.research as research; "
+            "print(api.main.research_agent is None, research._research_agent is None)")
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert completed.stdout.strip().splitlines()[-1] == "True True"
+
+
+def test_lazy_exports_resolve_on_first_use():
+    """测试旧的导入方式仍然可用：包级导出和模块属性在访问时创建"""
+    from langgraph.graph.state import CompiledStateGraph
+
+    from src.agents import dynamic_agent, research_agent
+    from src.llms import fz
+
+    assert isinstance(dynamic_agent, CompiledStateGraph)
+    assert isinstance(research_agent, CompiledStateGraph)
+    assert fz.fz_k2_chat_model is fz.get_k2_chat_model()
@@ -0,0 +1,87 @@
+"""
+LLM 响应缓存的单元测试
+"""
+import asyncio
+from typing import Any
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.output_parsers import JsonOutputParser
+
+from benchmarks.fake_llm import SleepyChatModel
+from src.llms.response_cache import SQLiteResponseCache, cached_model
+
+RESPONSE = '{"user_input_optimized": "最新黄金价格走势"}'
+
+
+class CountingChatModel(SleepyChatModel):
+    """记录实际调用次数的假模型"""
+
+    latency: float = 0.0
+    response: str = RESPONSE
+    calls: int = 0
+
+    def _generate(self, *args: Any, **kwargs: Any):
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args: Any, **kwargs: Any):
+        self.calls += 1
+        return await super()._agenerate(*args, **kwargs)
+
+
+def prompt(time_str: str, message_id: str):
+    return [
+        SystemMessage(content=f"You are the planner.\n\n---\nCURRENT_TIME: {time_str}\n---"),
+        HumanMessage(content="最新黄金价格", id=message_id),
+    ]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLiteResponseCache(str(tmp_path / "llm_cache.sqlite"), ttl=60, max_entries=10)
+
+
+def test_replay_skips_llm_call(cache):
+    """测试相同输入（时间、消息 id 不同）命中缓存，不再调用模型"""
+    model = CountingChatModel(cache=cache)
+    chain = model | JsonOutputParser()
+
+    first = chain.invoke(prompt("Mon Jan 01 2024 00:00:00", "a"))
+    second = asyncio.run(chain.ainvoke(prompt("Mon Jan 01 2024 00:05:00", "b")))
+
+    assert first == second == {"user_input_optimized": "最新黄金价格走势"}
+    assert model.calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["stores"] == 1
+
+
+def test_parameters_and_messages_are_part_of_key(cache):
+    """测试模型参数或消息不同时不命中"""
+    model = CountingChatModel(cache=cache)
+    model.invoke(prompt("t", "a"))
+    model.invoke([HumanMessage(content="白银价格")])
+    model.invoke(prompt("t", "a"), stop=["\n"])
+    assert model.calls == 3
+
+
+def test_ttl_and_max_entries(tmp_path):
+    """测试过期条目视为未命中，超出条目上限时淘汰最久未访问的"""
+    expired = SQLiteResponseCache(str(tmp_path / "ttl.sqlite"), ttl=0)
+    model = CountingChatModel(cache=expired)
+    model.invoke(prompt("t", "a"))
+    model.invoke(prompt("t", "a"))
+    assert model.calls == 2 and expired.stats()["expired"] == 1
+
+    small = SQLiteResponseCache(str(tmp_path / "lru.sqlite"), ttl=60, max_entries=2)
+    model = CountingChatModel(cache=small)
+    for question in ("a", "b", "c"):
+        model.invoke([HumanMessage(content=question)])
+    assert small.stats()["entries"] == 2 and small.evictions == 1
+
+
+def test_cached_model_is_opt_in_per_node():
+    """测试只有启用的节点使用带缓存的模型副本"""
+    model = CountingChatModel()
+    assert cached_model(model, "planner", frozenset()) is model
+    copy = cached_model(model, "planner", frozenset({"planner"}))
+    assert copy is not model and copy.cache is not None and model.cache is None
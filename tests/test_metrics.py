@@ -0,0 +1,99 @@
+"""
+结构化日志与指标的单元测试
+"""
+import asyncio
+import logging
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as api_main
+from src.monitoring.logger import lazy, preview
+from src.monitoring.metrics import Histogram, MetricsRegistry, metrics
+from src.tools import search
+from src.tools.search import search_web
+from src.utils.mock import mock_tool_runtime
+
+
+def test_histogram_quantiles():
+    """测试直方图计数与分位数估算"""
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.count == 4
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.99) == 10.0
+    assert list(histogram.cumulative()) == [("0.1", 1), ("1.0", 3), ("10.0", 4), ("+Inf", 4)]
+
+
+def test_timed_records_latency_and_errors():
+    """测试 timed 装饰器记录同步/异步函数的耗时和异常"""
+    registry = MetricsRegistry(enabled=True)
+
+    @registry.timed("node", "planner")
+    async def planner():
+        return "ok"
+
+    @registry.timed("tool", "broken")
+    def broken():
+        raise RuntimeError("boom")
+
+    assert asyncio.run(planner()) == "ok"
+    with pytest.raises(RuntimeError):
+        broken()
+
+    snapshot = registry.snapshot()
+    assert snapshot["latency"]["node"]["planner"]["count"] == 1
+    assert snapshot["errors"]["tool"]["broken"] == 1
+
+    registry.inc("requests", status="ok")
+    registry.register_collector("cache", lambda: {"hits": 3, "nested": {"size": 2}, "name": "x"})
+    text = registry.render_prometheus()
+    assert 'app_latency_seconds_count{kind="node",name="planner"} 1' in text
+    assert 'app_errors_total{kind="tool",name="broken"} 1' in text
+    assert 'app_requests_total{status="ok"} 1' in text
+    assert "app_cache_hits 3.0" in text and "app_cache_nested_size 2.0" in text
+
+
+def test_disabled_registry_is_noop():
+    """测试关闭指标时 timed 直接返回原函数"""
+    registry = MetricsRegistry(enabled=False)
+
+    def fn():
+        return 1
+
+    assert registry.timed("tool", "fn")(fn) is fn
+    registry.observe("tool", "fn", 1.0)
+    registry.count_error("tool", "fn")
+    assert registry.snapshot()["latency"] == {}
+
+
+def test_lazy_arguments_not_formatted_below_level():
+    """测试日志级别不够时不会执行序列化和截断"""
+    calls = []
+    logger = logging.getLogger("src.test_lazy")
+    logger.setLevel(logging.INFO)
+    logger.debug("state: %s", lazy(lambda: calls.append(1)))
+    assert calls == []
+    assert str(preview("a" * 10, 4)) == "aaaa..."
+
+
+def test_tool_latency_exposed_at_metrics_endpoint():
+    """测试工具调用后 /metrics 输出对应的直方图"""
+    class Provider:
+        def text(self, query, max_results):
+            return [{"title": "标题", "body": "摘要", "href": "https://example.com"}]
+
+    search.search_cache.clear()
+    with patch.object(search, "search_provider", Provider()):
+        search_web.invoke({"query": "指标测试", "runtime": mock_tool_runtime()})
+
+    client = TestClient(api_main.app)
+    text = client.get("/metrics").text
+    assert 'app_latency_seconds_count{kind="tool",name="search_web"}' in text
+    assert "app_http_client_requests" in text
+
+    snapshot = client.get("/metrics", params={"format": "json"}).json()
+    assert snapshot["latency"]["tool"]["search_web"]["count"] >= 1
+    assert metrics.enabled
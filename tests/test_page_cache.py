@@ -0,0 +1,127 @@
+"""
+网页缓存的单元测试（使用本地 HTTP 服务）
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from src.tools.read_url import read_url_by_markdown
+from src.utils.mock import mock_tool_runtime
+from src.utils.page_cache import PageCache, normalize_url
+
+ARTICLE = (
+    "<html><head><title>黄金</title></head><body><article>"
+    + "<p>今日黄金价格上涨，市场避险情绪升温，多家机构上调了全年金价预测。</p>" * 20
+    + "</article></body></html>"
+)
+
+
+class CachingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    cache_control = "max-age=60"
+    requests = []
+
+    def do_GET(self):
+        CachingHandler.requests.append(
+            (self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Cache-Control", self.cache_control)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = ARTICLE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Cache-Control", self.cache_control)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    CachingHandler.requests = []
+    CachingHandler.cache_control = "max-age=60"
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), CachingHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def read(url):
+    return read_url_by_markdown.invoke({"url": url, "runtime": mock_tool_runtime()})
+
+
+def test_normalize_url():
+    """测试 URL 规范化"""
+    assert normalize_url("HTTPS://Example.com:443/a?b=2&a=1&utm_source=x#top") == \
+        "https://example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    # from 可能是业务参数（例如航班查询的出发地），不能去掉
+    assert normalize_url("https://a.com/flights?from=PEK&fbclid=1&spm=2") == \
+        "https://a.com/flights?from=PEK"
+
+
+def test_fresh_hit_skips_fetch(server, tmp_path):
+    """测试有效期内的命中不再发起请求"""
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    with patch("src.tools.read_url.page_cache", cache):
+        first = read(f"{server}/gold")
+        second = read(f"{server}/gold#section")
+
+    assert "黄金价格" in first
+    assert second == first
+    assert len(CachingHandler.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entry_revalidates_with_etag(server, tmp_path):
+    """测试 no-cache 的页面每次带 ETag 重新验证，304 时复用缓存"""
+    CachingHandler.cache_control = "no-cache"
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    with patch("src.tools.read_url.page_cache", cache):
+        first = read(f"{server}/gold")
+        second = read(f"{server}/gold")
+
+    assert second == first
+    assert CachingHandler.requests == [("/gold", None), ("/gold", '"v1"')]
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_no_store_and_lru_eviction(tmp_path):
+    """测试 no-store 不缓存，超出容量时淘汰最久未访问的条目"""
+    cache = PageCache(str(tmp_path / "pages.sqlite"), max_bytes=250)
+    assert not cache.put("http://a.com/x", {"cache-control": "no-store"}, "x", None)
+
+    cache.put("http://a.com/1", {}, "1" * 100, None)
+    cache.put("http://a.com/2", {}, "2" * 100, None)
+    cache.get("http://a.com/1")
+    cache.put("http://a.com/3", {}, "3" * 100, None)
+
+    assert cache.get("http://a.com/2") is None
+    assert cache.get("http://a.com/1") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_running_size_total(tmp_path):
+    """测试缓存总大小随写入、覆盖、淘汰增减，与表中的实际大小一致，重新打开时重新统计"""
+    path = str(tmp_path / "pages.sqlite")
+    cache = PageCache(path, max_bytes=250)
+    cache.put("http://a.com/1", {}, "1" * 100, None)
+    cache.put("http://a.com/1", {}, "1" * 50, "m" * 10)
+    cache.put("http://a.com/2", {}, "2" * 100, None)
+    cache.put("http://a.com/3", {}, "3" * 100, None)
+
+    assert cache._total == cache.stats()["bytes"] == 200
+    reopened = PageCache(path, max_bytes=250)
+    reopened.get("http://a.com/3")
+    assert reopened._total == 200
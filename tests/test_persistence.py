@@ -0,0 +1,102 @@
+"""
+SQLite checkpointer 与中断状态存储的单元测试
+"""
+import asyncio
+import threading
+import time
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from src.persistence import InterruptStore, MemoryInterruptStore, SqliteInterruptStore, SqliteSaver
+
+
+class CounterState(TypedDict):
+    count: int
+
+
+def build_graph(checkpointer):
+    workflow = StateGraph(CounterState)
+    workflow.add_node("inc", lambda state: {"count": state["count"] + 1})
+    workflow.add_edge(START, "inc")
+    workflow.add_edge("inc", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def test_checkpoint_visible_to_other_worker(tmp_path):
+    """测试批量写入提交后，另一个连接（模拟其他 worker）可以读到状态"""
+    db_path = str(tmp_path / "checkpoints.sqlite")
+    saver = SqliteSaver(db_path, batch_size=1000, flush_interval=3600)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+
+    asyncio.run(graph.ainvoke({"count": 0}, config))
+    # 同进程读取会先提交缓冲
+    assert graph.get_state(config).values["count"] == 1
+
+    other = build_graph(SqliteSaver(db_path))
+    assert other.get_state(config).values["count"] == 1
+
+    # 在已有状态上继续执行
+    asyncio.run(other.ainvoke({"count": 10}, config))
+    assert other.get_state(config).values["count"] == 11
+    assert len(list(other.checkpointer.list(config))) >= 4
+
+
+def test_checkpoint_ttl_eviction(tmp_path):
+    """测试超过 TTL 的 thread 被整体删除"""
+    saver = SqliteSaver(str(tmp_path / "c.sqlite"), batch_size=1)
+    graph = build_graph(saver)
+    graph.invoke({"count": 0}, {"configurable": {"thread_id": "old"}})
+    time.sleep(0.05)
+    graph.invoke({"count": 0}, {"configurable": {"thread_id": "new"}})
+
+    assert saver.evict_expired(ttl_seconds=0.03) == 1
+    assert saver.get_tuple({"configurable": {"thread_id": "old"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "new"}}) is not None
+
+
+def test_buffered_writes_do_not_wait_for_commit(tmp_path):
+    """测试提交进行中（持有连接锁）时，异步写入只进缓冲，不等待磁盘 I/O"""
+    saver = SqliteSaver(str(tmp_path / "c.sqlite"), batch_size=1000, flush_interval=3600)
+    config = {"configurable": {"thread_id": "t1", "checkpoint_ns": "", "checkpoint_id": "c1"}}
+    committing, done = threading.Event(), threading.Event()
+
+    def commit():
+        with saver._lock:
+            committing.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=commit)
+    thread.start()
+    committing.wait()
+    start = time.perf_counter()
+    asyncio.run(saver.aput_writes(config, [("count", 1)], "task-1"))
+    elapsed = time.perf_counter() - start
+    done.set()
+    thread.join()
+
+    assert elapsed < 1
+    assert saver.flush() == 1
+
+
+def test_interrupt_store_pop_and_ttl(tmp_path):
+    """测试中断状态只能被取出一次，且过期后不可见"""
+    for store in (
+        MemoryInterruptStore(ttl_seconds=60),
+        SqliteInterruptStore(str(tmp_path / "i.sqlite"), ttl_seconds=60),
+    ):
+        store.put("t1", {"action_requests": [{"tool_name": "search_web"}]})
+        assert "t1" in store
+        assert store.pop("t1")["action_requests"][0]["tool_name"] == "search_web"
+        assert store.pop("t1") is None
+
+        store.ttl_seconds = 0.01
+        store.put("t2", {"action_requests": []})
+        time.sleep(0.02)
+        assert store.get("t2") is None
+
+    # 接口类不能直接实例化
+    with pytest.raises(TypeError):
+        InterruptStore()
@@ -0,0 +1,60 @@
+"""
+提示词模板渲染的单元测试
+"""
+from unittest.mock import patch
+
+from src.prompts.template import (
+    PromptRegistry,
+    apply_prompt_template,
+    env,
+    render_prompt,
+    split_volatile,
+)
+
+
+def test_split_volatile_moves_front_matter_to_suffix():
+    """测试 CURRENT_TIME 所在行移到后缀，空的 front matter 被去掉"""
+    static, volatile = split_volatile(
+        "---\nCURRENT_TIME: {{ CURRENT_TIME }}\n---\n\nYou are {{ name }}.\n")
+    assert static == "You are {{ name }}.\n"
+    assert volatile == "---\nCURRENT_TIME: {{ CURRENT_TIME }}\n---"
+    assert split_volatile("no variables\n") == ("no variables\n", "")
+
+
+def test_prefix_is_stable_across_calls():
+    """测试不同时间渲染的前缀完全一致，时间只出现在末尾"""
+    registry = PromptRegistry()
+    with patch("src.prompts.template.prompt_registry", registry):
+        first = render_prompt("planner_prompt", {})
+        second = render_prompt("planner_prompt", {"CURRENT_TIME": "Mon Jan 01 2024 00:00:00"})
+
+    assert first.prefix == second.prefix
+    assert "CURRENT_TIME" not in first.prefix
+    assert second.suffix == "---\nCURRENT_TIME: Mon Jan 01 2024 00:00:00\n---"
+    assert registry.stats()["planner_prompt:en_US"]["prefix_reuses"] == 1
+
+
+def test_locale_resolution_is_cached():
+    """测试 locale 只解析一次，缺少对应语言时回退到英文模板"""
+    registry = PromptRegistry()
+    with patch.object(env, "get_template", wraps=env.get_template) as get_template:
+        zh = registry.get("planner_prompt", "zh-CN")
+        fallback = registry.get("research_prompt", "zh-CN")
+        registry.get("planner_prompt", "zh-CN")
+        registry.get("research_prompt", "zh-CN")
+
+    assert zh.name == "planner_prompt.zh_CN.md"
+    assert fallback.name == "research_prompt.md"
+    assert get_template.call_count == 3
+
+
+def test_apply_prompt_template_renders_state():
+    """测试 apply_prompt_template 渲染状态变量并把时间放在末尾"""
+    prompt = apply_prompt_template("dynamic_actor_prompt", {
+        "actor_persona": "金融分析师",
+        "actor_tools": ["search_web"],
+        "current_subtask": "查询金价",
+    }, locale="zh-CN")
+    assert prompt.startswith("你是一名具备以下人设的 **Dynamic Actor**：\n金融分析师")
+    assert prompt.rstrip().endswith("---")
+    assert "CURRENT_TIME:" in prompt.splitlines()[-2]
@@ -1,9 +1,10 @@
 """
 网页读取工具的单元测试
 """
+from src.utils.download import Download
 from src.utils.mock import mock_tool_runtime
 from src.tools.read_url import read_url_by_originally
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 
 
 def test_read_url_success():
@@ -11,12 +12,11 @@ def test_read_url_success():
     url = "https://www.baidu.com"
     runtime = mock_tool_runtime()
 
-    # Mock requests.get 返回成功响应
-    mock_response = Mock()
-    mock_response.text = "这是百度首页的内容" * 100  # 模拟网页内容
-    mock_response.raise_for_status = Mock()
+    # Mock 流式下载返回成功响应
+    text = "这是百度首页的内容" * 100  # 模拟网页内容
+    mock_download = Download(url, 200, {}, text, "utf-8", len(text.encode()), False)
 
-    with patch("src.tools.read_url.requests.get", return_value=mock_response):
+    with patch("src.tools.read_url.download_text", return_value=mock_download):
         result = read_url_by_originally.invoke({
             "url": url,
             "runtime": runtime,
@@ -0,0 +1,131 @@
+"""
+批量网页读取工具的单元测试（使用本地 HTTP 服务）
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from src.tools.read_urls import allocate_budget, dedupe_urls, read_urls
+from src.utils.extract_pool import extraction_pool
+from src.utils.mock import mock_tool_runtime
+
+DELAY = 0.3
+
+
+def article(name: str) -> bytes:
+    return (
+        f"<html><head><title>{name}</title></head><body><article>"
+        + f"<p>{name} 页面正文：今日黄金价格上涨，市场避险情绪升温，多家机构上调了全年金价预测。</p>" * 20
+        + "</article></body></html>"
+    ).encode("utf-8")
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(DELAY)
+        if self.path == "/missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = article(self.path.strip("/"))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    # 在调用线程内提取，避免把进程池启动时间计入耗时
+    with patch("src.tools.read_url.page_cache", None), \
+            patch.object(extraction_pool, "max_workers", 0):
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_allocate_budget():
+    """测试短页面用不完的预算分给长页面"""
+    assert allocate_budget([100, 5000, 5000], 3000) == [100, 1450, 1450]
+    assert allocate_budget([10, 20], 1000) == [10, 20]
+    assert allocate_budget([], 1000) == []
+
+
+def test_dedupe_urls():
+    """测试按规范化后的 URL 去重"""
+    assert dedupe_urls([
+        "https://a.com/x?utm_source=1", "https://A.com/x", "https://b.com",
+    ]) == ["https://a.com/x?utm_source=1", "https://b.com"]
+
+
+def test_read_urls_concurrent(server):
+    """测试多个页面并发下载，总耗时接近单个页面耗时"""
+    urls = [f"{server}/page{i}" for i in range(4)] + [f"{server}/missing"]
+
+    start = time.perf_counter()
+    output = read_urls.invoke({"urls": urls, "runtime": mock_tool_runtime()})
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < DELAY * 3
+    for i in range(4):
+        assert f"## [{i + 1}] {server}/page{i}" in output
+        assert f"page{i} 页面正文" in output
+    assert "## [5]" in output and "读取页面失败" in output
+
+
+def test_read_urls_async_shared_budget(server):
+    """测试异步实现及共享字符预算"""
+    urls = [f"{server}/page{i}" for i in range(3)]
+
+    async def run():
+        return await read_urls.ainvoke({
+            "urls": urls + [urls[0]], "max_chars": 600, "runtime": mock_tool_runtime()})
+
+    start = time.perf_counter()
+    output = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < DELAY * 3
+    assert "## [4]" not in output
+    assert output.count("内容已截断") == 3
+
+
+def test_concurrent_calls_share_concurrency_cap(server):
+    """测试并发的多次调用共享同一个全局并发上限"""
+    async def run():
+        runtime = mock_tool_runtime()
+        return await asyncio.gather(*(
+            read_urls.ainvoke({"urls": [f"{server}/{name}{i}" for i in range(2)], "runtime": runtime})
+            for name in ("a", "b")
+        ))
+
+    with patch("src.tools.read_urls.READ_URLS_CONCURRENCY", 2):
+        start = time.perf_counter()
+        outputs = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+
+    # 4 个页面、2 个名额：至少需要两轮下载
+    assert elapsed >= DELAY * 2
+    assert all("页面正文" in output for output in outputs)
+
+
+def test_read_urls_invalid_args():
+    """测试参数校验"""
+    runtime = mock_tool_runtime()
+    assert read_urls.invoke({"urls": [], "runtime": runtime}) == "Error: urls 不能为空"
+    assert "仅支持 http 或 https 协议" in read_urls.invoke(
+        {"urls": ["ftp://example.com"], "runtime": runtime})
@@ -0,0 +1,141 @@
+"""
+K2 / DeepSeek 模型路由的单元测试（两个本地假模型服务）
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from langchain_openai import ChatOpenAI
+from pydantic import SecretStr
+
+from benchmarks.fake_services import FakeServices, start_in_thread
+from src.llms import router
+from src.llms.response_cache import SQLiteResponseCache
+from src.llms.router import ModelHealth, RoutedChatModel, parse_routes, routed_model
+
+
+@pytest.fixture
+def endpoints():
+    """两个 OpenAI 兼容的本地假模型服务：primary 和 backup"""
+    primary, backup = FakeServices(latency=0.01, tps=0), FakeServices(latency=0.01, tps=0)
+    servers = [start_in_thread(primary), start_in_thread(backup)]
+    health = ModelHealth(alpha=0.5)
+    with patch.object(router, "model_health", health):
+        yield primary, backup, health
+    for server in servers:
+        server.shutdown()
+
+
+def make_router(primary, backup, temperature=None, **kwargs):
+    models = [
+        ChatOpenAI(model=name, api_key=SecretStr("test"), base_url=f"{services.web}/v1",
+                   max_retries=0, stream_usage=True, temperature=temperature)
+        for name, services in (("fake-k2", primary), ("fake-deepseek", backup))
+    ]
+    return RoutedChatModel(node="coordinator", names=["k2", "deepseek"], models=models, **kwargs)
+
+
+def test_fails_over_on_5xx(endpoints):
+    """测试首选模型返回 5xx 时切换到下一个模型，流式和非流式都生效"""
+    primary, backup, health = endpoints
+    primary.fail_status = 503
+    model = make_router(primary, backup)
+
+    async def scenario():
+        reply = await model.ainvoke("最新黄金价格")
+        chunks = [chunk async for chunk in model.astream("最新黄金价格")]
+        return reply, chunks
+
+    reply, chunks = asyncio.run(scenario())
+    assert reply.response_metadata["model_name"] == "fake-deepseek"
+    assert "".join(chunk.content for chunk in chunks) == reply.content
+    assert primary.failures == 2 and health.failovers == 2
+    assert health.error_rate("k2", "coordinator") > 0
+    # 错误率过高的模型排到后面
+    assert model.order() == [1, 0]
+
+
+def test_non_retryable_errors_are_raised(endpoints):
+    """测试 4xx（除 429）不切换模型"""
+    primary, backup, health = endpoints
+    primary.fail_status = 400
+    with pytest.raises(Exception) as excinfo:
+        asyncio.run(make_router(primary, backup).ainvoke("最新黄金价格"))
+    assert getattr(excinfo.value, "status_code", None) == 400
+    assert health.failovers == 0
+
+
+def test_hedges_when_primary_exceeds_latency_percentile(endpoints):
+    """测试首选模型超过延迟分位数后发送对冲请求，取先返回的结果"""
+    primary, backup, health = endpoints
+    for _ in range(20):
+        health.record("k2", "coordinator", 0.05)
+    primary.latency = 1.0
+    model = make_router(primary, backup, hedge_percentile=95, hedge_min_samples=20)
+
+    started = time.perf_counter()
+    reply = asyncio.run(model.ainvoke("最新黄金价格"))
+    assert time.perf_counter() - started < 0.8
+    assert reply.response_metadata["model_name"] == "fake-deepseek"
+    assert health.hedges == 1 and health.hedge_wins == 1
+
+
+def test_fastest_policy_prefers_lower_ewma_latency():
+    """测试 fastest 策略按 EWMA 延迟排序，没有样本的模型优先"""
+    health = ModelHealth(alpha=0.5)
+    model = RoutedChatModel(node="actor_factory", names=["k2", "deepseek"],
+                            models=[ChatOpenAI(model="a", api_key=SecretStr("t"))] * 2,
+                            policy="fastest")
+    with patch.object(router, "model_health", health):
+        health.record("k2", "actor_factory", 0.8)
+        assert model.order() == [1, 0]
+        health.record("deepseek", "actor_factory", 2.0)
+        assert model.order() == [0, 1]
+
+
+def test_routes_config_and_single_model_fallback():
+    """测试路由配置解析，只配置了一个模型时直接返回该模型"""
+    assert parse_routes("coordinator=fastest:deepseek,k2;research=k2") == {
+        "coordinator": ("fastest", ["deepseek", "k2"]), "research": ("ordered", ["k2"])}
+    with pytest.raises(ValueError):
+        parse_routes("research=random:k2")
+
+    with patch.object(router.fz, "K2_MODEL_ID", "k2"), \
+            patch.object(router.fz, "DEEPSEEK_3_1_MODEL_ID", ""):
+        assert routed_model("planner") is router.fz.get_k2_chat_model()
+    with patch.object(router.fz, "K2_MODEL_ID", "k2"), \
+            patch.object(router.fz, "DEEPSEEK_3_1_MODEL_ID", "ds"):
+        model = routed_model("coordinator")
+    assert isinstance(model, RoutedChatModel) and model.policy == "fastest"
+    router.fz.get_k2_chat_model.cache_clear()
+    router.fz.get_deepseek_3_1_chat_model.cache_clear()
+
+
+def test_cache_key_includes_underlying_model_parameters(endpoints, tmp_path):
+    """测试响应缓存的 key 包含被路由模型的参数，修改参数后不命中旧的缓存"""
+    primary, backup, _ = endpoints
+    cache = SQLiteResponseCache(str(tmp_path / "llm_cache.sqlite"), ttl=60, max_entries=10)
+
+    def ask(model):
+        return model.model_copy(update={"cache": cache}).invoke("最新黄金价格")
+
+    ask(make_router(primary, backup))
+    ask(make_router(primary, backup))
+    assert cache.stats()["hits"] == 1
+
+    ask(make_router(primary, backup, temperature=0.9))
+    assert cache.stats()["hits"] == 1 and cache.stats()["stores"] == 2
+
+
+def test_sync_call_fails_over_on_timeout(endpoints):
+    """测试同步调用时首选模型超过单次超时后切换到下一个模型"""
+    primary, backup, health = endpoints
+    primary.latency = 2.0
+    model = make_router(primary, backup, timeout=0.3)
+
+    started = time.perf_counter()
+    reply = model.invoke("最新黄金价格")
+    assert time.perf_counter() - started < 1.5
+    assert reply.response_metadata["model_name"] == "fake-deepseek"
+    assert health.stats()["failovers"] == 1
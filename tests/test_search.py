@@ -0,0 +1,100 @@
+"""
+搜索工具缓存与单飞合并的单元测试（使用本地假搜索服务）
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from src.tools import search
+from src.tools.search import normalize_query, search_web
+from src.utils.mock import mock_tool_runtime
+
+
+class FakeSearchProvider:
+    """记录调用次数、带固定延迟的假搜索服务"""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def text(self, query, max_results):
+        with self.lock:
+            self.queries.append(query)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream unavailable")
+        return [{"title": f"{query} 标题", "body": "摘要", "href": "https://example.com"}]
+
+
+@pytest.fixture
+def provider():
+    fake = FakeSearchProvider()
+    search.search_cache.clear()
+    with patch.object(search, "search_provider", fake):
+        yield fake
+    search.search_cache.clear()
+
+
+def call(query):
+    return search_web.invoke({"query": query, "runtime": mock_tool_runtime()})
+
+
+def test_normalize_query():
+    """测试查询规范化"""
+    assert normalize_query("  最新黄金价格　 ") == "最新黄金价格"
+    assert normalize_query("Gold  PRICE") == "gold price"
+
+
+def test_concurrent_identical_queries_coalesce(provider):
+    """测试并发的相同查询（包括同步和异步调用方）只触发一次上游搜索"""
+    async def run():
+        runtime = mock_tool_runtime()
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(4) as pool:
+            sync_calls = [loop.run_in_executor(pool, call, "最新黄金价格 ") for _ in range(4)]
+            async_calls = [
+                search_web.ainvoke({"query": "最新黄金价格", "runtime": runtime})
+                for _ in range(10)
+            ]
+            return await asyncio.gather(*sync_calls, *async_calls)
+
+    results = asyncio.run(run())
+    assert len(provider.queries) == 1
+    assert len(set(results)) == 1
+    assert "标题" in results[0]
+
+
+def test_cache_hit_and_errors_not_cached(provider):
+    """测试缓存命中不再请求上游，失败结果不缓存"""
+    call("最新黄金价格")
+    call("最新黄金价格")
+    assert len(provider.queries) == 1
+
+    provider.fail = True
+    assert "搜索出错" in call("原油价格")
+    provider.fail = False
+    assert "标题" in call("原油价格")
+    assert provider.queries.count("原油价格") == 2
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_waiters(provider):
+    """测试第一个发起搜索的调用方被取消时，合并进来的其他调用方仍然拿到结果"""
+    async def run():
+        runtime = mock_tool_runtime()
+        first = asyncio.create_task(search_web.ainvoke({"query": "最新黄金价格", "runtime": runtime}))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(search_web.ainvoke({"query": "最新黄金价格", "runtime": runtime}))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert "标题" in asyncio.run(run())
+    assert len(provider.queries) == 1
@@ -0,0 +1,50 @@
+"""
+SSE 事件编码与合并写出的单元测试
+"""
+import asyncio
+import json
+
+from src.utils import sse
+from src.utils.stream_buffer import StreamBuffer
+
+
+def parse(frame: bytes):
+    assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+    return json.loads(frame[len(b"data: "):])
+
+
+def test_serializers_produce_equivalent_frames():
+    """测试 json / orjson 编码结果一致，中文不转义，orjson 不支持的值回退到 json"""
+    event = {"type": "token", "content": "金价", "id": None, "node": "research"}
+    try:
+        frames = []
+        for name in ("json", "auto"):
+            sse.set_serializer(name)
+            frames.append(sse.sse_frame(event))
+            assert parse(sse.sse_frame({"big": 2 ** 70}))["big"] == 2 ** 70
+    finally:
+        sse.set_serializer(sse.SSE_SERIALIZER)
+
+    assert [parse(frame) for frame in frames] == [event, event]
+    assert "金价".encode("utf-8") in frames[0]
+    assert parse(sse.DONE_FRAME)["type"] == "done"
+
+
+def test_window_coalesces_events_into_one_batch():
+    """测试等待窗口内产生的事件合并为一批"""
+
+    async def scenario():
+        buffer = StreamBuffer("t1")
+
+        async def produce():
+            for i in range(5):
+                await asyncio.sleep(0.001)
+                buffer.append(b"%d" % i)
+            buffer.finish()
+
+        buffer.start(asyncio.create_task(produce()))
+        return [batch async for batch in buffer.iter_batches(0, window=0.5)]
+
+    batches = asyncio.run(scenario())
+    assert len(batches) == 1
+    assert [event_id for event_id, _ in batches[0]] == [1, 2, 3, 4, 5]
@@ -0,0 +1,96 @@
+"""
+SSE 事件 id 与断线重连的单元测试
+"""
+import asyncio
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessageChunk
+
+import api.main as api_main
+from src.utils.stream_buffer import StreamBuffer, StreamBuffers
+
+
+class TokenGraph:
+    """tokens 模式下依次推送几个 token 的假图"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.runs = 0
+
+    async def astream(self, input, config=None, stream_mode="values"):
+        self.runs += 1
+        for token in self.tokens:
+            yield ("messages", (AIMessageChunk(content=token, id="c1"),
+                                {"langgraph_node": "research"}))
+
+
+def read_frames(response):
+    """返回 [(id, data)]"""
+    return [
+        (int(frame.split("\n")[0][len("id: "):]), frame.split("\n")[1])
+        for frame in response.text.strip().split("\n\n")
+    ]
+
+
+def test_events_carry_ids_and_reattach_replays_without_rerun():
+    """测试事件 id 在同一 thread 内单调递增，带 Last-Event-ID 重连只补发缓冲中的事件"""
+    graph = TokenGraph(["金", "价", "上涨"])
+    with patch.object(api_main, "research_agent", graph), \
+            patch.object(api_main, "stream_buffers", StreamBuffers()):
+        client = TestClient(api_main.app)
+        first = read_frames(client.post("/stream/chat", json={
+            "message": "最新黄金价格", "thread_id": "t-replay", "mode": "tokens"}))
+        second = read_frames(client.post("/stream/chat", json={
+            "message": "继续", "thread_id": "t-replay", "mode": "tokens"}))
+        replay = read_frames(client.get(
+            "/stream/chat/t-replay", headers={"Last-Event-ID": str(second[1][0])}))
+        latest = read_frames(client.get("/stream/chat/t-replay"))
+        missing = client.get("/stream/chat/unknown")
+
+    ids = [event_id for event_id, _ in first + second]
+    assert ids == list(range(1, len(ids) + 1))
+    assert replay == second[2:]
+    assert latest == second
+    assert graph.runs == 2
+    assert missing.status_code == 404
+
+
+def test_reattach_within_grace_keeps_run_alive():
+    """测试所有客户端断开后，在 grace 内重新连接不会取消运行"""
+
+    async def scenario():
+        buffer = StreamBuffer("t1", max_events=10, grace=0.05)
+        gate = asyncio.Event()
+
+        async def run():
+            buffer.append(b"data: a\n\n")
+            await gate.wait()
+            buffer.append(b"data: b\n\n")
+            buffer.finish()
+
+        task = asyncio.create_task(run())
+        buffer.start(task)
+        buffer.attach()
+        await asyncio.sleep(0)
+        buffer.detach()
+        buffer.attach()
+        await asyncio.sleep(0.1)
+        gate.set()
+        events = [batch async for batch in buffer.iter_batches(1)]
+        buffer.detach()
+        return task.cancelled(), events, buffer
+
+    cancelled, events, buffer = asyncio.run(scenario())
+    assert not cancelled
+    assert events == [[(2, b"data: b\n\n")]]
+    assert not buffer.missing(0)
+
+
+def test_missing_events_are_detected():
+    """测试超出缓冲大小被丢弃的事件无法补发"""
+    buffer = StreamBuffer("t1", max_events=2)
+    for data in (b"a", b"b", b"c"):
+        buffer.append(data)
+    assert buffer.missing(0)
+    assert not buffer.missing(1)
@@ -0,0 +1,99 @@
+"""
+/stream/chat 流式模式的单元测试
+"""
+import json
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langgraph.types import Command, Interrupt
+
+import api.main as api_main
+
+
+class FakeGraph:
+    """按 stream_mode 返回预设 chunk 的假图"""
+
+    def __init__(self, chunks_by_mode):
+        self.chunks_by_mode = chunks_by_mode
+        self.stream_modes = []
+        self.inputs = []
+
+    async def astream(self, input, config=None, stream_mode="values"):
+        self.stream_modes.append(stream_mode)
+        self.inputs.append(input)
+        key = stream_mode if isinstance(stream_mode, str) else tuple(stream_mode)
+        for chunk in self.chunks_by_mode[key]:
+            yield chunk
+
+
+def read_events(response):
+    return [
+        json.loads(line[len("data: "):])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+def test_delta_mode_dedupes_messages():
+    """测试 delta 模式只推送新消息，并按 id 去重"""
+    question = HumanMessage(content="最新黄金价格", id="m1")
+    answer = AIMessage(content="金价为 ...", id="m2")
+    graph = FakeGraph({"updates": [
+        {"coordinator": {"messages": [question], "user_input_optimized": "q"}},
+        {"research": {"messages": [question, answer]}},
+    ]})
+
+    with patch.object(api_main, "research_agent", graph):
+        client = TestClient(api_main.app)
+        response = client.post(
+            "/stream/chat", json={"message": "最新黄金价格", "mode": "delta"})
+
+    events = read_events(response)
+    messages = [e for e in events if e["type"] == "message"]
+    assert graph.stream_modes == ["updates"]
+    assert [m["id"] for m in messages] == ["m1", "m2"]
+    assert messages[1]["node"] == "research"
+    assert events[-1]["type"] == "done"
+
+
+def test_tokens_mode_streams_chunks():
+    """测试 tokens 模式推送 token 增量"""
+    metadata = {"langgraph_node": "research"}
+    graph = FakeGraph({("updates", "messages"): [
+        ("messages", (AIMessageChunk(content="金", id="c1"), metadata)),
+        ("messages", (AIMessageChunk(content="价", id="c1"), metadata)),
+        ("updates", {"research": {"messages": [AIMessage(content="金价", id="c1")]}}),
+    ]})
+
+    with patch.object(api_main, "research_agent", graph):
+        client = TestClient(api_main.app)
+        response = client.post(
+            "/stream/chat", json={"message": "最新黄金价格", "mode": "tokens"})
+
+    events = read_events(response)
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+    assert tokens == ["金", "价"]
+    # 完整消息已经以 token 形式推送过，不会重复发送
+    assert not [e for e in events if e["type"] == "message"]
+
+
+def test_interrupt_then_resume_approves_pending_tools():
+    """测试中断事件带上待审批的工具调用，同一 thread_id 再次请求时默认全部批准"""
+    action = {"name": "read_urls", "args": {"urls": ["https://example.com"]}, "description": "读取网页"}
+    graph = FakeGraph({"updates": [
+        {"__interrupt__": (Interrupt(value={"action_requests": [action], "review_configs": []}),)},
+    ]})
+
+    with patch.object(api_main, "research_agent", graph):
+        client = TestClient(api_main.app)
+        first = read_events(client.post(
+            "/stream/chat", json={"message": "最新黄金价格", "thread_id": "t-hitl", "mode": "delta"}))
+        second = read_events(client.post(
+            "/stream/chat", json={"message": "", "thread_id": "t-hitl", "mode": "delta"}))
+
+    interrupt = next(e for e in first if e["type"] == "interrupt")
+    assert interrupt["action_requests"][0]["tool_name"] == "read_urls"
+    assert second[0]["type"] == "resume"
+    assert isinstance(graph.inputs[1], Command)
+    assert graph.inputs[1].resume == {"decisions": [{"type": "approve"}]}
@@ -0,0 +1,67 @@
+"""
+actor_factory 本地工具选择器的单元测试
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.fake_llm import SleepyChatModel
+from src.agents import actor_factory
+from src.agents.tool_selector import ToolSelector, extract_features, rule_decision
+
+
+@pytest.fixture
+def selector(tmp_path):
+    return ToolSelector(str(tmp_path / "tool_selector.sqlite"), audit_rate=0, min_support=2)
+
+
+def test_rules():
+    """测试关键词规则"""
+    assert rule_decision("Read https://example.com/news and extract the key figures").tools == ["read_url"]
+    assert rule_decision("搜索最新黄金价格").tools == ["search_web", "read_url"]
+    assert rule_decision("汇总前面的结果并撰写报告").tools == []
+    assert rule_decision("思考一下") is None
+    # 英文关键词按整词匹配：findings / already 不算搜索、阅读
+    assert rule_decision("Check what we already have in the findings") is None
+    # 整理类关键词占多数时不需要工具
+    assert rule_decision("Summarize the research findings into a final report").tools == []
+    assert rule_decision("总结前面收集的价格数据并撰写报告").tools == []
+    # 同时需要搜索和撰写时置信度低于阈值，交给 LLM 判断
+    assert rule_decision("搜索最新黄金价格并撰写报告").confidence < 0.75
+    assert {"<url>", "gold", "黄金", "金价"} <= extract_features("gold 黄金价 https://a.com/x")
+
+
+def test_learns_from_llm_decisions(tmp_path, selector):
+    """测试统计学习：LLM 多次选择相同工具后，本地结论置信度足够，且跨实例保留"""
+    subtask = "Plan the itinerary for the Kyoto trip"
+    assert selector.select(subtask).confidence == 0
+    for _ in range(3):
+        selector.learn(subtask, ["search_web"], selector.select(subtask), llm_seconds=1.0)
+
+    decision = selector.select(subtask)
+    assert decision.tools == ["search_web"] and decision.source == "learned"
+    assert selector.should_skip_llm(decision)
+    # 前两次样本不足、没有本地结论；第三次本地结论已与 LLM 一致
+    assert selector.stats()["agreements"] == 1 and selector.stats()["agreement_rate"] == 1.0
+
+    reloaded = ToolSelector(selector.db_path, min_support=2)
+    assert reloaded.select(subtask).tools == ["search_web"]
+
+
+def test_actor_factory_skips_llm_when_confident(selector):
+    """测试把握足够时 actor_factory 不调用 LLM，把握不足时调用并学习"""
+    llm = SleepyChatModel(latency=0, response='{"actor_persona": "旅行规划师", "actor_tools": []}')
+    with patch.object(actor_factory, "tool_selector", selector), \
+            patch.object(actor_factory, "llm", llm):
+        local = asyncio.run(actor_factory.actor_factory_node(
+            {"current_subtask": "搜索最新黄金价格", "locale": "zh-CN"}))
+        remote = asyncio.run(actor_factory.actor_factory_node(
+            {"current_subtask": "规划京都行程", "locale": "zh-CN"}))
+
+    assert local["actor_tools"] == ["search_web", "read_url"]
+    assert local["actor_persona"].startswith("专注的研究分析师")
+    assert remote == {"actor_persona": "旅行规划师", "actor_tools": []}
+    stats = selector.stats()
+    assert stats["local_decisions"] == 1 and stats["llm_decisions"] == 1
+    assert stats["saved_seconds"] >= 0
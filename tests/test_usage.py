@@ -0,0 +1,91 @@
+"""
+请求级 token 用量统计的单元测试
+"""
+import asyncio
+import json
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+import api.main as api_main
+from src.monitoring.usage import UsageStore, UsageTracker
+
+
+def make_graph():
+    """coordinator 直接调用模型，research 通过子图（模拟子 agent）调用模型"""
+    reply = AIMessage(content="ok", usage_metadata={
+        "input_tokens": 10, "output_tokens": 4, "total_tokens": 14})
+    model = GenericFakeChatModel(messages=iter([reply] * 10))
+
+    async def call_model(state):
+        return {"messages": [await model.ainvoke(state["messages"])]}
+
+    inner = StateGraph(MessagesState)
+    inner.add_node("model", call_model)
+    inner.add_edge(START, "model")
+    inner.add_edge("model", END)
+    sub_agent = inner.compile()
+
+    async def research(state):
+        result = await sub_agent.ainvoke({"messages": state["messages"]})
+        return {"messages": result["messages"][-1:]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("coordinator", call_model)
+    graph.add_node("research", research)
+    graph.add_edge(START, "coordinator")
+    graph.add_edge("coordinator", "research")
+    graph.add_edge("research", END)
+    return graph.compile()
+
+
+def test_tracker_attributes_sub_agent_calls_to_top_level_node():
+    """测试子 agent 内的调用计入调用它的顶层节点，节点耗时只统计顶层节点"""
+    tracker = UsageTracker()
+    asyncio.run(make_graph().ainvoke(
+        {"messages": [("user", "最新黄金价格")]}, {"callbacks": [tracker]}))
+
+    summary = tracker.summary()
+    assert summary["llm_calls"] == 2
+    assert summary["prompt_tokens"] == 20 and summary["total_tokens"] == 28
+    assert set(summary["nodes"]) == {"coordinator", "research"}
+    assert summary["nodes"]["research"]["completion_tokens"] == 4
+    assert all(node["runs"] == 1 and node["seconds"] > 0 for node in summary["nodes"].values())
+
+
+def test_store_accumulates_per_thread_with_lru():
+    """测试按 thread 累计，超出上限时淘汰最久未更新的 thread"""
+    store = UsageStore(max_threads=2, recent=10)
+    summary = {"duration_s": 1.5, "llm_calls": 2, "prompt_tokens": 20, "completion_tokens": 8,
+               "total_tokens": 28, "nodes": {"research": {"runs": 1, "seconds": 1.0}}}
+    store.record("t1", summary)
+    store.record("t1", summary)
+    store.record("t2", {**summary, "duration_s": 3.0})
+    store.record("t3", summary)
+
+    assert store.get("t1") is None
+    assert store.get("t3")["total_tokens"] == 28
+    assert store.stats()["requests"] == 4 and store.stats()["total_tokens"] == 112
+    assert store.slowest(1)[0]["thread_id"] == "t2"
+
+
+def test_stream_chat_emits_usage_event():
+    """测试 /stream/chat 在 done 之前推送 usage 事件，并可通过 /usage/{thread_id} 查询"""
+    store = UsageStore()
+    with patch.object(api_main, "research_agent", make_graph()), \
+            patch.object(api_main, "usage_store", store):
+        client = TestClient(api_main.app)
+        response = client.post("/stream/chat", json={
+            "message": "最新黄金价格", "thread_id": "t-usage", "mode": "delta"})
+        thread = client.get("/usage/t-usage").json()
+        missing = client.get("/usage/unknown")
+
+    events = [json.loads(line[len("data: "):])
+              for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [e["type"] for e in events[-2:]] == ["usage", "done"]
+    assert events[-2]["total_tokens"] == 28 and events[-2]["llm_calls"] == 2
+    assert thread["requests"] == 1 and thread["nodes"]["coordinator"]["prompt_tokens"] == 10
+    assert missing.status_code == 404